@@ -0,0 +1,129 @@
+import heapq
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.data_provider import DataProvider
+from backtest.domain import BacktestResult, StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.portfolio import PortfolioBook
+from backtest.rules import ScreenCache
+
+logger = logging.getLogger("BatchBacktest")
+
+
+class SharedMarketData:
+    """
+    Provider view for engines advancing together: the universe's prices and
+    the fundamentals snapshot of a date are read from the panels once and
+    served to every engine touching that date. Held-ticker lookups are slices
+    of the cached universe row (same values as a direct panel read).
+    Everything else is delegated to the wrapped provider.
+    """
+
+    def __init__(self, provider: DataProvider, max_dates: int = 64):
+        self.provider = provider
+        self.max_dates = max_dates
+        self._prices = OrderedDict()
+        self._fundamentals = OrderedDict()
+        self._asset_index = {ticker: i for i, ticker in enumerate(provider.assets_list)}
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
+
+    def _cached(self, cache: OrderedDict, date, load):
+        key = pd.Timestamp(date).value
+        value = cache.get(key)
+        if value is not None:
+            self.hits += 1
+            cache.move_to_end(key)
+            return value
+        self.misses += 1
+        value = cache[key] = load()
+        if len(cache) > self.max_dates:
+            cache.popitem(last=False)
+        return value
+
+    def get_prices(self, tickers, date, field="close"):
+        if field != "close":
+            return self.provider.get_prices(tickers, date, field)
+        cols = [self._asset_index.get(ticker, -1) for ticker in tickers]
+        if -1 in cols:
+            return self.provider.get_prices(tickers, date, field)
+        prices, ages = self._cached(
+            self._prices, date, lambda: self.provider.get_prices(self.provider.assets_list, date))
+        # Fancy indexing copies: callers may write to the vectors
+        return prices[cols], ages[cols]
+
+    def get_fundamentals(self, date):
+        return self._cached(self._fundamentals, date, lambda: self.provider.get_fundamentals(date))
+
+
+class BatchBacktestEngine:
+    """
+    Runs K strategy configs in lockstep over the shared timeline, for pages
+    comparing many variants at once.
+
+    The engines always advance the one furthest behind in time, so their
+    sessions stay close together and per-date market data (prices, the
+    fundamentals cross-section) is read once for all of them through
+    SharedMarketData. Entry screens go through one ScreenCache, so variants
+    with the same criteria evaluate each date's mask once. Positions live in
+    a PortfolioBook (K x tickers matrices). Results are identical to K
+    separate BacktestEngine runs.
+    """
+
+    def __init__(self, data_provider: DataProvider, event_driven: bool = True,
+                 screen_cache: Optional[ScreenCache] = None, max_dates: int = 64):
+        self.data_provider = data_provider
+        self.event_driven = event_driven
+        self.screen_cache = screen_cache if screen_cache is not None else ScreenCache()
+        self.max_dates = max_dates
+        self.market = None
+        self.book = None
+        self.engines: List[BacktestEngine] = []
+
+    def run(self, configs: List[StrategyConfigRequest]) -> List[BacktestResult]:
+        """Results in the order of `configs`."""
+        self.market = SharedMarketData(self.data_provider, self.max_dates)
+        self.book = PortfolioBook(len(configs), self.data_provider.assets_list)
+        self.engines = [
+            BacktestEngine(self.market, self.event_driven, self.screen_cache,
+                           portfolio_factory=lambda capital, row=row: self.book.portfolio(capital, row))
+            for row in range(len(configs))
+        ]
+
+        runs = []
+        queue = []
+        for row, (engine, config) in enumerate(zip(self.engines, configs)):
+            timeline, start_dt, end_dt = engine.start(config)
+            engine.prepare_timeline(timeline, start_dt)
+            runs.append((timeline, start_dt, end_dt, engine.steps(timeline)))
+            queue.append((self._position(timeline, 0), row))
+        heapq.heapify(queue)
+
+        results: List[Optional[BacktestResult]] = [None] * len(configs)
+        while queue:
+            _, row = heapq.heappop(queue)
+            timeline, start_dt, end_dt, steps = runs[row]
+            processed = next(steps, None)
+            if processed is None:
+                results[row] = self.engines[row].finish(timeline, start_dt, end_dt)
+                continue
+            heapq.heappush(queue, (self._position(timeline, processed), row))
+
+        logger.info(f"Batch of {len(configs)} configs done "
+                    f"(market data hits {self.market.hits}, misses {self.market.misses}).")
+        return results
+
+    @staticmethod
+    def _position(timeline, processed: int) -> int:
+        # Next session to simulate (ns since epoch); runs that are done sort last
+        if processed < len(timeline):
+            return pd.Timestamp(timeline[processed]).value
+        return np.iinfo(np.int64).max
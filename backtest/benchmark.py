@@ -1,51 +1,262 @@
-
 import pandas as pd
+import numpy as np
 import logging
-from backtest.data_provider import DataProvider
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from backtest.data_provider import DataProvider
 
 logger = logging.getLogger("BenchmarkService")
 
+# Annual rate used when there is no SELIC series (~10% a.a.)
+SELIC_FALLBACK_DAILY = 0.0004
+
+
+@dataclass
+class BenchmarkLevels:
+    """
+    Full-history index levels of one benchmark, over its own (sorted) rows.
+
+    A window starting at row a and ending at row b grows by
+    `after[b] / before[a]`: for rate series (SELIC, IPCA) the levels are the
+    compounded factors, so `before[a]` is the level prior to row a; for index
+    points (IBOV) both are the points themselves.
+    """
+    index: pd.DatetimeIndex
+    values: np.ndarray
+    before: np.ndarray
+    after: np.ndarray
+    daily_rates: Optional[np.ndarray] = None  # SELIC only: daily rate of each row
+
+    @classmethod
+    def build(cls, name: str, series: pd.Series) -> "BenchmarkLevels":
+        series = series.sort_index()
+        values = series.to_numpy(dtype=float)
+        daily_rates = None
+        if name == 'SELIC_Rate':
+            # % a.a. (already divided by 100) -> daily factor
+            rates = np.where(values > 5.0, values / 100.0, values)  # Safety check if data is weird
+            factors = (1 + rates) ** (1 / 252)
+            daily_rates = factors - 1
+        elif name == 'IPCA':
+            # Monthly rates compounded into a price level
+            factors = 1 + np.nan_to_num(values)
+        else:
+            # Index points
+            return cls(pd.DatetimeIndex(series.index), values, values, values)
+        levels = np.cumprod(np.r_[1.0, factors])
+        return cls(pd.DatetimeIndex(series.index), values, levels[:-1], levels[1:], daily_rates)
+
+    def __len__(self):
+        return len(self.values)
+
+    def first_row(self, date) -> int:
+        """First row on or after date."""
+        return int(self.index.searchsorted(pd.Timestamp(date), side='left'))
+
+    def asof_rows(self, dates) -> np.ndarray:
+        """Row of the latest entry on or before each date (-1 when none)."""
+        return self.index.searchsorted(dates, side='right') - 1
+
+
 class BenchmarkService:
-    def __init__(self, data_provider: DataProvider):
+    """
+    Single source of the benchmark curves (SELIC, IPCA, IBOV) for the
+    engine, the server and the reporter.
+
+    The full-history levels of each series are computed once per dataset
+    version (the provider's benchmark series); the return over any window is
+    then a ratio of two levels, and timeline alignments are memoized (LRU of
+    `max_alignments`). Series replaced in `provider.benchmarks` start a new
+    version; series mutated in place are not detected (call `invalidate`).
+    Safe to share between request threads.
+    """
+
+    def __init__(self, data_provider: Optional["DataProvider"] = None, max_alignments: int = 64):
         self.data_provider = data_provider
-        self.benchmarks = {} # Cache
-        
+        self.max_alignments = max_alignments
+        self._series = {}  # Used when there is no provider (see from_series)
+        self._version = None
+        self._levels: Dict[str, BenchmarkLevels] = {}
+        self._aligned = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_series(cls, benchmarks: Dict[str, pd.Series]) -> "BenchmarkService":
+        service = cls()
+        service._series = benchmarks
+        return service
+
+    @property
+    def series(self) -> Dict[str, pd.Series]:
+        return self.data_provider.benchmarks if self.data_provider is not None else self._series
+
+    def for_provider(self, data_provider: "DataProvider") -> "BenchmarkService":
+        """
+        New service for a provider sharing the same benchmark series: reuses
+        the precomputed (immutable) levels, with its own alignment memo. This
+        service keeps serving its own provider.
+        """
+        service = BenchmarkService(data_provider, self.max_alignments)
+        with self._lock:
+            service._version, service._levels = self._version, self._levels
+        return service
+
     def load_benchmarks(self):
         """Ensures benchmarks are loaded in DataProvider."""
         self.data_provider.fetch_benchmarks()
-        
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._levels = {}
+            self._aligned.clear()
+
+    def _refresh(self):
+        series = self.series
+        version = tuple((name, id(s), len(s)) for name, s in sorted(series.items()))
+        with self._lock:
+            if version != self._version:
+                self._levels = {name: BenchmarkLevels.build(name, s) for name, s in series.items() if not s.empty}
+                self._aligned.clear()
+                self._version = version
+        return version
+
+    def levels(self, name: str) -> Optional[BenchmarkLevels]:
+        """Precomputed levels of a benchmark (None when not loaded or empty)."""
+        self._refresh()
+        return self._levels.get(name)
+
+    def _memo(self, key, compute):
+        with self._lock:
+            value = self._aligned.get(key)
+            if value is not None:
+                self._aligned.move_to_end(key)
+                return value
+        # Computed outside the lock: concurrent misses of one key just compute it twice
+        value = compute()
+        with self._lock:
+            self._aligned[key] = value
+            while len(self._aligned) > self.max_alignments:
+                self._aligned.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _dates_key(dates: pd.DatetimeIndex):
+        return len(dates), hash(dates.asi8.tobytes())
+
+    # --- Windows ---
+
+    def window_return(self, name: str, start_date, end_date) -> float:
+        """Cumulative return over [start_date, end_date] (NaN when the window has no rows)."""
+        levels = self.levels(name)
+        if levels is None:
+            return float('nan')
+        a = levels.first_row(start_date)
+        b = int(levels.asof_rows(pd.DatetimeIndex([pd.Timestamp(end_date)]))[0])
+        if a > b:
+            return float('nan')
+        return float(levels.after[b] / levels.before[a] - 1)
+
+    def cumulative_on(self, name: str, dates, start_date=None) -> np.ndarray:
+        """
+        Cumulative return since the window starting at start_date (default:
+        the first date), as of each date; NaN before the window's first row.
+        """
+        levels = self.levels(name)
+        dates = pd.DatetimeIndex(dates)
+        if levels is None or len(dates) == 0:
+            return np.full(len(dates), np.nan)
+        start = pd.Timestamp(start_date) if start_date is not None else dates[0]
+
+        def compute():
+            a = levels.first_row(start)
+            pos = levels.asof_rows(dates)
+            inside = pos >= a
+            out = np.full(len(dates), np.nan)
+            out[inside] = levels.after[pos[inside]] / levels.before[a] - 1
+            out.flags.writeable = False
+            return out
+
+        return self._memo(("cumulative", self._version, name, start.value) + self._dates_key(dates), compute)
+
     def get_benchmark_cumulative(self, name: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> pd.Series:
         """Returns cumulative return series (normalized to 0 at start)."""
-        series = self.data_provider.get_benchmark_data(name)
-        if series.empty:
+        levels = self.levels(name)
+        if levels is None:
             return pd.Series()
-            
-        # Slice
-        subset = series.loc[start_date:end_date]
-        if subset.empty: return pd.Series()
-        
-        # Calculate Cumulative Return
-        if name == 'SELIC_Rate':
-            # Daily accumulation
-            # Series is % a.a. -> convert to daily factor
-            daily_factors = (1 + subset) ** (1/252)
-            cumulative = daily_factors.cumprod() - 1
-            return cumulative
-            
-        elif name == 'IPCA':
-            # Monthly. Need to resample to daily? or just return monthly points?
-            # For plotting, daily forward fill?
-            # IPCA is monthly %. (1 + r).cumprod()
-            # Series index is Month Start usually.
-            cumulative = (1 + subset/100).cumprod() - 1
-            # Reindex to daily
-            full_idx = pd.date_range(start=start_date, end=end_date, freq='D')
-            cumulative = cumulative.reindex(full_idx, method='ffill')
-            return cumulative
-            
-        else: # IBOV (Index Points)
-            # Normalize to 0 at start
-            start_val = subset.iloc[0]
-            if start_val == 0: return subset * 0
-            cumulative = (subset / start_val) - 1
-            return cumulative
+
+        if name == 'IPCA':
+            # Monthly: as-of each calendar day
+            days = pd.date_range(start=start_date, end=end_date, freq='D')
+            return pd.Series(self.cumulative_on(name, days, start_date), index=days)
+
+        a = levels.first_row(start_date)
+        b = int(levels.index.searchsorted(pd.Timestamp(end_date), side='right'))
+        if a >= b:
+            return pd.Series()
+        return pd.Series(levels.after[a:b] / levels.before[a] - 1, index=levels.index[a:b])
+
+    # --- Timeline alignment (engine) ---
+
+    def aligned(self, timeline, base_date=None) -> dict:
+        """
+        Benchmarks aligned to a trading timeline, as NumPy arrays indexed by
+        day number (read-only; a new dict per call):
+          selic_daily      - daily SELIC rate (same convention as DataProvider.get_selic_daily)
+          selic_cumulative - cumulative SELIC growth factor up to each day
+          ibov             - IBOV normalized to base_date (0.0 when unavailable)
+          ipca             - cumulative IPCA factor since base_date (1.0 when unavailable)
+        """
+        dates = pd.DatetimeIndex(timeline)
+        if base_date is None:
+            base_date = dates[0] if len(dates) else None
+        base = pd.Timestamp(base_date) if base_date is not None else None
+        version = self._refresh()
+        key = ("aligned", version, base.value if base is not None else None) + self._dates_key(dates)
+        return dict(self._memo(key, lambda: self._align(dates, base)))
+
+    def _align(self, dates: pd.DatetimeIndex, base: Optional[pd.Timestamp]) -> dict:
+        n = len(dates)
+        base_index = pd.DatetimeIndex([base]) if base is not None else None
+
+        # 1. SELIC: as-of annual rate -> daily rate
+        selic = self._levels.get('SELIC_Rate')
+        if selic is None:
+            selic_daily = np.full(n, SELIC_FALLBACK_DAILY)
+        else:
+            pos = selic.asof_rows(dates)
+            selic_daily = np.where(pos >= 0, selic.daily_rates[np.maximum(pos, 0)], 0.0)
+        selic_cumulative = np.cumprod(1 + selic_daily)
+
+        # 2. IBOV: index points normalized to the base date
+        ibov_norm = np.zeros(n)
+        ibov = self._levels.get('IBOV')
+        if ibov is not None and base is not None:
+            base_pos = ibov.asof_rows(base_index)[0]
+            ibov_start = ibov.values[base_pos] if base_pos >= 0 else 0
+            if ibov_start > 0:
+                pos = ibov.asof_rows(dates)
+                ibov_norm = np.where(pos >= 0, ibov.values[np.maximum(pos, 0)] / ibov_start, 0.0)
+
+        # 3. IPCA: compounded level as-of each day over the level as-of the base date
+        ipca_factor = np.ones(n)
+        ipca = self._levels.get('IPCA')
+        if ipca is not None and base is not None:
+            levels = np.r_[1.0, ipca.after]
+            base_level = levels[ipca.asof_rows(base_index)[0] + 1]
+            ipca_factor = levels[ipca.asof_rows(dates) + 1] / base_level
+
+        arrays = {
+            "selic_daily": selic_daily,
+            "selic_cumulative": selic_cumulative,
+            "ibov": ibov_norm,
+            "ipca": ipca_factor,
+        }
+        for array in arrays.values():
+            array.flags.writeable = False
+        return arrays
@@ -0,0 +1,204 @@
+import os
+import json
+import logging
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("TradingCalendar")
+
+# Repository data directory, independent of the working directory
+B3_HOLIDAYS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "b3_holidays.json")
+CALENDAR_FIRST_YEAR = 2000
+CALENDAR_LAST_YEAR = 2035
+
+# rebalance_period -> period used to find boundaries
+PERIOD_FREQUENCIES = {
+    'monthly': 'month',
+    'quarterly': 'quarter',
+    'yearly': 'year',
+}
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def generate_b3_holidays(first_year=CALENDAR_FIRST_YEAR, last_year=CALENDAR_LAST_YEAR) -> dict:
+    """
+    B3 non-trading weekdays: national holidays, Carnival, Good Friday, Corpus
+    Christi, Christmas/New Year's Eve and, until 2021, the São Paulo municipal
+    holidays (B3 has opened on them since 2022; Nov 20 is national from 2024).
+    """
+    holidays = {}
+    for year in range(first_year, last_year + 1):
+        easter = _easter(year)
+        entries = {
+            date(year, 1, 1): "Confraternização Universal",
+            easter - timedelta(days=48): "Carnaval",
+            easter - timedelta(days=47): "Carnaval",
+            easter - timedelta(days=2): "Sexta-feira Santa",
+            date(year, 4, 21): "Tiradentes",
+            date(year, 5, 1): "Dia do Trabalho",
+            easter + timedelta(days=60): "Corpus Christi",
+            date(year, 9, 7): "Independência",
+            date(year, 10, 12): "Nossa Senhora Aparecida",
+            date(year, 11, 2): "Finados",
+            date(year, 11, 15): "Proclamação da República",
+            date(year, 12, 24): "Véspera de Natal (sem pregão)",
+            date(year, 12, 25): "Natal",
+            date(year, 12, 31): "Último dia do ano (sem pregão)",
+        }
+        if year <= 2021:
+            entries[date(year, 1, 25)] = "Aniversário de São Paulo"
+            entries[date(year, 7, 9)] = "Revolução Constitucionalista"
+        # Municipal holiday in São Paulo since 2004; national holiday since 2024
+        if 2004 <= year <= 2021 or year >= 2024:
+            entries[date(year, 11, 20)] = "Consciência Negra"
+        for day, name in entries.items():
+            if day.weekday() < 5:
+                holidays[day.isoformat()] = name
+    return dict(sorted(holidays.items()))
+
+
+def write_b3_holidays(path=B3_HOLIDAYS_PATH, first_year=CALENDAR_FIRST_YEAR, last_year=CALENDAR_LAST_YEAR):
+    """Persists the generated holiday table."""
+    payload = {
+        "first_year": first_year,
+        "last_year": last_year,
+        "holidays": generate_b3_holidays(first_year, last_year),
+    }
+    with open(path, "w") as fh:
+        json.dump(payload, fh, indent=2, ensure_ascii=False)
+    return payload
+
+
+class TradingCalendar:
+    """
+    B3 trading-session calendar.
+
+    Sessions are precomputed once as a sorted datetime64[D] array, so date ->
+    ordinal is a dict lookup (or one searchsorted for arrays), business-day
+    arithmetic is `np.busday_offset` with the holiday table, and month/quarter/
+    year boundaries are precomputed boolean masks over the sessions.
+    """
+
+    def __init__(self, holidays, first_year=CALENDAR_FIRST_YEAR, last_year=CALENDAR_LAST_YEAR):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.holidays = np.array(sorted(holidays), dtype='datetime64[D]')
+        self.busdaycal = np.busdaycalendar(weekmask='1111100', holidays=self.holidays)
+
+        start = np.datetime64(f"{first_year}-01-01", 'D')
+        end = np.datetime64(f"{last_year + 1}-01-01", 'D')
+        days = np.arange(start, end, dtype='datetime64[D]')
+        self.sessions = days[np.is_busday(days, busdaycal=self.busdaycal)]
+        self.session_ordinals = {day: i for i, day in enumerate(self.sessions.tolist())}
+
+        months = self.sessions.astype('datetime64[M]').astype(np.int64)
+        new_month = np.r_[True, months[1:] != months[:-1]]
+        self._period_starts = {
+            'month': new_month,
+            'quarter': new_month & np.r_[True, (months[1:] // 3) != (months[:-1] // 3)],
+            'year': new_month & np.r_[True, (months[1:] // 12) != (months[:-1] // 12)],
+        }
+
+    @classmethod
+    def load(cls, path=B3_HOLIDAYS_PATH) -> "TradingCalendar":
+        """
+        Loads the persisted holiday table, generating it in memory when missing
+        or invalid (only `write_b3_holidays` / `python -m backtest.calendar`
+        write the file).
+        """
+        payload = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as fh:
+                    payload = json.load(fh)
+            except (OSError, ValueError) as exc:
+                logger.warning(f"Invalid holiday table {path}: {exc}. Regenerating in memory.")
+        if payload is None:
+            payload = {
+                "first_year": CALENDAR_FIRST_YEAR,
+                "last_year": CALENDAR_LAST_YEAR,
+                "holidays": generate_b3_holidays(),
+            }
+        return cls(payload["holidays"].keys(), payload["first_year"], payload["last_year"])
+
+    # --- Lookups ---
+
+    @staticmethod
+    def _day(value) -> np.datetime64:
+        return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+    def is_session(self, value) -> bool:
+        return self._day(value).item() in self.session_ordinals
+
+    def ordinal(self, value) -> int:
+        """Session number of a trading day (KeyError when not a session)."""
+        return self.session_ordinals[self._day(value).item()]
+
+    def ordinals(self, dates) -> np.ndarray:
+        """Vectorized ordinal of the latest session on or before each date (-1 before the calendar)."""
+        values = np.asarray(pd.DatetimeIndex(dates), dtype='datetime64[D]')
+        return np.searchsorted(self.sessions, values, side='right') - 1
+
+    def sessions_in_range(self, start, end) -> pd.DatetimeIndex:
+        """Trading sessions in [start, end] (inclusive)."""
+        lo = np.searchsorted(self.sessions, self._day(start), side='left')
+        hi = np.searchsorted(self.sessions, self._day(end), side='right')
+        return pd.DatetimeIndex(self.sessions[lo:hi].astype('datetime64[ns]'))
+
+    def offset(self, dates, sessions: int, roll='forward'):
+        """Business-day arithmetic: move each date by `sessions` trading days."""
+        values = np.asarray(pd.DatetimeIndex(np.atleast_1d(dates)), dtype='datetime64[D]')
+        shifted = np.busday_offset(values, sessions, roll=roll, busdaycal=self.busdaycal)
+        return pd.DatetimeIndex(shifted.astype('datetime64[ns]'))
+
+    def count(self, start, end) -> int:
+        """Number of sessions in [start, end)."""
+        return int(np.busday_count(self._day(start), self._day(end), busdaycal=self.busdaycal))
+
+    def period_starts(self, frequency: str, start=None, end=None) -> pd.DatetimeIndex:
+        """First session of each month/quarter/year within [start, end]."""
+        mask = self._period_starts[frequency]
+        sessions = self.sessions[mask]
+        if start is not None:
+            sessions = sessions[sessions >= self._day(start)]
+        if end is not None:
+            sessions = sessions[sessions <= self._day(end)]
+        return pd.DatetimeIndex(sessions.astype('datetime64[ns]'))
+
+    def is_period_start(self, dates, frequency: str) -> np.ndarray:
+        """Boolean mask: which of `dates` open a new month/quarter/year."""
+        values = np.asarray(pd.DatetimeIndex(dates), dtype='datetime64[D]')
+        pos = np.searchsorted(self.sessions, values)
+        valid = (pos < len(self.sessions))
+        valid[valid] = self.sessions[pos[valid]] == values[valid]
+        out = np.zeros(len(values), dtype=bool)
+        out[valid] = self._period_starts[frequency][pos[valid]]
+        return out
+
+
+@lru_cache(maxsize=None)
+def get_trading_calendar(path=B3_HOLIDAYS_PATH) -> TradingCalendar:
+    """Process-wide cached calendar shared by every component."""
+    return TradingCalendar.load(path)
+
+
+if __name__ == "__main__":
+    payload = write_b3_holidays()
+    print(f"Saved {len(payload['holidays'])} B3 holidays to {B3_HOLIDAYS_PATH}")
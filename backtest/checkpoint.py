@@ -0,0 +1,97 @@
+import json
+from dataclasses import dataclass, asdict
+from typing import Dict
+
+import pandas as pd
+
+from backtest.domain import StrategyConfigRequest
+
+CHECKPOINT_VERSION = 2
+
+
+@dataclass
+class BacktestCheckpoint:
+    """
+    Compact, JSON-serializable state of a BacktestEngine run after `as_of`.
+
+    Holds what the next session depends on: the (possibly mutated) config,
+    cash, holdings, total invested, rebalance counter, blacklist (inside the
+    config), the cumulative SELIC factor of the benchmark curve and the
+    flow-neutral growth (CAGR) with the valuation it continues from. History and
+    trade log are not stored; only the number of trades so far.
+    """
+    config: dict
+    first_session: str
+    as_of: str
+    cash: float
+    holdings: Dict[str, dict]
+    total_invested: float
+    days_since_rebalance: int
+    selic_factor: float
+    trade_count: int
+    twr_growth: float = 1.0
+    start_value: float = 0.0
+    version: int = CHECKPOINT_VERSION
+
+    @classmethod
+    def capture(cls, engine) -> "BacktestCheckpoint":
+        holdings = {
+            ticker: {key: (int(value) if key == 'quantity' else float(value)) for key, value in holding.items()}
+            for ticker, holding in engine.portfolio.holdings.items()
+        }
+        return cls(
+            config=engine.config.model_dump(),
+            first_session=pd.Timestamp(engine.first_session).isoformat(),
+            as_of=pd.Timestamp(engine.last_session).isoformat(),
+            cash=float(engine.portfolio.cash),
+            holdings=holdings,
+            total_invested=float(engine.total_invested),
+            days_since_rebalance=int(engine.days_since_rebalance),
+            selic_factor=float(engine.selic_factor),
+            trade_count=engine.prior_trades + len(engine.portfolio.transactions),
+            twr_growth=float(engine.twr_growth),
+            start_value=float(engine.start_value),
+        )
+
+    def restore(self, engine):
+        """Loads this state into an engine (fresh portfolio, empty history and trade log)."""
+        if self.version != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {self.version} (expected {CHECKPOINT_VERSION}).")
+        engine.config = StrategyConfigRequest(**self.config)
+        engine.portfolio = engine.new_portfolio(engine.config.initial_capital)
+        engine.portfolio.cash = self.cash
+        engine.portfolio.set_holdings(self.holdings)
+        engine.total_invested = self.total_invested
+        engine.days_since_rebalance = self.days_since_rebalance
+        engine.selic_factor = self.selic_factor
+        engine.prior_trades = self.trade_count
+        engine.twr_growth = self.twr_growth
+        engine.start_value = self.start_value
+        engine.first_session = pd.Timestamp(self.first_session)
+        engine.last_session = pd.Timestamp(self.as_of)
+
+    # --- Serialization ---
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BacktestCheckpoint":
+        return cls(**data)
+
+    def dumps(self) -> str:
+        # repr-based float encoding round-trips exactly
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, payload: str) -> "BacktestCheckpoint":
+        return cls.from_dict(json.loads(payload))
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path: str) -> "BacktestCheckpoint":
+        with open(path, "r") as f:
+            return cls.loads(f.read())
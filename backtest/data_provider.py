@@ -1,24 +1,44 @@
 
 import pandas as pd
+import numpy as np
 import json
 import os
+import hashlib
 import logging
 from datetime import datetime
 from collections import defaultdict
 import ipeadatapy as ip
 
+from backtest.panel import PricePanel, FundamentalsPanel
+from backtest.calendar import get_trading_calendar
+from backtest.benchmark import BenchmarkService
+from etl.price_store import PriceStore, iter_price_history_json
+
 # Configure Logging
 logger = logging.getLogger("BacktestDataProvider")
 
 class DataProvider:
-    def __init__(self, data_path="web/public/data.json", price_path="data/processed/price_history.json"):
+    # Extra history kept before start_date so as-of/staleness checks on day one have quotes
+    PRICE_LOOKBACK_DAYS = 31
+
+    def __init__(self, data_path="web/public/data.json", price_path="data/processed/price_history.json",
+                 price_store_path="data/processed/price_store", price_lookback_days=PRICE_LOOKBACK_DAYS):
         self.data_path = data_path
         self.price_path = price_path
+        self.price_store = PriceStore(price_store_path)
+        self.price_lookback_days = price_lookback_days
         self.financials_data = {}
         self.prices_data = {}
         self.benchmarks = {}
+        # Precomputed benchmark levels and timeline alignments (see BenchmarkService)
+        self.benchmark_service = BenchmarkService(self)
         self.assets_list = []
         self.price_meta = {}
+        self.price_panel = PricePanel.empty()
+        self.fundamentals_panel = FundamentalsPanel.empty()
+        self._financials_cache = {}
+        self._fingerprint = None
+        self.calendar = get_trading_calendar()
         self.data_quality_report = {
             "missing": defaultdict(list),
             "zero": defaultdict(list),
@@ -29,12 +49,64 @@ class DataProvider:
             "total_price_tickers": 0,
         }
         
-    def load_data(self):
-        """Loads processed asset data and price history."""
+    # Read-only snapshot (panels + benchmarks) shared by worker processes
+    SNAPSHOT_PRICES_DIR = "prices"
+    SNAPSHOT_FUNDAMENTALS_DIR = "fundamentals"
+    SNAPSHOT_BENCHMARKS_FILE = "benchmarks.pkl"
+
+    def save_snapshot(self, directory):
+        """
+        Persists what the engine reads (price and fundamentals panels, assets
+        list, benchmarks) so other processes can attach without reloading.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.price_panel.save(os.path.join(directory, self.SNAPSHOT_PRICES_DIR))
+        self.fundamentals_panel.save(os.path.join(directory, self.SNAPSHOT_FUNDAMENTALS_DIR))
+        pd.to_pickle({"assets_list": self.assets_list, "benchmarks": self.benchmarks},
+                     os.path.join(directory, self.SNAPSHOT_BENCHMARKS_FILE))
+
+    @classmethod
+    def from_snapshot(cls, directory, mmap_mode='r'):
+        """Provider backed by a saved snapshot; panel matrices are memory-mapped read-only."""
+        provider = cls()
+        provider.price_panel = PricePanel.load(os.path.join(directory, cls.SNAPSHOT_PRICES_DIR), mmap_mode)
+        provider.fundamentals_panel = FundamentalsPanel.load(os.path.join(directory, cls.SNAPSHOT_FUNDAMENTALS_DIR), mmap_mode)
+        state = pd.read_pickle(os.path.join(directory, cls.SNAPSHOT_BENCHMARKS_FILE))
+        provider.assets_list = state["assets_list"]
+        provider.benchmarks = state["benchmarks"]
+        return provider
+
+    def fingerprint(self):
+        """
+        Content hash of what a simulation reads: both panels and the benchmark
+        series. Computed once per loaded dataset (reset by load_data and
+        fetch_benchmarks); two providers over the same data share it.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            self.price_panel.update_digest(digest)
+            self.fundamentals_panel.update_digest(digest)
+            for name in sorted(self.benchmarks):
+                series = self.benchmarks[name]
+                digest.update(name.encode())
+                digest.update(np.asarray(series.index, dtype='datetime64[ns]').tobytes())
+                digest.update(np.asarray(series.values, dtype=float).tobytes())
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def load_data(self, start_date=None, end_date=None, tickers=None):
+        """
+        Loads processed asset data and price history.
+        When start_date/end_date are given only prices in
+        [start_date - price_lookback_days, end_date] are materialized;
+        `tickers` restricts the price universe to a whitelist.
+        """
         self.financials_data = {}
         self.prices_data = {}
         self.assets_list = []
         self.price_meta = {}
+        self._financials_cache = {}
+        self._fingerprint = None
         # Reset report
         self.data_quality_report = {
             "missing": defaultdict(list),
@@ -97,66 +169,33 @@ class DataProvider:
         else:
             logger.error(f"Financials file not found: {self.data_path}")
 
-        # 2. Load Prices (Daily)
-        if os.path.exists(self.price_path):
+        # 2. Load Prices (Daily): Parquet store is canonical, JSON is the legacy fallback
+        window_start, window_end = self._price_window(start_date, end_date)
+        if self.price_store.exists():
             try:
-                with open(self.price_path, 'r') as f:
-                    raw_prices = json.load(f)
-
-                count = 0
-                for ticker, payload in raw_prices.items():
-                    records = []
-                    meta = {}
-
-                    if isinstance(payload, dict):
-                        records = payload.get("prices") or payload.get("data") or payload.get("records") or []
-                        meta = payload.get("meta") or {}
-                    elif isinstance(payload, list):
-                        records = payload
-                    else:
-                        continue
-
-                    if not records:
-                        self.data_quality_report["tickers_without_prices_history"].append(ticker)
-                        continue
-
-                    df = pd.DataFrame(records)
-                    if df.empty:
-                        self.data_quality_report["tickers_without_prices_history"].append(ticker)
-                        continue
-
-                    df.columns = [str(c).lower() for c in df.columns]
-
-                    # Normalize datetime column
-                    date_column = None
-                    if 'date' in df.columns:
-                        date_column = 'date'
-                    elif 'datetime' in df.columns:
-                        date_column = 'datetime'
-                    elif 'timestamp' in df.columns:
-                        date_column = 'timestamp'
-
-                    if date_column:
-                        df[date_column] = pd.to_datetime(df[date_column])
-                        df.set_index(date_column, inplace=True)
-                        df.sort_index(inplace=True)
-                    else:
-                        logger.warning(f"{ticker}: price records missing date field.")
-                        self.data_quality_report["tickers_without_prices_history"].append(ticker)
-                        continue
-
-                    clean_ticker = ticker.replace('.SA', '').upper()
-                    self.prices_data[clean_ticker] = df
-                    self.price_meta[clean_ticker] = meta
-                    count += 1
-
-                self.data_quality_report["total_price_tickers"] = count
-                self.assets_list = sorted(self.prices_data.keys())
-                logger.info(f"Loaded prices for {count} tickers. Active universe: {len(self.assets_list)}")
+                self._load_prices_from_store(window_start, window_end, tickers)
+            except Exception as e:
+                logger.error(f"Error loading price store: {e}")
+        elif os.path.exists(self.price_path):
+            try:
+                self._load_prices_from_json(window_start, window_end, tickers)
             except Exception as e:
                 logger.error(f"Error loading prices: {e}")
         else:
-            logger.error(f"Price history file not found: {self.price_path}")
+            logger.error(f"Price history not found: {self.price_store.root} / {self.price_path}")
+
+        count = len(self.prices_data)
+        self.data_quality_report["total_price_tickers"] = count
+        self.assets_list = sorted(self.prices_data.keys())
+        self.price_panel = PricePanel.from_frames(self.prices_data)
+        logger.info(f"Loaded prices for {count} tickers. Active universe: {len(self.assets_list)}")
+
+        # 3. Point-in-time fundamentals aligned to the tradable universe
+        self.fundamentals_panel = FundamentalsPanel.from_frames(
+            {ticker: self.get_financials_data(ticker) for ticker in self.assets_list},
+            self.assets_list,
+            self.price_panel.dates,
+        )
 
         # Match coverage between financials and prices
         if self.financials_data:
@@ -174,15 +213,58 @@ class DataProvider:
         if self.data_quality_report["tickers_without_financials"]:
             logger.warning(f"{len(self.data_quality_report['tickers_without_financials'])} tickers sem registros financeiros no arquivo processado.")
 
+    def _price_window(self, start_date, end_date):
+        """Date window to materialize: [start_date - lookback, end_date] (None = unbounded)."""
+        window_start = None
+        window_end = None
+        if start_date is not None:
+            window_start = pd.to_datetime(start_date) - pd.Timedelta(days=self.price_lookback_days)
+        if end_date is not None:
+            window_end = pd.to_datetime(end_date)
+        return window_start, window_end
+
+    def _load_prices_from_store(self, window_start, window_end, tickers=None):
+        """Reads the Parquet price store with column projection and date pushdown."""
+        store_tickers = self.price_store.tickers()
+        if tickers is not None:
+            wanted = {str(t).upper().replace('.SA', '') for t in tickers}
+            store_tickers = [t for t in store_tickers if t.upper().replace('.SA', '') in wanted]
+        frames = self.price_store.read(tickers=store_tickers, start=window_start, end=window_end, columns=PricePanel.FIELDS)
+        store_meta = self.price_store.read_meta()
+
+        for ticker in store_tickers:
+            df = frames.get(ticker)
+            if df is None or df.empty:
+                self.data_quality_report["tickers_without_prices_history"].append(ticker)
+                continue
+            clean_ticker = ticker.replace('.SA', '').upper()
+            self.prices_data[clean_ticker] = df
+            self.price_meta[clean_ticker] = store_meta.get(ticker, {})
+
+    def _load_prices_from_json(self, window_start, window_end, tickers=None):
+        """Legacy loader for data/processed/price_history.json, streamed one ticker at a time."""
+        for ticker, df, meta in iter_price_history_json(self.price_path, tickers=tickers):
+            if df.empty:
+                self.data_quality_report["tickers_without_prices_history"].append(ticker)
+                continue
+
+            df = df.set_index('date')
+            if window_start is not None or window_end is not None:
+                df = df.loc[window_start:window_end]
+                if df.empty:
+                    self.data_quality_report["tickers_without_prices_history"].append(ticker)
+                    continue
+
+            clean_ticker = ticker.replace('.SA', '').upper()
+            self.prices_data[clean_ticker] = df[list(PricePanel.FIELDS)]
+            self.price_meta[clean_ticker] = meta
+
     def get_price_data(self, ticker):
         """Returns full daily price DataFrame."""
         return self.prices_data.get(ticker, pd.DataFrame())
 
     def get_financials_data(self, ticker):
         """Returns full financials DataFrame (quarterly)."""
-        if not hasattr(self, '_financials_cache'):
-            self._financials_cache = {}
-            
         if ticker in self._financials_cache:
             return self._financials_cache[ticker]
 
@@ -196,27 +278,79 @@ class DataProvider:
             df.drop_duplicates(subset=['date'], keep='last', inplace=True)
             df.set_index('date', inplace=True)
             df.sort_index(inplace=True)
-            
+            self._add_derived_indicators(df)
+
         self._financials_cache[ticker] = df
         return df
 
+    @staticmethod
+    def _add_derived_indicators(df):
+        """
+        Adds the rule indicators that are not in data.json as columns, computed once per ticker.
+        Values are those of the latest report, so an as-of row lookup is all rules need:
+          consecutive_profits - run of consecutive reports with net_income > 0, in years (/4)
+          revenue_cagr_5y     - revenue CAGR (%) since the first report (NaN with < 4 reports)
+          net_debt_ebitda, p_vp, net_margin_avg_5y - ratios, only when the column is absent
+        """
+        if df.empty:
+            return df
+
+        def column(name):
+            return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+
+        n = len(df)
+        if 'consecutive_profits' not in df.columns:
+            if 'net_income' in df.columns:
+                positive = column('net_income') > 0
+                rows = np.arange(n)
+                last_loss = np.maximum.accumulate(np.where(positive, -1, rows))
+                df['consecutive_profits'] = (rows - last_loss) / 4
+            else:
+                df['consecutive_profits'] = 0.0
+
+        if 'revenue_cagr_5y' not in df.columns:
+            cagr = np.full(n, np.nan)
+            if 'revenue' in df.columns:
+                revenue = column('revenue')
+                years = (df.index - df.index[0]).days.to_numpy() / 365.25
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    cagr = ((revenue / revenue[0]) ** (1 / years) - 1) * 100
+                cagr[(revenue[0] <= 0) | (revenue <= 0) | (years < 1)] = 0.0
+                cagr[:3] = np.nan
+            df['revenue_cagr_5y'] = cagr
+
+        if 'net_debt_ebitda' not in df.columns and {'net_debt', 'ebit'} <= set(df.columns):
+            ebit = column('ebit')
+            with np.errstate(divide='ignore', invalid='ignore'):
+                df['net_debt_ebitda'] = np.where(ebit != 0, column('net_debt') / ebit, np.nan)
+
+        if 'p_vp' not in df.columns and {'p_l', 'roe'} <= set(df.columns):
+            # P/VP = P/L * ROE
+            df['p_vp'] = column('p_l') * column('roe')
+
+        if 'net_margin_avg_5y' not in df.columns:
+            df['net_margin_avg_5y'] = column('avg_margin_5y') if 'avg_margin_5y' in df.columns else 0.0
+
+        return df
+
     def get_latest_price_row(self, ticker, date):
-        """Returns price row at date (or nearest before)."""
-        df = self.get_price_data(ticker)
-        if df.empty: return None
-        
-        # Check exact match first
-        if date in df.index:
-            return df.loc[date]
-            
-        # AsOf lookup for latest available price
-        # Ensure index is sorted
-        idx = df.index.asof(date)
-        if pd.isna(idx): return None
-        
-        # Check staleness? If price is 1 year old, maybe don't return?
-        # For backtest, we assume last price holds or system handles gaps.
-        return df.loc[idx]
+        """Returns price row at date (or nearest before), named by its quote date."""
+        return self.price_panel.row(ticker, date)
+
+    def get_price(self, ticker, date):
+        """Returns (close, age_in_days) of the latest quote on or before date, or None."""
+        found = self.price_panel.lookup(ticker, date)
+        if found is None:
+            return None
+        price, price_date = found
+        return price, (pd.Timestamp(date) - price_date).days
+
+    def get_prices(self, tickers, date, field="close"):
+        """
+        Batch as-of lookup over the price panel.
+        Returns (prices, ages) NumPy vectors aligned with tickers; NaN where no quote exists.
+        """
+        return self.price_panel.get_prices(tickers, date, field)
 
     def get_latest_financials_row(self, ticker, date):
         """Returns metrics from latest financial report strictly BEFORE or ON date."""
@@ -227,12 +361,22 @@ class DataProvider:
         if pd.isna(idx): return None
         return df.loc[idx]
     
+    def get_fundamentals(self, date):
+        """
+        Cross-section of the latest report of every asset in assets_list as of date
+        (one panel row read). Exposes per-indicator vectors, report ages in days and
+        Series-like per-ticker rows.
+        """
+        return self.fundamentals_panel.snapshot(date)
+
     def get_data_quality_report(self):
         """Returns summary collected during load_data."""
         return self.data_quality_report
         
     def fetch_benchmarks(self):
         """Fetches IBOV, SELIC, and IPCA history."""
+        self._fingerprint = None
+        self.benchmark_service.invalidate()
         # Reuse logic from SelicAnalyzer or fetch fresh
         # For simplicity and speed in backtest, we might want to cache this too.
         # But let's fetch for now using ipeadatapy as user requested standard.
@@ -276,38 +420,33 @@ class DataProvider:
         return self.benchmarks.get(benchmark_name, pd.Series())
 
     def get_market_timeline(self, start_date, end_date):
-        """Returns list of trading days between start and end (inclusive)."""
-        # Prefer IBOV index as source of truth for "Market Open"
-        ibov = self.benchmarks.get('IBOV')
-        
-        if ibov is None or ibov.empty:
-            # Fallback to B3 calendar logic or just Business Days if IBOV missing
-            logger.warning("IBOV data missing for timeline. Using Business Days fallback.")
-            return pd.date_range(start=start_date, end=end_date, freq='B')
-            
-        # Filter IBOV dates
-        mask = (ibov.index >= pd.to_datetime(start_date)) & (ibov.index <= pd.to_datetime(end_date))
-        timeline = ibov.index[mask].sort_values().tolist()
-        
-        if timeline:
-             # Refine with Stock Data if available
-             market_proxy_ticker = next((t for t in ['VALE3', 'PETR4', 'ITUB4'] if t in self.prices_data), None)
-             
-             if market_proxy_ticker:
-                 proxy_df = self.prices_data[market_proxy_ticker]
-                 proxy_dates = proxy_df.index
-                 
-                 # Intersect with current timeline
-                 timeline_idx = pd.DatetimeIndex(timeline)
-                 valid_idx = timeline_idx.intersection(proxy_dates)
-                 
-                 timeline = valid_idx.sort_values().tolist()
-
-             # Manual Holiday check (Jan 1st)
-             if timeline and timeline[0].month == 1 and timeline[0].day == 1:
-                 timeline = [d for d in timeline if not (d.month == 1 and d.day == 1)]
-        
-        return timeline
+        """Returns the B3 trading sessions between start and end (inclusive)."""
+        start_date = pd.to_datetime(start_date)
+        end_date = pd.to_datetime(end_date)
+
+        # Sessions after the last quote would only age every position into a false delisting
+        if len(self.price_panel.dates):
+            last_quote = pd.Timestamp(self.price_panel.dates[-1])
+            if last_quote < end_date:
+                logger.info(f"Timeline capped at last available quote {last_quote.date()} (requested {end_date.date()}).")
+                end_date = last_quote
+
+        calendar = self.calendar
+        if start_date.year < calendar.first_year or end_date.year > calendar.last_year:
+            logger.warning(f"Timeline {start_date.date()}..{end_date.date()} exceeds the B3 calendar "
+                           f"({calendar.first_year}-{calendar.last_year}); out-of-range days are dropped.")
+        return calendar.sessions_in_range(start_date, end_date)
+
+    def get_benchmark_arrays(self, timeline, base_date=None):
+        """
+        Aligns the benchmarks to a trading timeline (memoized by BenchmarkService.aligned).
+        Returns read-only NumPy arrays indexed by day number:
+          selic_daily      - daily SELIC rate (same convention as get_selic_daily)
+          selic_cumulative - cumulative SELIC growth factor up to each day
+          ibov             - IBOV normalized to base_date (0.0 when unavailable)
+          ipca             - cumulative IPCA factor since base_date (1.0 when unavailable)
+        """
+        return self.benchmark_service.aligned(timeline, base_date)
 
     def get_selic_daily(self, date):
         """Returns daily SELIC factor (e.g. 0.0004 for 0.04%) for a given date."""
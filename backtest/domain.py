@@ -1,7 +1,9 @@
-from typing import List, Optional, Union
+from typing import Any, List, Optional, Union
 from pydantic import BaseModel
 from dataclasses import dataclass, field
 
+from backtest.history import HistoryRecorder
+
 # --- Domain Models ---
 
 class CriteriaItem(BaseModel):
@@ -67,4 +69,15 @@ class BacktestResult:
     trade_log: List[dict]
     final_holdings: List[dict] = field(default_factory=list)
     total_invested: float = 0.0
+    history: HistoryRecorder = field(default_factory=HistoryRecorder)
+    metrics: Any = None  # backtest.metrics.PerformanceMetrics
+    flows: Any = None    # contributions by history row (see backtest.metrics.period_returns)
+
+
+@dataclass
+class BacktestProgress:
+    """Partial result streamed by BacktestEngine.run_iter: the sessions simulated since the last chunk."""
+    processed: int
+    total: int
+    date: Any
     history: List[dict] = field(default_factory=list)
@@ -0,0 +1,179 @@
+import io
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.history import HistoryRecorder, VALUE_COLUMNS, BENCHMARK_COLUMNS
+
+DEFAULT_MIN_POINTS = 256
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: positions of `threshold` points keeping the
+    visual shape of y(x). The first and last points are always kept; each
+    bucket in between keeps the point forming the largest triangle with the
+    previously kept point and the average of the next bucket.
+    """
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:max(threshold, 0)])
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Inner points [1, n - 1) split into threshold - 2 buckets; the last point closes the series
+    edges = np.r_[(np.linspace(0, n - 2, threshold - 1)).astype(np.int64) + 1, n]
+    # Bucket averages from prefix sums
+    sum_x, sum_y = np.r_[0.0, np.cumsum(x)], np.r_[0.0, np.cumsum(y)]
+    counts = edges[1:] - edges[:-1]
+    avg_x = (sum_x[edges[1:]] - sum_x[edges[:-1]]) / counts
+    avg_y = (sum_y[edges[1:]] - sum_y[edges[:-1]]) / counts
+
+    # The scan is sequential and buckets are small: plain floats beat per-bucket array ops
+    xs, ys = x.tolist(), y.tolist()
+    bounds, next_x, next_y = edges.tolist(), avg_x.tolist(), avg_y.tolist()
+    out = [0] * threshold
+    out[-1] = n - 1
+    kept = 0
+    for i in range(threshold - 2):
+        ax, ay = xs[kept], ys[kept]
+        dx, dy = ax - next_x[i + 1], next_y[i + 1] - ay
+        best, best_area = bounds[i], -1.0
+        for j in range(bounds[i], bounds[i + 1]):
+            area = abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy)
+            if area > best_area:
+                best, best_area = j, area
+        kept = out[i + 1] = best
+    return np.array(out, dtype=np.int64)
+
+
+def minmax_indices(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Positions of the minimum and maximum of each of `buckets` equal slices (plus both ends), sorted."""
+    n = len(y)
+    if 2 * buckets + 2 >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        segment = y[lo:hi]
+        keep += [lo + int(np.argmin(segment)), lo + int(np.argmax(segment))]
+    return np.unique(keep)
+
+
+class MultiResolutionHistory:
+    """
+    Equity curve (history columns) with precomputed downsampled levels, for
+    charts that must not receive every session of long runs.
+
+    Level 0 is every row; each next level keeps half of the previous one's
+    points (LTTB on total_value, or min/max buckets) until `min_points`.
+    `query` returns the rows of a date range within a point budget from the
+    finest level that fits, so the cost and the payload depend on the
+    budget, not on the length of the run. Range ends are always included.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], levels: Optional[List[np.ndarray]] = None,
+                 method: str = "lttb", min_points: int = DEFAULT_MIN_POINTS):
+        if method not in ("lttb", "minmax"):
+            raise ValueError(f"Unknown downsampling method {method!r}")
+        self.columns = columns
+        self.method = method
+        self.min_points = min_points
+        self.levels = levels if levels is not None else self._build_levels()
+
+    @classmethod
+    def from_recorder(cls, history: HistoryRecorder, extra: Optional[Dict[str, np.ndarray]] = None,
+                      method: str = "lttb", min_points: int = DEFAULT_MIN_POINTS) -> "MultiResolutionHistory":
+        """Columns of a run's history (benchmarks when filled for every row) plus `extra` aligned columns."""
+        names = ("date", "holdings_count") + VALUE_COLUMNS
+        if len(history) and history.benchmark_rows >= len(history):
+            names += BENCHMARK_COLUMNS
+        columns = {name: np.array(history.column(name)) for name in names}
+        for name, values in (extra or {}).items():
+            columns[name] = np.asarray(values, dtype=float)
+        return cls(columns, method=method, min_points=min_points)
+
+    def __len__(self):
+        return len(self.columns["date"])
+
+    def _reduce(self, rows: np.ndarray, target: int) -> np.ndarray:
+        """Positions (within rows) of `target` points of the curve over rows."""
+        values = self.columns["total_value"][rows]
+        if self.method == "minmax":
+            return minmax_indices(values, max(1, (target - 2) // 2))
+        days = self.columns["date"][rows].astype('datetime64[D]').astype(np.int64)
+        return lttb_indices(days, values, target)
+
+    def _build_levels(self) -> List[np.ndarray]:
+        rows = np.arange(len(self))
+        levels = [rows]
+        while len(rows) > self.min_points:
+            reduced = rows[self._reduce(rows, len(rows) // 2)]
+            if len(reduced) >= len(rows):
+                break
+            rows = reduced
+            levels.append(rows)
+        return levels
+
+    # --- Queries ---
+
+    def range_rows(self, start=None, end=None):
+        """Row interval [a, b) of the sessions in [start, end]."""
+        dates = self.columns["date"]
+        a = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')) if start is not None else 0
+        b = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')) if end is not None else len(dates)
+        return a, max(a, b)
+
+    def query(self, start=None, end=None, max_points: int = 1000) -> np.ndarray:
+        """Rows to draw the range [start, end] with at most max_points points (at least 2)."""
+        a, b = self.range_rows(start, end)
+        max_points = max(2, max_points)
+        if b - a <= max_points:
+            return np.arange(a, b)
+
+        budget = max_points - 2  # the range ends are added below
+        for level in self.levels[1:] or self.levels:
+            lo, hi = np.searchsorted(level, [a, b])
+            if hi - lo <= budget:
+                rows = level[lo:hi]
+                break
+        else:
+            # Budget below the coarsest level: reduce its slice on the fly (<= min_points rows)
+            rows = level[lo:hi]
+            rows = rows[self._reduce(rows, budget)] if budget > 0 else rows[:0]
+        return np.union1d(rows, [a, b - 1])
+
+    def column(self, name: str, rows: np.ndarray) -> np.ndarray:
+        return self.columns[name][rows]
+
+    def records(self, rows: np.ndarray) -> List[dict]:
+        """History records (same keys as HistoryRecorder.records) of the given rows."""
+        names = [name for name in ("date", "total_value", "cash", "holdings_count") + BENCHMARK_COLUMNS
+                 if name in self.columns]
+        values = [self.columns[name][rows].tolist() for name in names[1:]]
+        dates = list(pd.DatetimeIndex(self.columns["date"][rows]))
+        return [dict(zip(names, row)) for row in zip(dates, *values)]
+
+    # --- Storage ---
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        arrays = {f"column_{name}": values for name, values in self.columns.items()}
+        arrays.update({f"level_{i}": level for i, level in enumerate(self.levels) if i > 0})
+        meta = {"method": self.method, "min_points": self.min_points, "levels": len(self.levels)}
+        np.savez(buffer, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MultiResolutionHistory":
+        with np.load(io.BytesIO(data), allow_pickle=False) as stored:
+            meta = json.loads(stored["meta"].tobytes().decode())
+            columns = {key[len("column_"):]: stored[key] for key in stored.files if key.startswith("column_")}
+            levels = [np.arange(len(columns["date"]))]
+            levels += [stored[f"level_{i}"] for i in range(1, meta["levels"])]
+        return cls(columns, levels, meta["method"], meta["min_points"])
@@ -1,24 +1,69 @@
 import pandas as pd
+import numpy as np
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Tuple, Union
 
-from backtest.domain import StrategyConfigRequest, BacktestResult, CriteriaGroup, CriteriaItem
+from backtest.domain import StrategyConfigRequest, BacktestResult, BacktestProgress, CriteriaGroup, CriteriaItem
 from backtest.portfolio import Portfolio
+from backtest.checkpoint import BacktestCheckpoint
 from backtest.data_provider import DataProvider
+from backtest.calendar import PERIOD_FREQUENCIES
+from backtest.rules import CompiledRules, ScreenCache, top_n
+from backtest.metrics import compute_metrics, period_returns
 
 logger = logging.getLogger("BacktestEngine")
 
 class BacktestEngine:
-    def __init__(self, data_provider: DataProvider):
+    def __init__(self, data_provider: DataProvider, event_driven: bool = False, screen_cache: ScreenCache = None,
+                 portfolio_factory: Callable[[float], Portfolio] = None):
         self.data_provider = data_provider
+        # Optional Portfolio constructor (e.g. rows of a batch's PortfolioBook)
+        self.portfolio_factory = portfolio_factory
+        # Optional cache of entry screens shared by runs over the same provider
+        self.screen_cache = screen_cache
+        # Event-driven mode skips sessions where nothing can trigger (same results as day-by-day)
+        self.event_driven = event_driven
+        self._signals = {}
         self.portfolio = None
         self.config: StrategyConfigRequest = None
+        self.benchmark_arrays = {}
+        self.benchmark_curves = ()  # (ibov, selic, ipca) in capital terms, per session
+        self.rebalance_dates = set()
+        self.entry_rules = CompiledRules()
+        self.exit_rules = CompiledRules()
+        # Run state carried by checkpoints (see checkpoint / resume)
+        self.first_session = None
+        self.last_session = None
+        self.selic_factor = 1.0
+        self.prior_trades = 0
+        self.twr_growth = 1.0  # flow-neutral growth since start_date, through last_session
+        # Contributions by history row (made after that session's snapshot), for the metrics
+        self.contributions = {}
+        self.start_value = None
         
     def run(self, config: StrategyConfigRequest) -> BacktestResult:
         """Executes the backtest simulation."""
+        return self._last(self.run_iter(config))
+
+    def run_iter(self, config: StrategyConfigRequest, chunk_sessions: int = 0) -> Iterator[Union[BacktestProgress, BacktestResult]]:
+        """
+        Generator version of `run`. Every `chunk_sessions` simulated sessions
+        (0: never) it yields a BacktestProgress with the new, benchmark-enriched
+        history rows; the last item is the BacktestResult. Closing the generator
+        early cancels the simulation at the next chunk boundary.
+        """
+        timeline, start_dt, end_dt = self.start(config)
+        yield from self._simulate(timeline, start_dt, end_dt, chunk_sessions)
+
+    def start(self, config: StrategyConfigRequest) -> Tuple[pd.DatetimeIndex, pd.Timestamp, pd.Timestamp]:
+        """
+        Sets up a run of `config` (state, rules, initial portfolio) without
+        simulating any session. Returns (timeline, start_dt, end_dt).
+        """
         self.config = config
-        self.portfolio = Portfolio(config.initial_capital)
+        self.portfolio = self.new_portfolio(config.initial_capital)
+        self.compile_rules()
         
         # Initialize Portfolio from Step 5 (Glass Box)
         # We need to set the date to start_date
@@ -33,13 +78,15 @@ class BacktestEngine:
         timeline = self.data_provider.get_market_timeline(start_dt, end_dt) 
         self.total_invested = config.initial_capital
 
-        # Calculate Rebalance Frequency
-        rebalance_days = 21 # Default Monthly
-        if config.rebalance_period == 'quarterly': rebalance_days = 63
-        elif config.rebalance_period == 'yearly': rebalance_days = 252
-        elif config.rebalance_period == 'none': rebalance_days = 99999
-        
+        # Rebalance on the first session of each new month/quarter/year (never on the first day)
+        self.first_session = timeline[0] if len(timeline) > 0 else None
+        self.rebalance_dates = self.get_rebalance_dates(timeline)
         self.days_since_rebalance = 0
+        self.selic_factor = 1.0
+        self.prior_trades = 0
+        self.twr_growth = 1.0
+        self.contributions = {}
+        self.start_value = config.initial_capital
 
         # Pre-load initial portfolio
         effective_start_dt = timeline[0] if len(timeline) > 0 else start_dt
@@ -47,11 +94,11 @@ class BacktestEngine:
         for item in config.initial_portfolio:
             if item.shares > 0:
                 # Try to get market price at effective start date
-                market_price_row = self.data_provider.get_latest_price_row(item.ticker, effective_start_dt)
+                market_quote = self.data_provider.get_price(item.ticker, effective_start_dt)
                 execution_price = item.price # Fallback to passed price (Mock)
                 
-                if market_price_row is not None:
-                    execution_price = float(market_price_row['close'])
+                if market_quote is not None:
+                    execution_price = market_quote[0]
                     logger.info(f"Initial Buy: Found market price {execution_price} for {item.ticker} on {effective_start_dt}")
                 else:
                     logger.warning(f"Initial Buy: No market price found for {item.ticker} on {effective_start_dt}. Using fallback {execution_price}")
@@ -61,54 +108,117 @@ class BacktestEngine:
                     logger.error(f"Failed to execute initial buy for {item.ticker} (Qty: {item.shares}). Cash: {self.portfolio.cash}")
 
         logger.info(f"Starting simulation from {config.start_date} to {config.end_date} with {config.initial_capital}")
-        
-        # Benchmarks Setup
-        ibov_series = self.data_provider.get_benchmark_data('IBOV')
-        ibov_start = 0
-        if not ibov_series.empty:
-            idx = ibov_series.index.asof(start_dt)
-            if not pd.isna(idx):
-                ibov_start = ibov_series.loc[idx]
-                
-        selic_curve_val = config.initial_capital
+        return timeline, start_dt, end_dt
+
+    def new_portfolio(self, initial_capital: float) -> Portfolio:
+        if self.portfolio_factory is not None:
+            return self.portfolio_factory(initial_capital)
+        return Portfolio(initial_capital, self.data_provider.assets_list)
+
+    def checkpoint(self) -> BacktestCheckpoint:
+        """Full run state after the last simulated session, for `resume`."""
+        if self.portfolio is None or self.last_session is None:
+            raise ValueError("Nothing to checkpoint: run the backtest first.")
+        return BacktestCheckpoint.capture(self)
+
+    def resume(self, checkpoint: BacktestCheckpoint, end_date: str) -> BacktestResult:
+        """
+        Continues a checkpointed run up to end_date. Sessions after the
+        checkpoint match a full rerun from start_date; the result's history and
+        trade log cover only the new sessions, while capital, return and CAGR
+        cover the whole run.
+        """
+        return self._last(self.resume_iter(checkpoint, end_date))
+
+    def resume_iter(self, checkpoint: BacktestCheckpoint, end_date: str,
+                    chunk_sessions: int = 0) -> Iterator[Union[BacktestProgress, BacktestResult]]:
+        """Generator version of `resume` (see `run_iter`)."""
+        checkpoint.restore(self)
+        self.config.end_date = end_date
+        self.contributions = {}
+        self.compile_rules()
+
+        start_dt = pd.to_datetime(self.config.start_date)
+        end_dt = pd.to_datetime(end_date)
+        if not self.data_provider.benchmarks:
+            self.data_provider.fetch_benchmarks()
+
+        timeline = self.data_provider.get_market_timeline(self.last_session + pd.Timedelta(days=1), end_dt)
+        self.rebalance_dates = self.get_rebalance_dates(timeline)
+        logger.info(f"Resuming simulation after {self.last_session.date()} up to {end_date} ({len(timeline)} sessions)")
+        yield from self._simulate(timeline, start_dt, end_dt, chunk_sessions)
+
+    @staticmethod
+    def _last(items):
+        result = None
+        for result in items:
+            pass
+        return result
+
+    def _simulate(self, timeline, start_dt, end_dt, chunk_sessions: int = 0):
+        """Runs the timeline on the current state, yielding progress chunks and then the result."""
+        self.prepare_timeline(timeline, start_dt)
+        history = self.portfolio.history
+
+        def enrich(start, end):
+            # History rows (one per session) get the benchmark curves
+            self.fill_benchmarks(start, end)
+            return BacktestProgress(end, len(timeline), pd.Timestamp(history.dates[end - 1]), history.records(start, end))
+
+        enriched = 0
+        for processed in self.steps(timeline):
+            if chunk_sessions and processed - enriched >= chunk_sessions:
+                yield enrich(enriched, processed)
+                enriched = processed
+
+        if chunk_sessions and enriched < len(history):
+            yield enrich(enriched, len(history))
+        yield self.finish(timeline, start_dt, end_dt)
+
+    def prepare_timeline(self, timeline, start_dt):
+        """Aligns the benchmarks to the timeline and sizes the history for it."""
+        config = self.config
+
+        # Benchmarks Setup: aligned once, then indexed by day number
+        self.benchmark_arrays = self.data_provider.get_benchmark_arrays(timeline, start_dt)
+        # SELIC growth continues from the factor accumulated before this timeline
+        selic_cumulative = np.cumprod(np.r_[self.selic_factor, 1 + self.benchmark_arrays["selic_daily"]])[1:]
+        self.benchmark_arrays["selic_cumulative"] = selic_cumulative
+        self.benchmark_curves = (
+            self.benchmark_arrays["ibov"] * config.initial_capital,
+            config.initial_capital * selic_cumulative,
+            self.benchmark_arrays["ipca"] * config.initial_capital,
+        )
+        self.portfolio.history.reserve(len(timeline))
+
+    def steps(self, timeline) -> Iterator[int]:
+        """Session loop of the configured mode, yielding the number of sessions done."""
+        return self.run_events(timeline) if self.event_driven else self.run_days(timeline)
+
+    def fill_benchmarks(self, start: int, end: int):
+        """Sets the benchmark curves of history rows [start, end)."""
+        ibov, selic, ipca = self.benchmark_curves
+        self.portfolio.history.set_benchmarks(start, end, ibov[start:end], selic[start:end], ipca[start:end])
+
+    def finish(self, timeline, start_dt, end_dt) -> BacktestResult:
+        """Result of the simulated timeline (all of its steps consumed)."""
+        history = self.portfolio.history
+        if len(timeline) > 0:
+            self.last_session = timeline[-1]
+            self.selic_factor = float(self.benchmark_arrays["selic_cumulative"][-1])
+        if history.benchmark_rows < len(history):
+            self.fill_benchmarks(history.benchmark_rows, len(history))
 
-        for date in timeline:
-            self.process_day(date)
-            
-            # Update Benchmarks for History
-            ibov_val = 0
-            if ibov_start > 0 and not ibov_series.empty:
-                 idx = ibov_series.index.asof(date)
-                 if not pd.isna(idx):
-                     curr = ibov_series.loc[idx]
-                     # Adjust for total_invested to be comparable? 
-                     # Standard practice: Normalize to initial capital.
-                     # But total_invested grows with contributions. 
-                     # Comparison should probably be TWR or just indexed to start.
-                     # Let's index to start for simplicity in this chart.
-                     ibov_val = (curr / ibov_start) * config.initial_capital
-
-            # SELIC Accumulation
-            daily_selic = self.data_provider.get_selic_daily(date)
-            selic_curve_val *= (1 + daily_selic)
-
-            # Enrich the history entry created in process_day
-            if self.portfolio.history:
-                self.portfolio.history[-1]['ibov_value'] = ibov_val
-                self.portfolio.history[-1]['selic_value'] = selic_curve_val
-            
-            # Check Entries / Rebalance / Contribution
-            # ... (rest of loop logic)
-            
         # Finalize
         # Get last known prices for valuation
+        valuation_date = self.last_session if self.last_session is not None else end_dt
         final_val = self.portfolio.cash
         final_holdings_list = []
         
         for ticker, holding in self.portfolio.holdings.items():
              # Try get price on last day, else fallback
-             price_row = self.data_provider.get_latest_price_row(ticker, timeline[-1])
-             price = price_row['close'] if price_row is not None else holding.get('current_price', holding['avg_price'])
+             quote = self.data_provider.get_price(ticker, valuation_date)
+             price = quote[0] if quote is not None else self.portfolio.mark_price_of(ticker)
              
              holding_val = holding['quantity'] * price
              final_val += holding_val
@@ -123,72 +233,166 @@ class BacktestEngine:
              })
              
         total_return = (final_val - self.total_invested) / self.total_invested if self.total_invested > 0 else 0
-        years = (end_dt - start_dt).days / 365.25
-        # CAGR based on Total Return (Simple annualized) or IRR?
-        # Creating a simple CAGR of the portfolio value vs invested is tricky with flows.
-        # Approximation: Final / Invested ^ (1/years) - 1 ?? No, because invested changed over time.
-        # User complained about CAGR being function of contributions.
-        # Let's use simple ROI for now as Total Return.
-        # And CAGR: (Final / Initial)^(1/Y) - 1 is standard but wrong with flows.
-        # Let's provide the raw ROI annualized.
-        cagr = ((1 + total_return) ** (1/years)) - 1 if years > 0 and total_return > -1 else 0
-        
+        # Flow-neutral risk/return (TWR, IRR, drawdown, Sortino, win rate) over this history
+        flows = np.zeros(len(history))
+        for row, amount in self.contributions.items():
+            flows[row] = amount
+        metrics = compute_metrics(history, self.portfolio.transactions, flows, self.start_value)
+        # CAGR: annualized time-weighted growth (contributions are not growth) of the whole
+        # run, chained across checkpoints; equals metrics.twr_annualized for a full run
+        returns = period_returns(history.total_value, flows, self.start_value)
+        self.twr_growth = float(np.cumprod(np.r_[self.twr_growth, 1 + returns])[-1])
+        if len(history):
+            # Next session (after a resume) starts from this valuation plus its contribution
+            self.start_value = float(history.total_value[-1] + flows[-1])
+        years = 0
+        if self.first_session is not None and self.last_session is not None:
+            years = (self.last_session - self.first_session).days / 365.25
+        cagr = self.twr_growth ** (1 / years) - 1 if years > 0 and self.twr_growth > 0 else 0.0
+
         return BacktestResult(
             final_capital=final_val,
             total_return=total_return,
             cagr=cagr,
-            max_drawdown=0.0, # TODO
-            sortino_ratio=0.0,
-            win_rate=0.0,
-            total_trades=len(self.portfolio.transactions),
+            max_drawdown=metrics.max_drawdown,
+            sortino_ratio=metrics.sortino_ratio,
+            win_rate=metrics.win_rate,
+            total_trades=self.prior_trades + len(self.portfolio.transactions),
             trade_log=[t for t in self.portfolio.transactions],
             final_holdings=final_holdings_list,
             total_invested=self.total_invested,
-            history=self.portfolio.history
+            history=self.portfolio.history,
+            metrics=metrics,
+            flows=flows,
         )
 
-    def process_day(self, date: datetime):
+    def run_days(self, timeline):
+        """Calls process_day on every session, yielding the number of sessions done."""
+        for day, date in enumerate(timeline):
+            self.process_day(date, day)
+            yield day + 1
+
+    def run_events(self, timeline):
+        """
+        Event-driven equivalent of `run_days` (yields the sessions done after each step).
+
+        process_day only runs on rebalance dates and on the first session where a
+        holding can change: its quote goes stale, or a stop-loss/take-profit or
+        exit rule (re-evaluated on filing dates) triggers. Sessions in between
+        only accrue SELIC on cash; their history rows are rebuilt from the price
+        series of the unchanged holdings.
+        """
+        timeline = pd.DatetimeIndex(timeline)
+        self._signals = {}
+        rebalance_days = np.flatnonzero(timeline.isin(list(self.rebalance_dates)))
+
+        day = 0
+        while day < len(timeline):
+            event = self.next_event_day(timeline, day, rebalance_days)
+            if event > day:
+                self.skip_days(timeline, day, event)
+                yield min(event, len(timeline))
+            if event >= len(timeline):
+                break
+            self.process_day(timeline[event], event)
+            day = event + 1
+            yield day
+
+    def position_signals(self, ticker: str, timeline):
+        """(prices, ages, financials available, exit rule mask) of a ticker over the timeline, cached per run."""
+        signals = self._signals.get(ticker)
+        if signals is None:
+            prices, ages = self.data_provider.price_panel.series(ticker, timeline)
+            fundamentals = self.data_provider.fundamentals_panel.ticker_series(ticker, timeline)
+            exit_mask = self.exit_rules(fundamentals) if self.exit_rules else np.zeros(len(timeline), dtype=bool)
+            signals = (prices, ages, fundamentals.available, exit_mask)
+            self._signals[ticker] = signals
+        return signals
+
+    def next_event_day(self, timeline, day: int, rebalance_days: np.ndarray) -> int:
+        """First session >= day where process_day could change the portfolio (len(timeline) if none)."""
+        upcoming = rebalance_days[np.searchsorted(rebalance_days, day):]
+        event = int(upcoming[0]) if len(upcoming) else len(timeline)
+
+        for ticker in self.portfolio.held:
+            prices, ages, available, exit_mask = self.position_signals(ticker, timeline)
+            price = prices[day:event]
+            # Same checks as process_day (staleness) and check_exits, on a window of sessions
+            trigger = exit_mask[day:event].copy()
+            with np.errstate(invalid='ignore'):
+                avg_price = self.portfolio.avg_price_of(ticker)
+                pct_change = (price - avg_price) / avg_price
+                if self.config.stop_loss:
+                    trigger |= pct_change < -(self.config.stop_loss / 100)
+                if self.config.take_profit:
+                    trigger |= pct_change > (self.config.take_profit / 100)
+                trigger &= (price != 0) & available[day:event]
+                trigger |= ~(ages[day:event] <= 15)
+            hits = np.flatnonzero(trigger)
+            if len(hits):
+                event = day + int(hits[0])
+        return event
+
+    def skip_days(self, timeline, start: int, end: int):
+        """Sessions [start, end) without events: SELIC on cash and history rows only."""
+        selic = self.benchmark_arrays["selic_daily"]
+        cash = np.empty(end - start)
+        balance = self.portfolio.cash
+        # Scalar recurrence, identical to process_day's accrual
+        for i in range(end - start):
+            if balance > 0:
+                balance += balance * selic[start + i]
+            cash[i] = balance
+        self.portfolio.cash = balance
+
+        # Sessions x held tickers price matrix, valued in one pass
+        held = self.portfolio.held
+        holdings_value = 0.0
+        if held:
+            prices = np.column_stack([self.position_signals(ticker, timeline)[0][start:end] for ticker in held])
+            holdings_value = self.portfolio.holdings_value(prices)
+            self.portfolio.mark(held, prices[-1])
+        total_value = cash + holdings_value
+
+        self.portfolio.history.extend(timeline[start:end], total_value, cash, len(self.portfolio))
+        self.days_since_rebalance += end - start
+
+    def process_day(self, date: datetime, day: int = None):
         # 0. Idle Cash Yield (SELIC)
-        selic_daily = self.data_provider.get_selic_daily(date)
+        if day is not None:
+            selic_daily = self.benchmark_arrays["selic_daily"][day]
+        else:
+            selic_daily = self.data_provider.get_selic_daily(date)
         if self.portfolio.cash > 0:
             yield_val = self.portfolio.cash * selic_daily
             self.portfolio.cash += yield_val
 
         # 1. Update Portfolio Valuation & Delisting Check
         current_prices = {}
-        # Iterate copy of keys to allow deletion
-        for ticker in list(self.portfolio.holdings.keys()):
-            price_row = self.data_provider.get_latest_price_row(ticker, date)
-            
-            # Check Delisting / Staleness (Price > 15 days old)
-            is_stale = False
-            current_price = 0.0
-            
-            if price_row is None:
-                is_stale = True
-            else:
-                price_date = pd.to_datetime(price_row.name)
-                days_diff = (date - price_date).days
-                if days_diff > 15: # Tolerance for holidays + weekends
-                    is_stale = True
-                else:
-                    current_price = float(price_row['close'])
+        # Copy of the held list to allow selling while iterating
+        held = self.portfolio.held
+        prices, ages = self.data_provider.get_prices(held, date)
+        for ticker, price, age in zip(held, prices, ages):
+            # Check Delisting / Staleness (Price > 15 days old, or no quote at all)
+            # Tolerance of 15 days covers holidays + weekends
+            is_stale = not (age <= 15)
+            current_price = 0.0 if is_stale else float(price)
 
             if is_stale:
-                holding = self.portfolio.holdings[ticker]
-                exit_price = holding.get('current_price', holding['avg_price'])
+                exit_price = self.portfolio.mark_price_of(ticker)
                 
                 logger.warning(f"Delisting/OPA: {ticker} stale. Selling at {exit_price} on {date}")
-                self.portfolio.sell(date, ticker, holding['quantity'], exit_price)
+                self.portfolio.sell(date, ticker, self.portfolio.quantity_of(ticker), exit_price)
                 
                 if ticker not in self.config.blacklisted_assets:
                     self.config.blacklisted_assets.append(ticker)
                 continue 
 
             # Normal Update
-            self.portfolio.holdings[ticker]['current_price'] = current_price
             current_prices[ticker] = current_price
-            
+
+        self.portfolio.mark(current_prices, current_prices.values())
+
         if hasattr(self.portfolio, 'snapshot'):
              self.portfolio.snapshot(date, current_prices)
         
@@ -196,33 +400,36 @@ class BacktestEngine:
         self.check_exits(date, current_prices)
         
         # 3. Check Entries / Rebalance / Contribution
-        if self.config.rebalance_period != 'none':
-            if self.days_since_rebalance >= self.get_rebalance_days():
-                 # Process Contribution
-                 if self.config.contribution_amount > 0:
-                     self.portfolio.cash += self.config.contribution_amount
-                     self.total_invested += self.config.contribution_amount
-                     
-                 # Check Entries if we have slots or cash
-                 if len(self.portfolio.holdings) < self.config.max_assets or self.portfolio.cash > self.config.initial_capital * 0.1:
-                      self.check_entries(date)
-                 
-                 self.days_since_rebalance = 0
-            else:
-                self.days_since_rebalance += 1
-
-    def get_rebalance_days(self):
-        if self.config.rebalance_period == 'quarterly': return 63
-        elif self.config.rebalance_period == 'yearly': return 252
-        return 21 # Monthly default
+        if date in self.rebalance_dates:
+            # Process Contribution
+            if self.config.contribution_amount > 0:
+                self.portfolio.cash += self.config.contribution_amount
+                self.total_invested += self.config.contribution_amount
+                self.contributions[len(self.portfolio.history) - 1] = self.config.contribution_amount
+
+            # Check Entries if we have slots or cash
+            if len(self.portfolio) < self.config.max_assets or self.portfolio.cash > self.config.initial_capital * 0.1:
+                self.check_entries(date)
+
+            self.days_since_rebalance = 0
+        else:
+            self.days_since_rebalance += 1
+
+    def get_rebalance_dates(self, timeline) -> set:
+        """Timeline sessions that open a new rebalance period (first session excluded)."""
+        if self.config.rebalance_period == 'none' or len(timeline) == 0:
+            return set()
+        frequency = PERIOD_FREQUENCIES.get(self.config.rebalance_period, 'month')
+        timeline = pd.DatetimeIndex(timeline)
+        mask = self.data_provider.calendar.is_period_start(timeline, frequency)
+        # The run's first session never rebalances (also when resuming a checkpoint)
+        mask &= timeline != self.first_session
+        return set(timeline[mask])
 
     def get_current_prices_for_holdings(self, date: datetime) -> Dict[str, float]:
-        prices = {}
-        for ticker in self.portfolio.holdings:
-            price_row = self.data_provider.get_latest_price_row(ticker, date)
-            if price_row is not None:
-                prices[ticker] = price_row['close']
-        return prices
+        held = self.portfolio.held
+        values, ages = self.data_provider.get_prices(held, date)
+        return {ticker: float(price) for ticker, price, age in zip(held, values, ages) if not np.isnan(age)}
 
     def evaluate_rules(self, criteria_groups: List[CriteriaGroup], ticker: str, date: datetime, price: float, financials: pd.Series) -> bool:
         """
@@ -231,82 +438,12 @@ class BacktestEngine:
         """
         if not criteria_groups: return True # No rules = Pass? Or Fail? Default Pass usually.
 
-        # Data Preparation
-        # Map indicator names to data columns
-        # 'p_l' -> 'p_l', 'roe' -> 'roe', 'dy' -> 'dy', 'net_debt_ebitda' -> 'net_debt_ebitda'?
-        # Need to handle calculations if column doesn't exist directly.
-        
-        # Helper to get value
+        # Derived metrics (consecutive_profits, revenue_cagr_5y, ratios) are precomputed
+        # per report by DataProvider.get_financials_data, so every indicator is a row lookup.
+        # Missing (None) and NaN values fail every operator alike.
         def get_val(indicator):
-            # 1. Direct Lookup
             val = financials.get(indicator)
             if val is not None: return float(val)
-            
-            # 2. Derived Metrics
-            if indicator == 'net_debt_ebitda':
-                net_debt = financials.get('net_debt')
-                ebit = financials.get('ebit')
-                if net_debt is not None and ebit is not None and ebit != 0:
-                     return float(net_debt / ebit)
-            
-            if indicator == 'p_vp':
-                 # P/VP = P/L * ROE
-                 p_l = financials.get('p_l')
-                 roe = financials.get('roe')
-                 if p_l is not None and roe is not None:
-                     return float(p_l * roe)
-
-            if indicator == 'net_margin_avg_5y':
-                return float(financials.get('avg_margin_5y', 0))
-
-            if indicator == 'consecutive_profits':
-                # Return number of years of consecutive profits
-                full_df = self.data_provider.get_financials_data(ticker)
-                if full_df.empty: return 0.0
-                
-                # Sort descending by date (latest first)
-                history = full_df.loc[:date].sort_index(ascending=False)
-                
-                count = 0
-                for idx, row in history.iterrows():
-                    # Check yearly or quarterly? history is likely quarterly or yearly depending on source.
-                    # Assuming data points are effective updates.
-                    # Simple check: consecutive reports > 0.
-                    # Ideally we want YEARS. If quarterly, 4 quarters > 0?
-                    # Let's count consecutive reports with net_income > 0 for now as proxy, or check years.
-                    # User asked for "Years". 
-                    # If data is quarterly, 4 quarters = 1 year approx.
-                    # Let's count valid positive reports and divide by frequency? 
-                    # Simpler: Count consecutive positive result rows.
-                    if row.get('net_income', -1) > 0:
-                        count += 1
-                    else:
-                        break
-                
-                # If data is quarterly (approx 4 per year), divide by 4?
-                # Inspect data.json: dates are "2013-06-30", "2013-09-30". It is quarterly.
-                # So 20 quarters = 5 years.
-                # User puts "5" (years). Rule: >= 5.
-                # Metric calculation: return count / 4.
-                return float(count / 4)
-
-            if indicator == 'revenue_cagr_5y':
-                history = self.data_provider.get_financials_data(ticker)
-                if history.empty: return None
-                history = history.loc[:date].sort_index()
-                
-                if len(history) < 4: return None # Need at least 1 year? 5 years preferred.
-                start_rev = history.iloc[0]['revenue']
-                end_rev = history.iloc[-1]['revenue']
-                    
-                if start_rev <= 0 or end_rev <= 0: return 0.0
-                    
-                years = (history.index[-1] - history.index[0]).days / 365.25
-                if years < 1: return 0.0
-                    
-                cagr = (end_rev / start_rev) ** (1/years) - 1
-                return float(cagr * 100) # Return as percentage
-
             return None
 
         # Iterate Groups
@@ -376,151 +513,98 @@ class BacktestEngine:
         else:
             return all(group_results)
 
+    def compile_rules(self):
+        """Compiles the config's criteria once per run (see backtest.rules)."""
+        # evaluate_rules combines exit groups with entry_logic as well
+        self.entry_rules = CompiledRules(self.config.entry_criteria, self.config.entry_logic)
+        self.exit_rules = CompiledRules(self.config.exit_criteria, self.config.entry_logic)
+
     def check_exits(self, date: datetime, prices: Dict[str, float]):
-        holdings = list(self.portfolio.holdings.keys())
+        holdings = self.portfolio.held
+        fundamentals = self.data_provider.get_fundamentals(date)
+        # Dynamic exit criteria for the whole universe in one pass
+        exit_mask = self.exit_rules(fundamentals) if self.exit_rules else None
         for ticker in holdings:
             price = prices.get(ticker)
             if not price: continue
 
             # Get Financials (Lagged)
-            fin_row = self.data_provider.get_latest_financials_row(ticker, date)
-            if fin_row is None: continue
+            col = fundamentals.panel.ticker_index.get(ticker)
+            if col is None or not fundamentals.available[col]: continue
 
             # 1. Stop Loss / Take Profit (Allocated)
             # Need entry price for this holding.
             # Simplified: checking relative to avg_price
-            avg_price = self.portfolio.holdings[ticker]['avg_price']
+            avg_price = self.portfolio.avg_price_of(ticker)
             pct_change = (price - avg_price) / avg_price
             
             if self.config.stop_loss and pct_change < -(self.config.stop_loss / 100):
-                self.portfolio.sell(date, ticker, self.portfolio.holdings[ticker]['quantity'], price)
+                self.portfolio.sell(date, ticker, self.portfolio.quantity_of(ticker), price)
                 continue
             
             if self.config.take_profit and pct_change > (self.config.take_profit / 100):
-                 self.portfolio.sell(date, ticker, self.portfolio.holdings[ticker]['quantity'], price)
+                 self.portfolio.sell(date, ticker, self.portfolio.quantity_of(ticker), price)
                  continue
 
             # 2. Dynamic Exit Criteria
-            should_exit = False
-            # If we have exit criteria, evaluate them.
             # Frontend sends explicit rules now (even for auto-transpose).
-            if self.config.exit_criteria:
-                if self.evaluate_rules(self.config.exit_criteria, ticker, date, price, fin_row):
-                    should_exit = True
-            
-            if should_exit:
-                 self.portfolio.sell(date, ticker, self.portfolio.holdings[ticker]['quantity'], price)
+            if exit_mask is not None and exit_mask[col]:
+                 self.portfolio.sell(date, ticker, self.portfolio.quantity_of(ticker), price)
 
     def check_entries(self, date: datetime):
-        candidates = []
-        
-        # Scan Universe
-        for ticker in self.data_provider.assets_list:
-            if ticker in self.portfolio.holdings: continue
-            if ticker in self.config.blacklisted_assets: continue
-            
-            # Price Check
-            price_row = self.data_provider.get_latest_price_row(ticker, date)
-            if price_row is None: continue
-            if (date - price_row.name).days > 5: continue # Stale price
-            price = float(price_row['close'])
-            
-            # Financials Check
-            fin_row = self.data_provider.get_latest_financials_row(ticker, date)
-            if fin_row is None: continue
-            if (date - fin_row.name).days > 500: continue # Stale financials
-            
-            # Data Quality Check: Collect indicators used nas regras
-            required_indicators = set()
-            for group in self.config.entry_criteria:
-                if isinstance(group, dict):
-                    items = group.get('items', [])
-                else:
-                    items = getattr(group, 'items', []) or []
-
-                for item in items:
-                    indicator = (
-                        item['indicator']
-                        if isinstance(item, dict)
-                        else getattr(item, 'indicator', None)
-                    )
-                    if indicator:
-                        required_indicators.add(indicator)
-
-            # Validate required data exists (valores negativos são aceitos; zeros ainda sinalizam alerta)
-            data_valid = True
-            for indicator in required_indicators:
-                val = fin_row.get(indicator)
-
-                if val is None:
-                    data_valid = False
-                    break
-
-                zero_sensitive = indicator in ['p_l', 'p_vp', 'roe', 'roic', 'ev_ebitda']
-                if zero_sensitive and val == 0:
-                    # Valores zerados continuam indicando ausência de dado confiável
-                    data_valid = False
-                    break
-            
-            if not data_valid:
-                continue
-            
-            # Evaluate Entry Rules
-            if not self.evaluate_rules(self.config.entry_criteria, ticker, date, price, fin_row):
-                continue
-            
-            # Passed! Calculate Score for Ranking
-            # Score based on configured weights
-            score = 0
-            score_weights = getattr(self.config, "entry_score_weights", "balanced")
-            
-            if score_weights == 'value':
-                # Value: Lower P/L, P/VP better
-                p_l = fin_row.get('p_l', 20)
-                p_vp = fin_row.get('p_vp', 3)
-                score = p_l * 0.6 + p_vp * 0.4
-                
-            elif score_weights == 'growth':
-                # Growth: Higher CAGR better (negate for ascending sort)
-                cagr = fin_row.get('revenue_cagr_5y', 0)
-                score = -cagr  # Negative so higher CAGR = lower score
-                
-            elif score_weights == 'quality':
-                # Quality: Higher ROE, Lower Debt better
-                roe = fin_row.get('roe', 0.05)
-                debt_ratio = fin_row.get('net_debt_ebitda', 3)
-                score = -roe * 100 + debt_ratio * 10  # Negate ROE for ascending sort
-                
-            else:  # 'balanced'
-                # Balanced: Mix of value + quality
-                p_l = fin_row.get('p_l', 20)
-                roe = fin_row.get('roe', 0.05)
-                dy = fin_row.get('dy', 0)
-                score = p_l * 0.4 - roe * 50 - dy * 100
-            
-            candidates.append({
-                'ticker': ticker,
-                'price': price,
-                'score': score
-            })
-        
-        if not candidates:
+        # Price and Financials Check for the whole universe in one panel read each
+        universe = self.data_provider.assets_list
+        prices, ages = self.data_provider.get_prices(universe, date)
+        fundamentals = self.data_provider.get_fundamentals(date)
+        # Missing or stale prices (> 5 days) and financials (> 500 days) are skipped
+        fresh = (ages <= 5) & (fundamentals.ages <= 500)
+
+        # Data quality (indicators used by the rules present, zero-sensitive ones non-zero)
+        # and the entry rules, evaluated as masks over the whole universe
+        if self.screen_cache is not None:
+            eligible = fresh & self.screen_cache.screen(self.entry_rules, fundamentals)
+        else:
+            eligible = fresh & self.entry_rules.data_valid(fundamentals) & self.entry_rules(fundamentals)
+
+        # Held and blacklisted assets are not candidates
+        ticker_index = fundamentals.panel.ticker_index
+        for ticker in self.portfolio.held + list(self.config.blacklisted_assets):
+            col = ticker_index.get(ticker)
+            if col is not None:
+                eligible[col] = False
+
+        candidates = np.flatnonzero(eligible)
+        if len(candidates) == 0:
             return  # No candidates to buy
-        
-        # Sort Candidates by Score (Ascending = Better)
-        candidates.sort(key=lambda x: x['score'])
-        
-        # Buy Top N
-        slots = self.config.max_assets - len(self.portfolio.holdings)
+
+        # Buy Top N (Ascending score = Better)
+        slots = self.config.max_assets - len(self.portfolio)
         if slots <= 0:
             return
-        
-        for cand in candidates[:slots]:
-            # Allocation logic
-            available = self.portfolio.cash
-            alloc_per_slot = available / slots
-            qty = int(alloc_per_slot // cand['price'])
-            qty = (qty // 100) * 100  # Round Lot
-            
+        chosen = candidates[top_n(self.entry_scores(fundamentals, candidates), slots)]
+
+        # Allocation logic: each buy (best first) gets the remaining cash / slots,
+        # rounded down to 100-share lots; at most `slots` names, so a plain pass
+        for col, price in zip(chosen.tolist(), prices[chosen].tolist()):
+            qty = int(self.portfolio.cash / slots // price) // 100 * 100
             if qty > 0:
-                self.portfolio.buy(date, cand['ticker'], qty, cand['price'])
+                self.portfolio.buy(date, universe[col], qty, price)
+
+    def entry_scores(self, fundamentals, cols: np.ndarray) -> np.ndarray:
+        """Ranking score of the candidate columns (ascending = better), per entry_score_weights."""
+        def indicator(name, default):
+            # Default only when the ticker's financials lack the indicator (like Series.get)
+            return np.where(fundamentals.has(name)[cols], fundamentals.get(name)[cols], default)
+
+        score_weights = getattr(self.config, "entry_score_weights", "balanced")
+        if score_weights == 'value':
+            # Value: Lower P/L, P/VP better
+            return indicator('p_l', 20) * 0.6 + indicator('p_vp', 3) * 0.4
+        if score_weights == 'growth':
+            # Growth: Higher CAGR better (negated for ascending sort)
+            return -indicator('revenue_cagr_5y', 0)
+        if score_weights == 'quality':
+            # Quality: Higher ROE, Lower Debt better
+            return -indicator('roe', 0.05) * 100 + indicator('net_debt_ebitda', 3) * 10
+        # 'balanced': Mix of value + quality
+        return indicator('p_l', 20) * 0.4 - indicator('roe', 0.05) * 50 - indicator('dy', 0) * 100
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+VALUE_COLUMNS = ("total_value", "cash")
+BENCHMARK_COLUMNS = ("ibov_value", "selic_value", "ipca_value")
+
+
+class HistoryRecorder:
+    """
+    Daily portfolio snapshots as preallocated NumPy columns (date, total_value,
+    cash, holdings_count and the benchmark curves) instead of one dict per
+    session. `reserve` sizes the columns to the timeline up front; the column
+    properties are zero-copy views of the recorded rows. Dict records (the
+    pre-columnar `history` rows) are built only on demand by `records`, which
+    is also what iteration and indexing return.
+    """
+
+    def __init__(self, capacity: int = 0):
+        self._size = 0
+        # Rows [0, benchmark_rows) have the benchmark columns filled
+        self.benchmark_rows = 0
+        self._dates = np.empty(capacity, dtype='datetime64[ns]')
+        self._holdings_count = np.empty(capacity, dtype=np.int64)
+        self._values = {name: np.empty(capacity) for name in VALUE_COLUMNS + BENCHMARK_COLUMNS}
+
+    def reserve(self, rows: int):
+        """Makes room for `rows` more sessions without reallocating."""
+        needed = self._size + rows
+        if needed <= len(self._dates):
+            return
+        capacity = max(needed, 2 * len(self._dates))
+        self._dates = np.resize(self._dates, capacity)
+        self._holdings_count = np.resize(self._holdings_count, capacity)
+        self._values = {name: np.resize(column, capacity) for name, column in self._values.items()}
+
+    # --- Recording ---
+
+    def append(self, date, total_value: float, cash: float, holdings_count: int):
+        if self._size == len(self._dates):
+            self.reserve(max(1, self._size))
+        i = self._size
+        self._dates[i] = np.datetime64(pd.Timestamp(date), 'ns')
+        self._values["total_value"][i] = total_value
+        self._values["cash"][i] = cash
+        self._holdings_count[i] = holdings_count
+        self._size += 1
+
+    def extend(self, dates, total_value, cash, holdings_count):
+        """Appends several sessions at once (array columns; holdings_count may be a scalar)."""
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        n = len(dates)
+        self.reserve(n)
+        rows = slice(self._size, self._size + n)
+        self._dates[rows] = dates
+        self._values["total_value"][rows] = total_value
+        self._values["cash"][rows] = cash
+        self._holdings_count[rows] = holdings_count
+        self._size += n
+
+    def set_benchmarks(self, start: int, end: int, ibov, selic, ipca):
+        """Fills the benchmark curves of rows [start, end)."""
+        rows = slice(start, end)
+        self._values["ibov_value"][rows] = ibov
+        self._values["selic_value"][rows] = selic
+        self._values["ipca_value"][rows] = ipca
+        self.benchmark_rows = max(self.benchmark_rows, end)
+
+    # --- Columns (views) ---
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates[:self._size]
+
+    @property
+    def holdings_count(self) -> np.ndarray:
+        return self._holdings_count[:self._size]
+
+    def column(self, name: str) -> np.ndarray:
+        if name == "date":
+            return self.dates
+        if name == "holdings_count":
+            return self.holdings_count
+        return self._values[name][:self._size]
+
+    @property
+    def total_value(self) -> np.ndarray:
+        return self.column("total_value")
+
+    @property
+    def cash(self) -> np.ndarray:
+        return self.column("cash")
+
+    # --- Records (API boundary) ---
+
+    def records(self, start: int = 0, end: Optional[int] = None) -> List[dict]:
+        """Rows [start, end) as dicts: date (Timestamp), total_value, cash, holdings_count[, benchmarks]."""
+        end = self._size if end is None else min(end, self._size)
+        if start >= end:
+            return []
+        rows = slice(start, end)
+        columns = {
+            "date": list(pd.DatetimeIndex(self._dates[rows])),
+            "total_value": self._values["total_value"][rows].tolist(),
+            "cash": self._values["cash"][rows].tolist(),
+            "holdings_count": self._holdings_count[rows].tolist(),
+        }
+        plain = min(end, max(start, self.benchmark_rows))
+        records = [dict(zip(columns, row)) for row in zip(*columns.values())]
+        if plain > start:
+            benchmarks = {name: self._values[name][start:plain].tolist() for name in BENCHMARK_COLUMNS}
+            for record, row in zip(records, zip(*benchmarks.values())):
+                record.update(zip(BENCHMARK_COLUMNS, row))
+        return records
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._size)
+            records = self.records(start, stop) if step > 0 else self.records()[index]
+            return records[::step] if step > 1 else records
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        return self.records(index, index + 1)[0]
+
+    def __eq__(self, other):
+        if not isinstance(other, HistoryRecorder):
+            return NotImplemented
+        if len(self) != len(other) or self.benchmark_rows != other.benchmark_rows:
+            return False
+        return (np.array_equal(self.dates, other.dates)
+                and np.array_equal(self.holdings_count, other.holdings_count)
+                and all(np.array_equal(self.column(name), other.column(name)) for name in VALUE_COLUMNS)
+                and all(np.array_equal(self._values[name][:self.benchmark_rows], other._values[name][:self.benchmark_rows],
+                                       equal_nan=True) for name in BENCHMARK_COLUMNS))
+
+    def __getstate__(self):
+        # Pickle (e.g. from pool workers) only the recorded rows
+        state = self.__dict__.copy()
+        state["_dates"] = self.dates.copy()
+        state["_holdings_count"] = self.holdings_count.copy()
+        state["_values"] = {name: column[:self._size].copy() for name, column in self._values.items()}
+        return state
@@ -0,0 +1,323 @@
+import os
+import time
+import uuid
+import queue
+import shutil
+import logging
+import threading
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, CancelledError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from backtest.data_provider import DataProvider
+from backtest.domain import BacktestResult, StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.result_cache import ResultCache, cache_key
+from backtest.rules import ScreenCache
+
+logger = logging.getLogger("JobQueue")
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, TIMEOUT = "queued", "running", "done", "failed", "cancelled", "timeout"
+FINISHED = (DONE, FAILED, CANCELLED, TIMEOUT)
+
+# How often a waiting worker thread checks its job's deadline and cancellation
+POLL_INTERVAL = 0.05
+
+# Providers attached by each worker process, by snapshot directory (see _attach)
+_worker_providers = {}
+_worker_screens = None
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when `max_pending` jobs are already queued or running."""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobTimeout(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    config: StrategyConfigRequest
+    key: str
+    status: str = QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[BacktestResult] = None
+    body: Optional[bytes] = None
+    future: Any = None
+
+    def as_dict(self) -> dict:
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "elapsed": round(end - self.submitted_at, 3),
+            "error": self.error,
+        }
+
+
+def _attach(snapshot_dir: str) -> DataProvider:
+    global _worker_screens
+    provider = _worker_providers.get(snapshot_dir)
+    if provider is None:
+        # A new dataset version replaces the previous one in this worker
+        _worker_providers.clear()
+        provider = _worker_providers[snapshot_dir] = DataProvider.from_snapshot(snapshot_dir)
+        _worker_screens = ScreenCache()
+    return provider
+
+
+def _run_job(snapshot_dir: str, payload: dict, key: str, encode: Optional[Callable]):
+    """Worker side: runs the config and encodes its responses. Returns (result, {cache key: body})."""
+    provider = _attach(snapshot_dir)
+    engine = BacktestEngine(provider, event_driven=True, screen_cache=_worker_screens)
+    result = engine.run(StrategyConfigRequest(**payload))
+    bodies = encode(StrategyConfigRequest(**payload), result, key) if encode is not None else {}
+    return result, bodies
+
+
+def _serve(conn):
+    """Worker process loop: runs each task received on `conn` and sends back (ok, value)."""
+    logging.getLogger("BacktestEngine").setLevel(logging.ERROR)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = (True, _run_job(*task))
+        except Exception as e:
+            reply = (False, str(e))
+        conn.send(reply)
+
+
+class JobQueue:
+    """
+    Backtest jobs executed in worker processes, off the API's threads and GIL.
+
+    Each loaded dataset is saved once as a snapshot directory named by its
+    fingerprint; workers memory-map it and keep it attached between jobs.
+    At most `max_pending` jobs may be queued or running (`submit` raises
+    QueueFull beyond that). Each worker process is driven by a thread of
+    this process, which terminates (and replaces) the worker when its job
+    is cancelled or runs past `timeout` seconds.
+
+    Workers also encode the responses: `encode(config, result, key)` must be
+    a module-level function (it is pickled by reference) returning the
+    bodies to store in `result_cache` by cache key, the job's own response
+    under `key`. Finished jobs are dropped once `max_finished` newer jobs
+    have finished or `max_age` seconds after finishing.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 32, timeout: Optional[float] = 300.0,
+                 snapshot_root: Optional[str] = None, result_cache: Optional[ResultCache] = None,
+                 encode: Optional[Callable[[StrategyConfigRequest, BacktestResult, str], Dict[str, bytes]]] = None,
+                 max_finished: int = 500, max_age: Optional[float] = 3600.0):
+        self.workers = (os.cpu_count() or 1) if workers is None else max(1, workers)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.result_cache = result_cache
+        self.encode = encode
+        self.max_finished = max_finished
+        self.max_age = max_age
+        self._owns_root = snapshot_root is None
+        self.snapshot_root = snapshot_root or tempfile.mkdtemp(prefix="backtest_jobs_")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context()
+        self._tasks = None
+        self._stop = None
+        self._threads = []
+        self._cancel_requests = set()
+
+    def start(self):
+        with self._lock:
+            if self._tasks is None:
+                self._tasks, self._stop = queue.Queue(), threading.Event()
+                self._threads = [
+                    threading.Thread(target=self._drive, args=(self._tasks, self._stop),
+                                     name=f"JobWorker-{i}", daemon=True)
+                    for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+
+    def shutdown(self):
+        with self._lock:
+            tasks, stop, threads = self._tasks, self._stop, self._threads
+            self._tasks = self._stop = None
+            self._threads = []
+        if tasks is not None:
+            stop.set()
+            # Queued jobs are cancelled; running ones are cancelled by their threads
+            while True:
+                try:
+                    job, _ = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                job.future.cancel()
+            for _ in threads:
+                tasks.put(None)
+            for thread in threads:
+                thread.join()
+        if self._owns_root:
+            shutil.rmtree(self.snapshot_root, ignore_errors=True)
+
+    def snapshot_dir(self, provider: DataProvider) -> str:
+        """Snapshot of `provider` for the workers, written once per dataset fingerprint."""
+        directory = os.path.join(self.snapshot_root, provider.fingerprint())
+        if not os.path.exists(directory):
+            os.makedirs(self.snapshot_root, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=self.snapshot_root)
+            provider.save_snapshot(staging)
+            try:
+                os.rename(staging, directory)
+            except OSError:
+                # Another thread published the same snapshot first
+                shutil.rmtree(staging, ignore_errors=True)
+        return directory
+
+    # --- Lifecycle ---
+
+    def submit(self, config: StrategyConfigRequest, provider: DataProvider) -> Job:
+        key = cache_key(config, provider.fingerprint())
+        job = Job(id=uuid.uuid4().hex, config=config, key=key)
+
+        cached = self.result_cache.get(key) if self.result_cache is not None else None
+        if cached is not None:
+            job.body, job.status, job.finished_at = cached, DONE, time.time()
+            with self._lock:
+                self._jobs[job.id] = job
+                self._prune()
+            return job
+
+        self.start()
+        snapshot_dir = self.snapshot_dir(provider)
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j.status not in FINISHED)
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} jobs pending (limit {self.max_pending})")
+            self._jobs[job.id] = job
+            job.future = Future()
+            self._tasks.put((job, snapshot_dir))
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == QUEUED and job.future is not None and job.future.running():
+                job.status = RUNNING
+            return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancels a queued job at once; a running one has its worker terminated."""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        if not job.future.cancel():
+            self._cancel_requests.add(job.id)
+        return job
+
+    # --- Workers ---
+
+    def _spawn(self):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_serve, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, conn
+
+    def _drive(self, tasks: queue.Queue, stop: threading.Event):
+        """Feeds one worker process; terminates and replaces it when its job must stop."""
+        process = conn = None
+        try:
+            while True:
+                task = tasks.get()
+                if task is None:
+                    return
+                job, snapshot_dir = task
+                if not job.future.set_running_or_notify_cancel():
+                    continue  # cancelled while queued
+                if process is None:
+                    process, conn = self._spawn()
+                deadline = time.monotonic() + self.timeout if self.timeout else None
+                try:
+                    conn.send((snapshot_dir, job.config.model_dump(), job.key, self.encode))
+                except Exception as e:
+                    # Not picklable (e.g. a lambda `encode`): nothing reached the worker
+                    job.future.set_exception(e)
+                    continue
+                try:
+                    while not conn.poll(POLL_INTERVAL):
+                        if stop.is_set():
+                            raise CancelledError()
+                        if job.id in self._cancel_requests:
+                            raise JobCancelled(job.id)
+                        if deadline is not None and time.monotonic() > deadline:
+                            raise JobTimeout(f"Job exceeded {self.timeout:g}s")
+                    ok, value = conn.recv()
+                except (CancelledError, JobCancelled, JobTimeout, EOFError, OSError) as e:
+                    self._terminate(process, conn)
+                    process = conn = None
+                    if isinstance(e, (EOFError, OSError)):
+                        e = RuntimeError(f"Worker process died: {e!r}")
+                    job.future.set_exception(e)
+                    continue
+                if ok:
+                    job.future.set_result(value)
+                else:
+                    job.future.set_exception(RuntimeError(value))
+        finally:
+            if process is not None:
+                self._terminate(process, conn)
+
+    @staticmethod
+    def _terminate(process, conn):
+        process.terminate()
+        process.join()
+        conn.close()
+
+    def _finish(self, job: Job, future):
+        error = None
+        try:
+            job.result, bodies = future.result()
+            job.body = bodies.get(job.key)
+            if self.result_cache is not None:
+                for key, body in bodies.items():
+                    self.result_cache.put(key, body)
+            status = DONE
+        except (CancelledError, JobCancelled):
+            status = CANCELLED
+        except JobTimeout as e:
+            status, error = TIMEOUT, str(e)
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            status, error = FAILED, str(e)
+
+        self._cancel_requests.discard(job.id)
+        with self._lock:
+            job.status, job.error, job.finished_at = status, error, time.time()
+            self._prune()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        expired = finished[:max(0, len(finished) - self.max_finished)]
+        if self.max_age is not None:
+            cutoff = time.time() - self.max_age
+            expired += [job_id for job_id in finished if self._jobs[job_id].finished_at < cutoff]
+        for job_id in set(expired):
+            del self._jobs[job_id]
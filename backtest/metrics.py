@@ -0,0 +1,226 @@
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, fields
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest.history import HistoryRecorder
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class PerformanceMetrics:
+    """Risk/performance statistics of an equity curve and its trade log (see `compute_metrics`)."""
+    max_drawdown: float = 0.0
+    max_drawdown_duration: int = 0  # sessions under the previous peak (longest stretch)
+    max_drawdown_days: int = 0      # same stretch in calendar days
+    volatility: float = 0.0         # annualized, of the flow-neutral daily returns
+    downside_deviation: float = 0.0
+    sortino_ratio: float = 0.0
+    twr: float = 0.0                # time-weighted return (contributions neutralized)
+    twr_annualized: float = 0.0
+    irr: float = 0.0                # money-weighted return, annualized
+    win_rate: float = 0.0
+    closed_trades: int = 0
+    rolling_return_12m: np.ndarray = field(default_factory=lambda: np.array([]), repr=False)
+    rolling_volatility_12m: np.ndarray = field(default_factory=lambda: np.array([]), repr=False)
+
+    def summary(self) -> dict:
+        """Scalar metrics as plain floats/ints (rolling series left out)."""
+        return {
+            f.name: getattr(self, f.name) for f in fields(self)
+            if not isinstance(getattr(self, f.name), np.ndarray)
+        }
+
+
+def equity_arrays(history) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    """(dates, total values) of a HistoryRecorder (zero-copy) or of history records."""
+    if isinstance(history, HistoryRecorder):
+        return pd.DatetimeIndex(history.dates), history.total_value
+    dates = pd.DatetimeIndex([row['date'] for row in history])
+    values = np.fromiter((row['total_value'] for row in history), dtype=float, count=len(history))
+    return dates, values
+
+
+def drawdown_stats(values: np.ndarray, dates: Optional[pd.DatetimeIndex] = None) -> Tuple[float, int, int]:
+    """Max drawdown (<= 0) and the longest underwater stretch, in sessions and calendar days."""
+    if len(values) == 0:
+        return 0.0, 0, 0
+    peaks = np.maximum.accumulate(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(peaks > 0, values / peaks - 1, 0.0)
+    sessions = np.arange(len(values))
+    # Index of the running peak for every session
+    peak_idx = np.maximum.accumulate(np.where(values >= peaks, sessions, 0))
+    underwater = sessions - peak_idx
+    duration = int(underwater.max())
+    days = 0
+    if dates is not None and duration > 0:
+        day_numbers = dates.values.astype('datetime64[D]').astype(np.int64)
+        days = int((day_numbers - day_numbers[peak_idx]).max())
+    return float(drawdowns.min()), duration, days
+
+
+def period_returns(values: np.ndarray, flows: Optional[np.ndarray] = None,
+                   start_value: Optional[float] = None) -> np.ndarray:
+    """
+    Flow-neutral session returns. `flows[t]` is cash added after the valuation
+    of session t (contributions are made after the daily snapshot), so session
+    t+1 starts from values[t] + flows[t]. The first return is measured against
+    `start_value` (0 when not given).
+    """
+    if len(values) == 0:
+        return np.array([])
+    base = values[:-1] if flows is None else values[:-1] + flows[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(base > 0, values[1:] / base - 1, 0.0)
+        first = values[0] / start_value - 1 if start_value else 0.0
+    return np.r_[first, returns]
+
+
+def downside_deviation(returns: np.ndarray, target: float = 0.0) -> float:
+    if len(returns) == 0:
+        return 0.0
+    shortfall = np.minimum(returns - target, 0.0)
+    return float(np.sqrt(np.mean(shortfall ** 2)))
+
+
+def sortino_ratio(returns: np.ndarray, target: float = 0.0) -> float:
+    """Annualized mean excess return over the annualized downside deviation."""
+    downside = downside_deviation(returns, target)
+    if downside == 0:
+        return 0.0
+    return float((np.mean(returns) - target) / downside * np.sqrt(TRADING_DAYS))
+
+
+def irr(amounts: np.ndarray, years: np.ndarray, low: float = -0.9999, high: float = 100.0,
+        iterations: int = 100) -> float:
+    """
+    Annual rate r with sum(amounts / (1 + r) ** years) == 0, by bisection
+    (investments negative, final value positive). 0.0 when there is no sign change.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    years = np.asarray(years, dtype=float)
+
+    def npv(rate):
+        return float(np.sum(amounts * np.power(1 + rate, -years)))
+
+    f_low, f_high = npv(low), npv(high)
+    if not np.isfinite(f_low) or not np.isfinite(f_high) or f_low * f_high > 0:
+        return 0.0
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        f_mid = npv(mid)
+        if f_mid == 0:
+            return mid
+        if (f_mid > 0) == (f_low > 0):
+            low, f_low = mid, f_mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def trade_stats(transactions: Iterable) -> Tuple[float, int]:
+    """
+    Win rate of closed trades: every SELL is matched FIFO against the BUY lots
+    of its ticker, and wins when the proceeds exceed the matched cost (fees
+    included). Returns (win rate, closed trades).
+    """
+    lots: Dict[str, deque] = defaultdict(deque)
+    wins = closed = 0
+    for txn in transactions:
+        if txn.action == 'BUY':
+            # total_value includes fees; cost per share
+            lots[txn.ticker].append([txn.quantity, txn.total_value / txn.quantity])
+            continue
+        remaining, cost = txn.quantity, 0.0
+        queue = lots[txn.ticker]
+        while remaining > 0 and queue:
+            lot = queue[0]
+            used = min(remaining, lot[0])
+            cost += used * lot[1]
+            lot[0] -= used
+            remaining -= used
+            if lot[0] == 0:
+                queue.popleft()
+        matched = txn.quantity - remaining
+        if matched == 0:
+            continue
+        proceeds = txn.total_value * matched / txn.quantity
+        closed += 1
+        wins += proceeds > cost
+    return (wins / closed if closed else 0.0), closed
+
+
+def rolling_stats(returns: np.ndarray, window: int = TRADING_DAYS) -> Tuple[np.ndarray, np.ndarray]:
+    """Trailing `window`-session compounded return and annualized volatility (NaN until the window fills)."""
+    n = len(returns)
+    rolling_return = np.full(n, np.nan)
+    rolling_vol = np.full(n, np.nan)
+    if n < window or window < 2:
+        return rolling_return, rolling_vol
+    log_growth = np.r_[0.0, np.cumsum(np.log1p(returns))]
+    total = np.r_[0.0, np.cumsum(returns)]
+    squares = np.r_[0.0, np.cumsum(returns ** 2)]
+    end = np.arange(window, n + 1)
+    rolling_return[window - 1:] = np.expm1(log_growth[end] - log_growth[end - window])
+    mean = (total[end] - total[end - window]) / window
+    variance = (squares[end] - squares[end - window] - window * mean ** 2) / (window - 1)
+    rolling_vol[window - 1:] = np.sqrt(np.maximum(variance, 0.0) * TRADING_DAYS)
+    return rolling_return, rolling_vol
+
+
+def compute_metrics(history, transactions: Iterable = (), flows: Optional[np.ndarray] = None,
+                    start_value: Optional[float] = None) -> PerformanceMetrics:
+    """
+    All metrics of a run from its history rows and trade log.
+
+    `flows` are the contributions aligned with `history` (see `period_returns`)
+    and `start_value` the capital before the first session. Returns are flow
+    neutral, so TWR, volatility, Sortino and drawdowns are not distorted by
+    contributions; the IRR weighs every contribution by the time it was invested.
+    """
+    win_rate, closed = trade_stats(transactions)
+    if len(history) == 0:
+        return PerformanceMetrics(win_rate=win_rate, closed_trades=closed)
+
+    dates, values = equity_arrays(history)
+    flows = np.zeros(len(values)) if flows is None else np.asarray(flows, dtype=float)
+    returns = period_returns(values, flows, start_value)
+    # Drawdowns on the flow-neutral index: a contribution is not a new peak. The
+    # index starts at 1.0 (the starting capital), so a first-session loss counts
+    index = np.r_[1.0, np.cumprod(1 + returns)]
+    max_dd, duration, days = drawdown_stats(index, dates.insert(0, dates[0]))
+
+    growth = float(index[-1])
+    twr = growth - 1
+    years = (dates[-1] - dates[0]).days / 365.25
+    twr_annualized = growth ** (1 / years) - 1 if years > 0 and growth > 0 else 0.0
+
+    # Money-weighted: start capital and contributions in, last valuation out
+    day_numbers = dates.values.astype('datetime64[D]').astype(np.int64)
+    elapsed = (day_numbers - day_numbers[0]) / 365.25
+    initial = start_value if start_value else values[0]
+    amounts = np.r_[-initial, -flows[:-1], values[-1]]
+    times = np.r_[0.0, elapsed[:-1], elapsed[-1]]
+    rate = irr(amounts, times) if years > 0 else 0.0
+
+    rolling_return, rolling_vol = rolling_stats(returns)
+    downside = downside_deviation(returns)
+    return PerformanceMetrics(
+        max_drawdown=max_dd,
+        max_drawdown_duration=duration,
+        max_drawdown_days=days,
+        volatility=float(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS)) if len(returns) > 1 else 0.0,
+        downside_deviation=float(downside * np.sqrt(TRADING_DAYS)),
+        sortino_ratio=sortino_ratio(returns),
+        twr=twr,
+        twr_annualized=float(twr_annualized),
+        irr=float(rate),
+        win_rate=float(win_rate),
+        closed_trades=closed,
+        rolling_return_12m=rolling_return,
+        rolling_volatility_12m=rolling_vol,
+    )
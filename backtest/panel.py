@@ -0,0 +1,453 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("BacktestPanel")
+
+
+def to_datetime64(date) -> np.datetime64:
+    """Normalizes any date-like value to numpy datetime64[ns]."""
+    return np.datetime64(pd.Timestamp(date), 'ns')
+
+
+PANEL_META_FILE = "panel.json"
+
+
+def _save_arrays(directory: str, meta: dict, arrays: Dict[str, np.ndarray]):
+    """Writes one .npy per array plus a JSON manifest, so readers can memory-map them."""
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(directory, PANEL_META_FILE), "w") as fh:
+        json.dump(meta, fh)
+
+
+def _load_arrays(directory: str, mmap_mode: Optional[str]):
+    with open(os.path.join(directory, PANEL_META_FILE), "r") as fh:
+        meta = json.load(fh)
+
+    def load(name):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+    return meta, load
+
+
+def _digest_arrays(digest, meta: dict, arrays: Dict[str, np.ndarray]):
+    """Feeds the manifest and every array (name, dtype, shape, bytes) into a hashlib digest."""
+    digest.update(json.dumps(meta, sort_keys=True).encode())
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+        digest.update(array.tobytes())
+
+
+class PricePanel:
+    """
+    Aligned date x ticker price matrices.
+
+    Every ticker shares the same trading-date axis. Missing quotes are NaN and
+    `last_valid[d, t]` holds the row of the latest non-NaN close on or before
+    row `d` (-1 when the ticker has no quote yet), so an as-of lookup is a
+    `searchsorted` on the date axis plus one integer gather.
+    """
+
+    FIELDS = ("close", "adjclose", "volume")
+
+    def __init__(self, dates: np.ndarray, tickers: list, fields: Dict[str, np.ndarray], last_valid: np.ndarray):
+        self.dates = dates.astype('datetime64[ns]')
+        self.day_numbers = self.dates.astype('datetime64[D]').astype(np.int64)
+        self.tickers = list(tickers)
+        self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.fields = fields
+        self.last_valid = last_valid
+
+    @classmethod
+    def empty(cls) -> "PricePanel":
+        dates = np.array([], dtype='datetime64[ns]')
+        fields = {name: np.empty((0, 0)) for name in cls.FIELDS}
+        return cls(dates, [], fields, np.empty((0, 0), dtype=np.int32))
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame]) -> "PricePanel":
+        """Builds the panel from per-ticker DataFrames indexed by date."""
+        tickers = sorted(frames.keys())
+        if not tickers:
+            return cls.empty()
+
+        indexes = [frames[t].index for t in tickers]
+        dates = np.unique(np.concatenate([np.asarray(ix, dtype='datetime64[ns]') for ix in indexes]))
+
+        shape = (len(dates), len(tickers))
+        fields = {name: np.full(shape, np.nan) for name in cls.FIELDS}
+
+        for col, ticker in enumerate(tickers):
+            df = frames[ticker]
+            if df.index.has_duplicates:
+                df = df[~df.index.duplicated(keep='last')]
+            rows = np.searchsorted(dates, np.asarray(df.index, dtype='datetime64[ns]'))
+            for name in cls.FIELDS:
+                source = cls._column_for(df, name)
+                if source is None:
+                    continue
+                fields[name][rows, col] = pd.to_numeric(df[source], errors='coerce').to_numpy(dtype=float)
+
+        valid = ~np.isnan(fields["close"])
+        row_ids = np.arange(len(dates), dtype=np.int32)[:, None]
+        last_valid = np.maximum.accumulate(np.where(valid, row_ids, -1).astype(np.int32), axis=0)
+
+        logger.info(f"Price panel built: {shape[0]} dates x {shape[1]} tickers.")
+        return cls(dates, tickers, fields, last_valid)
+
+    @staticmethod
+    def _column_for(df: pd.DataFrame, name: str) -> Optional[str]:
+        if name in df.columns:
+            return name
+        if name == "adjclose":
+            for alias in ("adj close", "adj_close"):
+                if alias in df.columns:
+                    return alias
+        return None
+
+    def _arrays(self):
+        arrays = {"dates": self.dates, "last_valid": self.last_valid}
+        arrays.update({f"field_{name}": matrix for name, matrix in self.fields.items()})
+        return {"tickers": self.tickers, "fields": list(self.fields)}, arrays
+
+    def save(self, directory: str):
+        """Persists the panel as .npy files (see `load`)."""
+        _save_arrays(directory, *self._arrays())
+
+    def update_digest(self, digest):
+        """Hashes the panel content (same arrays as `save`) into `digest`."""
+        _digest_arrays(digest, *self._arrays())
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> "PricePanel":
+        """Loads a saved panel; with mmap_mode='r' processes share the pages read-only."""
+        meta, load = _load_arrays(directory, mmap_mode)
+        fields = {name: load(f"field_{name}") for name in meta["fields"]}
+        return cls(load("dates"), meta["tickers"], fields, load("last_valid"))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def position(self, date) -> int:
+        """Row of the latest axis date on or before `date` (-1 if before the axis)."""
+        return int(np.searchsorted(self.dates, to_datetime64(date), side='right')) - 1
+
+    def positions(self, dates: Iterable) -> np.ndarray:
+        """Vectorized `position` for a sequence of dates."""
+        values = np.asarray(pd.DatetimeIndex(dates), dtype='datetime64[ns]')
+        return np.searchsorted(self.dates, values, side='right') - 1
+
+    def ticker_positions(self, tickers: Iterable[str]) -> np.ndarray:
+        """Column of each ticker in the panel (-1 for unknown tickers)."""
+        return np.array([self.ticker_index.get(t, -1) for t in tickers], dtype=np.int64)
+
+    def lookup(self, ticker: str, date, field: str = "close") -> Optional[Tuple[float, pd.Timestamp]]:
+        """Returns (value, quote_date) of the latest valid quote on or before date."""
+        col = self.ticker_index.get(ticker)
+        if col is None:
+            return None
+        pos = self.position(date)
+        if pos < 0:
+            return None
+        src = self.last_valid[pos, col]
+        if src < 0:
+            return None
+        return float(self.fields[field][src, col]), pd.Timestamp(self.dates[src])
+
+    def get_prices(self, tickers: Iterable[str], date, field: str = "close") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batch as-of lookup.
+        Returns (prices, ages) where ages are calendar days since the quote;
+        both are NaN for tickers without any quote on or before date.
+        """
+        cols = self.ticker_positions(tickers)
+        prices = np.full(len(cols), np.nan)
+        ages = np.full(len(cols), np.nan)
+        pos = self.position(date)
+        if pos < 0 or len(cols) == 0:
+            return prices, ages
+
+        known = cols >= 0
+        src = np.full(len(cols), -1, dtype=np.int64)
+        src[known] = self.last_valid[pos, cols[known]]
+        found = src >= 0
+
+        prices[found] = self.fields[field][src[found], cols[found]]
+        day = to_datetime64(date).astype('datetime64[D]').astype(np.int64)
+        ages[found] = day - self.day_numbers[src[found]]
+        return prices, ages
+
+    def series(self, ticker: str, dates: Iterable, field: str = "close") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        As-of lookup of one ticker over a sequence of dates (same values as
+        `get_prices` on each date). Returns (prices, ages), NaN where no quote.
+        """
+        pos = self.positions(dates)
+        prices = np.full(len(pos), np.nan)
+        ages = np.full(len(pos), np.nan)
+        col = self.ticker_index.get(ticker)
+        if col is None:
+            return prices, ages
+
+        src = np.full(len(pos), -1, dtype=np.int64)
+        inside = pos >= 0
+        src[inside] = self.last_valid[pos[inside], col]
+        found = src >= 0
+
+        prices[found] = self.fields[field][src[found], col]
+        days = np.asarray(pd.DatetimeIndex(dates), dtype='datetime64[D]').astype(np.int64)
+        ages[found] = days[found] - self.day_numbers[src[found]]
+        return prices, ages
+
+    def row(self, ticker: str, date) -> Optional[pd.Series]:
+        """Latest quote as a Series named by its quote date (legacy row API)."""
+        col = self.ticker_index.get(ticker)
+        if col is None:
+            return None
+        pos = self.position(date)
+        if pos < 0:
+            return None
+        src = self.last_valid[pos, col]
+        if src < 0:
+            return None
+        values = {name: self.fields[name][src, col] for name in self.FIELDS}
+        return pd.Series(values, name=pd.Timestamp(self.dates[src]))
+
+
+class FundamentalsRow:
+    """Read-only view of one ticker in a FundamentalsSnapshot (Series-like `.get` and `.name`)."""
+
+    __slots__ = ("_snapshot", "_col", "name")
+
+    def __init__(self, snapshot: "FundamentalsSnapshot", col: int):
+        self._snapshot = snapshot
+        self._col = col
+        self.name = snapshot.report_date(col)
+
+    def get(self, indicator: str, default=None):
+        if not self._snapshot.has(indicator)[self._col]:
+            return default
+        return self._snapshot.get(indicator)[self._col]
+
+    def __getitem__(self, indicator: str):
+        value = self.get(indicator)
+        if value is None:
+            raise KeyError(indicator)
+        return value
+
+
+class FundamentalsSnapshot:
+    """Point-in-time cross-section of every ticker's latest report on a date."""
+
+    def __init__(self, panel: "FundamentalsPanel", date, rows: np.ndarray):
+        self.panel = panel
+        self.date = pd.Timestamp(date)
+        self.rows = rows
+        self.available = rows >= 0
+        self._values = {}
+
+        day = to_datetime64(date).astype('datetime64[D]').astype(np.int64)
+        self.ages = np.full(len(rows), np.nan)
+        self.ages[self.available] = day - panel.report_days[rows[self.available]]
+
+    def has(self, indicator: str) -> np.ndarray:
+        """Per-ticker flag: True when the ticker's financials carry this indicator."""
+        return self.panel.present.get(indicator, self.panel.no_tickers)
+
+    def get(self, indicator: str) -> np.ndarray:
+        """Indicator values for every ticker (NaN where missing)."""
+        values = self._values.get(indicator)
+        if values is None:
+            values = self.panel.gather(indicator, self.rows)
+            self._values[indicator] = values
+        return values
+
+    def report_date(self, col: int) -> Optional[pd.Timestamp]:
+        row = self.rows[col]
+        if row < 0:
+            return None
+        return pd.Timestamp(self.panel.report_dates[row])
+
+    def row(self, ticker: str) -> Optional[FundamentalsRow]:
+        col = self.panel.ticker_index.get(ticker)
+        if col is None or self.rows[col] < 0:
+            return None
+        return FundamentalsRow(self, col)
+
+
+class FundamentalsSeries:
+    """
+    One ticker's point-in-time reports over a sequence of dates. Exposes the
+    `rows`/`available`/`get`/`has` interface of a snapshot, so compiled rules
+    evaluate a ticker over time in one pass.
+    """
+
+    def __init__(self, panel: "FundamentalsPanel", col: Optional[int], rows: np.ndarray):
+        self.panel = panel
+        self.col = col
+        self.rows = rows
+        self.available = rows >= 0
+
+    def has(self, indicator: str) -> np.ndarray:
+        present = self.col is not None and bool(self.panel.present.get(indicator, self.panel.no_tickers)[self.col])
+        return np.full(len(self.rows), present)
+
+    def get(self, indicator: str) -> np.ndarray:
+        return self.panel.gather(indicator, self.rows)
+
+
+class FundamentalsPanel:
+    """
+    Point-in-time fundamentals aligned to a trading-date axis.
+
+    Reports of every ticker are stacked in one table (`values[indicator][report]`)
+    and `report_idx[d, t]` points to the latest report of ticker t dated on or
+    before axis row d (-1 when none). The axis is the price axis plus every
+    filing date, so an as-of lookup for any date is one `searchsorted` and one
+    matrix row read. Dense day x ticker matrices are materialized lazily.
+    """
+
+    def __init__(self, dates, tickers, report_dates, values, present, report_idx):
+        self.dates = dates.astype('datetime64[ns]')
+        self.tickers = list(tickers)
+        self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.report_dates = report_dates.astype('datetime64[ns]')
+        self.report_days = self.report_dates.astype('datetime64[D]').astype(np.int64)
+        self.values = values
+        self.present = present
+        self.report_idx = report_idx
+        self.no_tickers = np.zeros(len(self.tickers), dtype=bool)
+        self._matrices = {}
+
+    @property
+    def indicators(self) -> list:
+        return sorted(self.values.keys())
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], tickers: list, axis_dates: np.ndarray) -> "FundamentalsPanel":
+        """Builds the panel for `tickers` (column order) from per-ticker report frames."""
+        tickers = list(tickers)
+        frames = {
+            t: frames[t] for t in tickers
+            if t in frames and not frames[t].empty and isinstance(frames[t].index, pd.DatetimeIndex)
+        }
+
+        indicators = set()
+        for df in frames.values():
+            indicators.update(c for c in df.columns if df[c].dtype.kind in 'fiub')
+        indicators = sorted(indicators)
+
+        report_dates = [np.asarray(df.index, dtype='datetime64[ns]') for df in frames.values()]
+        all_reports = np.concatenate(report_dates) if report_dates else np.array([], dtype='datetime64[ns]')
+        dates = np.union1d(np.asarray(axis_dates, dtype='datetime64[ns]'), all_reports)
+
+        total = len(all_reports)
+        values = {name: np.full(total, np.nan) for name in indicators}
+        present = {name: np.zeros(len(tickers), dtype=bool) for name in indicators}
+        report_idx = np.full((len(dates), len(tickers)), -1, dtype=np.int32)
+
+        offset = 0
+        for col, ticker in enumerate(tickers):
+            df = frames.get(ticker)
+            if df is None:
+                continue
+            n = len(df)
+            for name in indicators:
+                if name in df.columns:
+                    present[name][col] = True
+                    values[name][offset:offset + n] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+            local = np.searchsorted(np.asarray(df.index, dtype='datetime64[ns]'), dates, side='right') - 1
+            report_idx[:, col] = np.where(local >= 0, local + offset, -1)
+            offset += n
+
+        logger.info(f"Fundamentals panel built: {len(dates)} dates x {len(tickers)} tickers, {total} reports, {len(indicators)} indicators.")
+        return cls(dates, tickers, all_reports, values, present, report_idx)
+
+    @classmethod
+    def empty(cls) -> "FundamentalsPanel":
+        none = np.array([], dtype='datetime64[ns]')
+        return cls(none, [], none, {}, {}, np.empty((0, 0), dtype=np.int32))
+
+    def _arrays(self):
+        indicators = sorted(self.values)
+        arrays = {"dates": self.dates, "report_dates": self.report_dates, "report_idx": self.report_idx}
+        for i, indicator in enumerate(indicators):
+            arrays[f"values_{i}"] = self.values[indicator]
+            arrays[f"present_{i}"] = self.present[indicator]
+        return {"tickers": self.tickers, "indicators": indicators}, arrays
+
+    def save(self, directory: str):
+        """Persists the panel as .npy files (see `load`)."""
+        _save_arrays(directory, *self._arrays())
+
+    def update_digest(self, digest):
+        """Hashes the panel content (same arrays as `save`) into `digest`."""
+        _digest_arrays(digest, *self._arrays())
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> "FundamentalsPanel":
+        """Loads a saved panel; with mmap_mode='r' processes share the pages read-only."""
+        meta, load = _load_arrays(directory, mmap_mode)
+        values, present = {}, {}
+        for i, indicator in enumerate(meta["indicators"]):
+            values[indicator] = load(f"values_{i}")
+            present[indicator] = load(f"present_{i}")
+        return cls(load("dates"), meta["tickers"], load("report_dates"), values, present, load("report_idx"))
+
+    def position(self, date) -> int:
+        return int(np.searchsorted(self.dates, to_datetime64(date), side='right')) - 1
+
+    def report_rows(self, date) -> np.ndarray:
+        """Report row of each ticker as of date (-1 when none)."""
+        pos = self.position(date)
+        if pos < 0:
+            return np.full(len(self.tickers), -1, dtype=np.int32)
+        return self.report_idx[pos]
+
+    def snapshot(self, date) -> FundamentalsSnapshot:
+        return FundamentalsSnapshot(self, date, self.report_rows(date))
+
+    def ticker_series(self, ticker: str, dates: Iterable) -> FundamentalsSeries:
+        """Reports of one ticker as of each date."""
+        col = self.ticker_index.get(ticker)
+        values = np.asarray(pd.DatetimeIndex(dates), dtype='datetime64[ns]')
+        pos = np.searchsorted(self.dates, values, side='right') - 1
+        rows = np.full(len(pos), -1, dtype=np.int64)
+        if col is not None:
+            inside = pos >= 0
+            rows[inside] = self.report_idx[pos[inside], col]
+        return FundamentalsSeries(self, col, rows)
+
+    def gather(self, indicator: str, rows: np.ndarray) -> np.ndarray:
+        """Values of an indicator at the given report rows (NaN for -1 or unknown indicators)."""
+        out = np.full(len(rows), np.nan)
+        source = self.values.get(indicator)
+        if source is None:
+            return out
+        found = rows >= 0
+        out[found] = source[rows[found]]
+        return out
+
+    def matrix(self, indicator: str) -> np.ndarray:
+        """Forward-filled as-of matrix (axis date x ticker) for one indicator, cached."""
+        matrix = self._matrices.get(indicator)
+        if matrix is None:
+            matrix = self.gather(indicator, self.report_idx.ravel()).reshape(self.report_idx.shape)
+            self._matrices[indicator] = matrix
+        return matrix
+
+    def age_matrix(self) -> np.ndarray:
+        """Report age in days (axis date x ticker), NaN before the first report."""
+        matrix = self._matrices.get("__age__")
+        if matrix is None:
+            axis_days = self.dates.astype('datetime64[D]').astype(np.int64)[:, None]
+            found = self.report_idx >= 0
+            matrix = np.full(self.report_idx.shape, np.nan)
+            matrix[found] = (axis_days - self.report_days[np.maximum(self.report_idx, 0)])[found]
+            self._matrices["__age__"] = matrix
+        return matrix
@@ -1,10 +1,13 @@
-
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Dict
+from types import MappingProxyType
+from typing import List, Dict, Iterable, Mapping, Optional
+
+from backtest.history import HistoryRecorder
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     date: datetime
     ticker: str
@@ -14,21 +17,128 @@ class Transaction:
     fees: float = 0.0
     total_value: float = 0.0
 
+TRANSACTION_DTYPE = np.dtype([
+    ('date', 'datetime64[ns]'), ('ticker', object), ('action', 'U4'), ('quantity', np.int64),
+    ('price', np.float64), ('fees', np.float64), ('total_value', np.float64),
+])
+
 class Portfolio:
-    def __init__(self, initial_capital: float):
+    """
+    Array-backed portfolio: one slot per ticker (the provider's asset order,
+    unknown tickers appended on first buy) with quantity / avg_price /
+    last_price vectors. `order` keeps the held slots in purchase order, which
+    is the iteration order of `holdings` and of the valuation sum.
+    """
+
+    def __init__(self, initial_capital: float, tickers: Iterable[str] = (),
+                 book: Optional["PortfolioBook"] = None, row: int = 0):
         self.initial_capital = initial_capital
         self.cash = initial_capital
-        self.holdings: Dict[str, dict] = {} # {ticker: {'quantity': 100, 'avg_price': 10.0}}
+        self.book = book
+        self.row = row
+        if book is not None:
+            # The vectors are views of row `row` of the book's matrices
+            book.attach(self, row)
+        else:
+            self.tickers: List[str] = list(tickers)
+            self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+            self.quantity = np.zeros(len(self.tickers), dtype=np.int64)
+            self.avg_price = np.zeros(len(self.tickers))
+            self.last_price = np.full(len(self.tickers), np.nan)  # NaN: not marked since the buy
+        self.order: List[int] = []
         self.transactions: List[Transaction] = []
-        self.history: List[dict] = [] # Daily NAV snapshot
+        self.history = HistoryRecorder() # Daily NAV snapshots (columnar)
+
+    # --- Slots ---
+
+    def slot(self, ticker: str) -> int:
+        """Slot of a ticker, creating one for tickers outside the initial universe."""
+        index = self.ticker_index.get(ticker)
+        if index is None and self.book is not None:
+            index = self.book.add_ticker(ticker)
+        elif index is None:
+            index = len(self.tickers)
+            self.tickers.append(ticker)
+            self.ticker_index[ticker] = index
+            self.quantity = np.append(self.quantity, 0)
+            self.avg_price = np.append(self.avg_price, 0.0)
+            self.last_price = np.append(self.last_price, np.nan)
+        return index
+
+    @property
+    def held(self) -> List[str]:
+        """Held tickers in purchase order."""
+        return [self.tickers[i] for i in self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, ticker: str) -> bool:
+        index = self.ticker_index.get(ticker)
+        return index is not None and self.quantity[index] > 0
+
+    def quantity_of(self, ticker: str) -> int:
+        index = self.ticker_index.get(ticker)
+        return int(self.quantity[index]) if index is not None else 0
+
+    def avg_price_of(self, ticker: str) -> float:
+        return float(self.avg_price[self.ticker_index[ticker]])
+
+    def mark_price_of(self, ticker: str) -> float:
+        """Last marked price, or the average price when not marked yet."""
+        index = self.ticker_index[ticker]
+        last = self.last_price[index]
+        return float(self.avg_price[index] if np.isnan(last) else last)
+
+    def mark(self, tickers: Iterable[str], prices: Iterable[float]):
+        """Records the latest prices of held tickers."""
+        for ticker, price in zip(tickers, prices):
+            self.last_price[self.ticker_index[ticker]] = price
+
+    @property
+    def holdings(self) -> Mapping[str, Mapping[str, float]]:
+        """
+        Read-only snapshot {ticker: {'quantity', 'avg_price'[, 'current_price']}} in
+        purchase order. Positions change through buy / sell / set_holdings only:
+        writing into the snapshot raises TypeError.
+        """
+        view = {}
+        for i in self.order:
+            holding = {'quantity': int(self.quantity[i]), 'avg_price': float(self.avg_price[i])}
+            if not np.isnan(self.last_price[i]):
+                holding['current_price'] = float(self.last_price[i])
+            view[self.tickers[i]] = MappingProxyType(holding)
+        return MappingProxyType(view)
+
+    def set_holdings(self, holdings: Mapping[str, Mapping]):
+        """Replaces the positions with a `holdings`-style dict (see the property)."""
+        self.quantity[:] = 0
+        self.avg_price[:] = 0.0
+        self.last_price[:] = np.nan
+        self.order = []
+        for ticker, holding in holdings.items():
+            index = self.slot(ticker)
+            self.quantity[index] = holding['quantity']
+            self.avg_price[index] = holding['avg_price']
+            self.last_price[index] = holding.get('current_price', np.nan)
+            self.order.append(index)
+
+    # --- Valuation ---
+
+    def holdings_value(self, prices: np.ndarray) -> np.ndarray:
+        """
+        Value of the held quantities at `prices` laid out in purchase order:
+        shape (k,) for one session or (sessions, k) for several.
+        """
+        if not self.order:
+            return np.zeros(np.shape(prices)[:-1]) if np.ndim(prices) > 1 else 0.0
+        return (np.asarray(prices) * self.quantity[self.order]).sum(axis=-1)
 
     def get_total_value(self, current_prices: Dict[str, float]) -> float:
         """Calculates total portfolio value (Cash + Holdings * Price)."""
-        holdings_value = 0.0
-        for ticker, data in self.holdings.items():
-            price = current_prices.get(ticker, data['avg_price']) # Fallback if price missing?
-            holdings_value += data['quantity'] * price
-        return self.cash + holdings_value
+        # Fallback to avg_price when a price is missing
+        prices = [current_prices.get(self.tickers[i], self.avg_price[i]) for i in self.order]
+        return self.cash + self.holdings_value(np.array(prices, dtype=float))
 
     def buy(self, date: datetime, ticker: str, quantity: int, price: float, fees: float = 0.0):
         if quantity <= 0: return
@@ -39,52 +149,119 @@ class Portfolio:
             return False
 
         self.cash -= total_cost
-        
+
         # Update Holdings
-        if ticker not in self.holdings:
-            self.holdings[ticker] = {'quantity': 0, 'avg_price': 0.0}
-        
-        current_q = self.holdings[ticker]['quantity']
-        current_avg = self.holdings[ticker]['avg_price']
-        
+        index = self.slot(ticker)
+        current_q = int(self.quantity[index])
+        current_avg = float(self.avg_price[index])
+        if current_q == 0:
+            self.order.append(index)
+            self.last_price[index] = np.nan
+
         new_q = current_q + quantity
         new_avg = ((current_q * current_avg) + (quantity * price)) / new_q
-        
-        self.holdings[ticker]['quantity'] = new_q
-        self.holdings[ticker]['avg_price'] = new_avg
-        
+
+        self.quantity[index] = new_q
+        self.avg_price[index] = new_avg
+
         # Log
-        txn = Transaction(date, ticker, 'BUY', quantity, price, fees, total_cost)
+        txn = Transaction(date, ticker, 'BUY', int(quantity), price, fees, total_cost)
         self.transactions.append(txn)
         return True
 
     def sell(self, date: datetime, ticker: str, quantity: int, price: float, fees: float = 0.0):
-        if ticker not in self.holdings: return False
-        current_q = self.holdings[ticker]['quantity']
-        
+        index = self.ticker_index.get(ticker)
+        if index is None or self.quantity[index] == 0: return False
+        current_q = int(self.quantity[index])
+
         if quantity > current_q: quantity = current_q # Sell all available
-        
+
         if quantity <= 0: return False
-        
+
         total_proceeds = (quantity * price) - fees
         self.cash += total_proceeds
-        
+
         # Update Holdings
-        self.holdings[ticker]['quantity'] -= quantity
-        if self.holdings[ticker]['quantity'] == 0:
-            del self.holdings[ticker]
-            
+        self.quantity[index] -= quantity
+        if self.quantity[index] == 0:
+            self.order.remove(index)
+            self.avg_price[index] = 0.0
+            self.last_price[index] = np.nan
+
         # Log
-        txn = Transaction(date, ticker, 'SELL', quantity, price, fees, total_proceeds)
+        txn = Transaction(date, ticker, 'SELL', int(quantity), price, fees, total_proceeds)
         self.transactions.append(txn)
         return True
 
     def snapshot(self, date: datetime, current_prices: Dict[str, float]):
         """Records daily state."""
         total_val = self.get_total_value(current_prices)
-        self.history.append({
-            'date': date,
-            'total_value': total_val,
-            'cash': self.cash,
-            'holdings_count': len(self.holdings)
-        })
+        self.history.append(date, total_val, self.cash, len(self.order))
+
+    def transaction_records(self) -> np.ndarray:
+        """Trade log as a NumPy record array (TRANSACTION_DTYPE), for vectorized analysis."""
+        return np.array([
+            (pd.Timestamp(t.date).to_datetime64(), t.ticker, t.action, t.quantity, t.price, t.fees, t.total_value)
+            for t in self.transactions
+        ], dtype=TRANSACTION_DTYPE).view(np.recarray)
+
+
+class PortfolioBook:
+    """
+    Positions of K portfolios run side by side (see backtest.batch), stored as
+    K x tickers quantity / avg_price / last_price matrices. Each attached
+    Portfolio works on its row through views, so its own logic (and results)
+    are unchanged, while the book reads every portfolio's state at once.
+    """
+
+    def __init__(self, size: int, tickers: Iterable[str] = ()):
+        self.tickers: List[str] = list(tickers)
+        self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.quantity = np.zeros((size, len(self.tickers)), dtype=np.int64)
+        self.avg_price = np.zeros((size, len(self.tickers)))
+        self.last_price = np.full((size, len(self.tickers)), np.nan)
+        self.portfolios: List[Optional[Portfolio]] = [None] * size
+
+    def __len__(self):
+        return len(self.portfolios)
+
+    def portfolio(self, initial_capital: float, row: int) -> Portfolio:
+        """New (empty) portfolio on `row`, replacing the row's previous one."""
+        return Portfolio(initial_capital, book=self, row=row)
+
+    def attach(self, portfolio: Portfolio, row: int):
+        self.quantity[row] = 0
+        self.avg_price[row] = 0.0
+        self.last_price[row] = np.nan
+        self.portfolios[row] = portfolio
+        self._bind(portfolio, row)
+
+    def _bind(self, portfolio: Portfolio, row: int):
+        portfolio.tickers = self.tickers
+        portfolio.ticker_index = self.ticker_index
+        portfolio.quantity = self.quantity[row]
+        portfolio.avg_price = self.avg_price[row]
+        portfolio.last_price = self.last_price[row]
+
+    def add_ticker(self, ticker: str) -> int:
+        """Column for a ticker outside the initial universe (grows every row)."""
+        index = len(self.tickers)
+        self.tickers.append(ticker)
+        self.ticker_index[ticker] = index
+        size = len(self.portfolios)
+        self.quantity = np.hstack([self.quantity, np.zeros((size, 1), dtype=np.int64)])
+        self.avg_price = np.hstack([self.avg_price, np.zeros((size, 1))])
+        self.last_price = np.hstack([self.last_price, np.full((size, 1), np.nan)])
+        for row, portfolio in enumerate(self.portfolios):
+            if portfolio is not None:
+                self._bind(portfolio, row)
+        return index
+
+    @property
+    def cash(self) -> np.ndarray:
+        return np.array([p.cash if p is not None else 0.0 for p in self.portfolios])
+
+    def market_values(self) -> np.ndarray:
+        """Total value of every portfolio at its latest marks (avg price when unmarked)."""
+        marks = np.where(np.isnan(self.last_price), self.avg_price, self.last_price)
+        return self.cash + (self.quantity * marks).sum(axis=1)
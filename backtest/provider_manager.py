@@ -0,0 +1,116 @@
+import os
+import time
+import logging
+import threading
+
+from backtest.data_provider import DataProvider
+
+logger = logging.getLogger("DataProviderManager")
+
+
+class DataProviderManager:
+    """
+    Process-wide, warm DataProvider shared across API requests.
+
+    The first `start()` loads prices, financials and benchmarks once. `get()`
+    returns the current provider and, at most every `check_interval` seconds,
+    compares the source files' mtimes/sizes with the loaded snapshot. On change a
+    fresh provider is loaded in a background thread and swapped in atomically
+    (double buffering): requests already running keep the provider they got.
+    """
+
+    def __init__(self, provider_kwargs=None, check_interval=30.0, fetch_benchmarks=True):
+        self.provider_kwargs = provider_kwargs or {}
+        self.check_interval = check_interval
+        self.fetch_benchmarks = fetch_benchmarks
+        self._current = None
+        self._current_sources = None
+        self._lock = threading.Lock()
+        self._reload_thread = None
+        self._last_check = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    def start(self) -> DataProvider:
+        """Loads the first snapshot (blocking). Safe to call more than once."""
+        with self._lock:
+            if self._current is None:
+                provider, sources = self._build(None)
+                self._swap(provider, sources)
+            return self._current
+
+    def get(self) -> DataProvider:
+        """Current snapshot; triggers a background reload when sources changed."""
+        if self._current is None:
+            return self.start()
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self.check_for_updates()
+        return self._current
+
+    def check_for_updates(self, wait=False) -> bool:
+        """Starts a reload if the source files changed. Returns True when one is pending."""
+        current = self._current
+        if current is None or self.source_signature(current) == self._current_sources:
+            return False
+
+        with self._lock:
+            running = self._reload_thread is not None and self._reload_thread.is_alive()
+            if not running:
+                self._reload_thread = threading.Thread(target=self._reload, name="DataProviderReload", daemon=True)
+                self._reload_thread.start()
+            thread = self._reload_thread
+
+        if wait:
+            thread.join()
+        return True
+
+    def _reload(self):
+        try:
+            provider, sources = self._build(self._current)
+            with self._lock:
+                self._swap(provider, sources)
+        except Exception as e:
+            logger.error(f"Data reload failed, keeping previous snapshot: {e}")
+
+    def _build(self, previous):
+        provider = DataProvider(**self.provider_kwargs)
+        # Signature taken before loading so a write during the load triggers another reload
+        sources = self.source_signature(provider)
+        start = time.monotonic()
+        provider.load_data()
+
+        # Pre-build the per-ticker financial frames (also for tickers without prices)
+        for ticker in provider.financials_data:
+            provider.get_financials_data(ticker)
+
+        # Benchmarks come from Ipeadata, not from the watched files: fetch once and carry over
+        if previous is not None and previous.benchmarks:
+            provider.benchmarks = previous.benchmarks
+            # Same series: reuse their precomputed levels (the old snapshot keeps its own service)
+            provider.benchmark_service = previous.benchmark_service.for_provider(provider)
+        elif self.fetch_benchmarks:
+            provider.fetch_benchmarks()
+
+        logger.info(f"DataProvider snapshot loaded in {time.monotonic() - start:.1f}s ({len(provider.assets_list)} assets).")
+        return provider, sources
+
+    def _swap(self, provider, sources):
+        self._current = provider
+        self._current_sources = sources
+
+    @staticmethod
+    def source_signature(provider: DataProvider) -> tuple:
+        """(path, mtime, size) of every file the provider loads from."""
+        signature = []
+        for path in (provider.data_path, provider.price_path):
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        signature.append((provider.price_store.root, provider.price_store.last_modified(), None))
+        return tuple(signature)
@@ -1,16 +1,22 @@
 
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import logging
-from typing import List
+from typing import Dict, List, Union
 from backtest.domain import BacktestResult
+from backtest.benchmark import BenchmarkService
+from backtest.downsample import lttb_indices
 
 logger = logging.getLogger("BacktestReporter")
 
 class BacktestReporter:
-    def __init__(self, result: BacktestResult, benchmarks: dict):
+    def __init__(self, result: BacktestResult, benchmarks: Union[BenchmarkService, Dict[str, pd.Series]]):
         self.result = result
-        self.benchmarks = benchmarks # Dict of Series
+        # Provider's BenchmarkService (same curves as the engine) or a dict of Series
+        if not isinstance(benchmarks, BenchmarkService):
+            benchmarks = BenchmarkService.from_series(benchmarks)
+        self.benchmarks = benchmarks
         self.history_df = pd.DataFrame(result.dict_history) if hasattr(result, 'dict_history') else pd.DataFrame()
         
     def generate_html_report(self, output_path="web/public/backtest_report.html"):
@@ -29,12 +35,17 @@ class BacktestReporter:
         # But for now let's assume I will fix engine.
         pass
 
-    def plot_performance(self, history: List[dict], trades: List[dict]):
+    def plot_performance(self, history: List[dict], trades: List[dict], max_points: int = 2000):
         df = pd.DataFrame(history)
         if df.empty: return None
         
         df['date'] = pd.to_datetime(df['date'])
         df.set_index('date', inplace=True)
+
+        # Long runs: plot a shape-preserving subset (LTTB) instead of every session
+        if len(df) > max_points:
+            days = df.index.values.astype('datetime64[D]').astype(np.int64)
+            df = df.iloc[lttb_indices(days, df['total_value'].to_numpy(dtype=float), max_points)]
         
         # Normalize Portfolio
         start_val = df['total_value'].iloc[0]
@@ -51,32 +62,13 @@ class BacktestReporter:
         
         # Benchmarks
         colors = {'IBOV': '#6c8dd9', 'SELIC_Rate': '#ff8a80', 'IPCA': 'orange'}
-        for name, series in self.benchmarks.items():
-            if series.empty: continue
-            # Align dates
-            subset = series.loc[df.index.min():df.index.max()]
-            if subset.empty: continue
-            
-            # Reindex to match portfolio dates (ffill)
-            subset = subset.reindex(df.index, method='ffill')
-            
-            # Calculated cumulative from subset start
-            if name == 'SELIC_Rate':
-                 # Daily factor: (1+r)^(1/252)
-                 # already divided by 100 in data_provider
-                 factors = (1 + subset) ** (1/252)
-                 cum = factors.cumprod() - 1
-            elif name == 'IPCA':
-                 # Monthly %
-                 cum = (1 + subset).cumprod() - 1
-            else:
-                 # Index points
-                 start = subset.iloc[0]
-                 if start == 0: continue
-                 cum = (subset / start) - 1
-                 
+        for name in self.benchmarks.series:
+            # Cumulative return since the first portfolio date, as of each portfolio date
+            cum = self.benchmarks.cumulative_on(name, df.index)
+            if pd.isna(cum).all(): continue
+
             fig.add_trace(go.Scatter(
-                x=subset.index, y=cum,
+                x=df.index, y=cum,
                 mode='lines', name=name,
                 line=dict(color=colors.get(name, 'gray'), dash='dot' if name != 'IBOV' else 'solid')
             ))
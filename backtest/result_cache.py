@@ -0,0 +1,173 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from backtest.domain import StrategyConfigRequest
+
+logger = logging.getLogger("ResultCache")
+
+# Version of the simulation and of the encoded responses, part of every key: bump it
+# whenever engine logic, metrics or serialization change what a config produces, so
+# results persisted by an older build (SQLite tier) are never served again
+RESULT_VERSION = 3
+
+
+def config_hash(config: StrategyConfigRequest) -> str:
+    """Canonical hash of a config: field order and JSON formatting do not matter."""
+    payload = json.dumps(config.model_dump(), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cache_key(config: StrategyConfigRequest, fingerprint: str, version: int = RESULT_VERSION) -> str:
+    """Result key: result version + dataset fingerprint (see DataProvider.fingerprint) + config hash."""
+    return f"v{version}:{fingerprint}:{config_hash(config)}"
+
+
+def history_key(key: str) -> str:
+    """Key of the full-resolution history stored next to a result (see MultiResolutionHistory)."""
+    return f"{key}:history"
+
+
+class ResultCache:
+    """
+    Two-tier cache of encoded backtest responses (bytes).
+
+    - Memory: LRU bounded by `max_memory_bytes`.
+    - Disk (optional): SQLite table bounded by `max_disk_bytes`, evicting the
+      least recently read rows. Disk hits are promoted to memory.
+
+    `get_or_compute` is single-flight: concurrent callers of the same key wait
+    for the first one instead of running the same simulation again. Failures
+    are not cached; every waiter gets the exception.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_bytes: int = 256 * 2**20,
+                 max_disk_bytes: int = 2 * 2**30):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        if path:
+            with self._connect() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:  # commit / rollback
+                yield db
+        finally:
+            db.close()
+
+    # --- Tiers ---
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+        if not self.path:
+            return None
+
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        value = bytes(row[0])
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: bytes):
+        self._remember(key, value)
+        if not self.path or len(value) > self.max_disk_bytes:
+            return
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                       (key, value, len(value), time.time()))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_disk_bytes:
+                evicted = 0
+                for old_key, size in db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+                    if total <= self.max_disk_bytes:
+                        break
+                    if old_key == key:
+                        continue
+                    db.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                    total -= size
+                    evicted += 1
+                logger.info(f"Result cache: evicted {evicted} entries from disk.")
+
+    def _remember(self, key: str, value: bytes):
+        if len(value) > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = value
+            self._memory_bytes += len(value)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.path:
+            with self._connect() as db:
+                db.execute("DELETE FROM results")
+
+    # --- Single-flight ---
+
+    def get_or_compute(self, key: str, compute: Callable[[], bytes]) -> bytes:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            # A leader may have finished between the lookup above and here
+            value = self._memory.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self.hits += 1
+            return future.result()
+
+        self.misses += 1
+        try:
+            value = compute()
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
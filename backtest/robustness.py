@@ -0,0 +1,166 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backtest.calendar import get_trading_calendar
+from backtest.data_provider import DataProvider
+from backtest.domain import StrategyConfigRequest
+from backtest.metrics import period_returns
+from backtest.sweep import ParameterSweep
+
+logger = logging.getLogger("Robustness")
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+METRICS = ("final_capital", "cagr", "max_drawdown")
+
+
+@dataclass
+class RobustnessReport:
+    mode: str
+    paths: int
+    percentiles: Dict[str, Dict[str, float]]
+    mean: Dict[str, float]
+    samples: Dict[str, List[float]] = field(default_factory=dict)
+    errors: List[dict] = field(default_factory=list)
+
+
+def distribution(samples: Dict[str, np.ndarray], percentiles: Sequence[float] = DEFAULT_PERCENTILES):
+    """Percentile table ({metric: {"p5": ...}}) and mean of each metric's samples."""
+    table, mean = {}, {}
+    for metric, values in samples.items():
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+        points = np.percentile(values, percentiles)
+        table[metric] = {f"p{p:g}": float(v) for p, v in zip(percentiles, points)}
+        mean[metric] = float(values.mean())
+    return table, mean
+
+
+def path_metrics(paths: np.ndarray, years: float, index: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Final value, CAGR and max drawdown of each row of an equity matrix (paths x days).
+    CAGR and drawdowns come from `index`, the flow-neutral growth of each path,
+    when given (contributions are not growth), else from the equity itself.
+    """
+    index = paths if index is None else index
+    final = paths[:, -1]
+    growth = index[:, -1] / index[:, 0]
+    cagr = np.zeros(len(paths))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Same convention as BacktestEngine.run: 0 when the period is empty or the capital is wiped out
+        if years > 0:
+            cagr = np.where(growth > 0, np.abs(growth) ** (1 / years) - 1, 0.0)
+        drawdown = (index / np.maximum.accumulate(index, axis=1) - 1).min(axis=1)
+    return {"final_capital": final, "cagr": cagr, "max_drawdown": drawdown}
+
+
+class RobustnessAnalyzer:
+    """
+    Distribution of a strategy's outcomes over many perturbed paths.
+
+    - random_starts: N runs with start dates drawn from the trading calendar
+    - universe_subsamples: N runs on random subsets of the universe (the rest is blacklisted)
+    - block_bootstrap: one run, then N paths rebuilt from blocks of its daily returns
+
+    Simulation modes fan out over the sweep's process pool: workers share the
+    memory-mapped panels and keep their entry-screen cache across paths.
+    """
+
+    def __init__(self, sweep: ParameterSweep, seed: Optional[int] = None,
+                 percentiles: Sequence[float] = DEFAULT_PERCENTILES):
+        self.sweep = sweep
+        self.rng = np.random.default_rng(seed)
+        self.percentiles = tuple(percentiles)
+
+    def random_starts(self, base: StrategyConfigRequest, paths: int, min_years: float = 1.0,
+                      horizon_months: Optional[int] = None) -> RobustnessReport:
+        """Start dates drawn among the sessions leaving at least `min_years` before the end date."""
+        start = pd.Timestamp(base.start_date)
+        end = pd.Timestamp(base.end_date)
+        sessions = get_trading_calendar().sessions_in_range(start, end - pd.Timedelta(days=int(min_years * 365.25)))
+        if len(sessions) == 0:
+            raise ValueError(f"Period {base.start_date}..{base.end_date} is shorter than min_years={min_years}.")
+
+        starts = pd.DatetimeIndex(np.sort(self.rng.choice(sessions.values, size=paths)))
+        variants = []
+        for path, day in enumerate(starts):
+            path_end = min(day + pd.DateOffset(months=horizon_months), end) if horizon_months else end
+            config = base.model_copy(update={
+                "start_date": day.date().isoformat(),
+                "end_date": path_end.date().isoformat(),
+            }, deep=True)
+            variants.append(({"path": path, "start_date": config.start_date}, config))
+        return self._simulate("random_starts", variants)
+
+    def universe_subsamples(self, base: StrategyConfigRequest, paths: int, fraction: float = 0.8) -> RobustnessReport:
+        """Each path trades a random `fraction` of the universe."""
+        universe = DataProvider.from_snapshot(self.sweep.snapshot_dir).assets_list
+        keep = max(1, int(round(len(universe) * fraction)))
+        variants = []
+        for path in range(paths):
+            kept = set(self.rng.choice(len(universe), size=keep, replace=False).tolist())
+            excluded = [ticker for i, ticker in enumerate(universe) if i not in kept]
+            config = base.model_copy(update={
+                "blacklisted_assets": list(base.blacklisted_assets) + excluded,
+            }, deep=True)
+            variants.append(({"path": path, "excluded": len(excluded)}, config))
+        return self._simulate("universe_subsamples", variants)
+
+    def block_bootstrap(self, base: StrategyConfigRequest, paths: int, block_days: int = 21) -> RobustnessReport:
+        """
+        Resamples blocks of `block_days` daily returns of the base run (with
+        replacement) into `paths` equity curves of the same length. Returns are
+        flow neutral (see metrics.period_returns); each path re-applies the
+        run's contributions on their sessions, so they are never counted as gains.
+        """
+        summary = next(self.sweep.run_variants([({"path": "base"}, base)], with_history=True))
+        if "error" in summary:
+            return RobustnessReport("block_bootstrap", 0, {}, {}, errors=[summary])
+
+        dates = pd.DatetimeIndex([d for d, _ in summary["history"]])
+        nav = np.array([v for _, v in summary["history"]], dtype=float)
+        flows = np.array(summary["flows"], dtype=float)
+        returns = period_returns(nav, flows)[1:]
+        days = len(returns)
+        if days == 0:
+            return RobustnessReport("block_bootstrap", 0, {}, {}, errors=[{"error": "Empty equity curve"}])
+
+        block_days = max(1, min(block_days, days))
+        blocks = -(-days // block_days)
+        starts = self.rng.integers(0, days - block_days + 1, size=(paths, blocks))
+        index = (starts[:, :, None] + np.arange(block_days)).reshape(paths, -1)[:, :days]
+        sampled = 1 + returns[index]
+        # Session t+1 grows from values[t] + flows[t] (contribution after the snapshot)
+        equity = np.empty((paths, days + 1))
+        equity[:, 0] = nav[0]
+        for t in range(days):
+            equity[:, t + 1] = (equity[:, t] + flows[t]) * sampled[:, t]
+        growth = np.hstack([np.ones((paths, 1)), np.cumprod(sampled, axis=1)])
+
+        years = (dates[-1] - dates[0]).days / 365.25
+        return self._report("block_bootstrap", path_metrics(equity, years, growth), [])
+
+    def _simulate(self, mode: str, variants) -> RobustnessReport:
+        results = list(self.sweep.run_variants(variants))
+        errors = [r for r in results if "error" in r]
+        ok = sorted((r for r in results if "error" not in r), key=lambda r: r["index"])
+        samples = {metric: np.array([r[metric] for r in ok], dtype=float) for metric in METRICS}
+        return self._report(mode, samples, errors)
+
+    def _report(self, mode, samples, errors) -> RobustnessReport:
+        table, mean = distribution(samples, self.percentiles)
+        paths = len(next(iter(samples.values()))) if samples else 0
+        logger.info(f"Robustness ({mode}): {paths} paths, {len(errors)} errors.")
+        return RobustnessReport(
+            mode=mode,
+            paths=paths,
+            percentiles=table,
+            mean=mean,
+            samples={metric: np.asarray(values, dtype=float).tolist() for metric, values in samples.items()},
+            errors=errors,
+        )
@@ -0,0 +1,182 @@
+import operator as op
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+# Indicators whose zero value means "no reliable data" for the entry screen
+ZERO_SENSITIVE_INDICATORS = frozenset(['p_l', 'p_vp', 'roe', 'roic', 'ev_ebitda'])
+
+COMPARISONS = {
+    '>': op.gt,
+    '>=': op.ge,
+    '<': op.lt,
+    '<=': op.le,
+    '==': op.eq,
+}
+
+
+def _field(obj, name, default=None):
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def _bound(value) -> float:
+    """Rule thresholds as floats; a missing threshold never matches (NaN)."""
+    return np.nan if value is None else float(value)
+
+
+class CompiledItem:
+    __slots__ = ('indicator', 'operator', 'value', 'value_min', 'value_max')
+
+    def __init__(self, item):
+        self.indicator = _field(item, 'indicator')
+        self.operator = _field(item, 'operator')
+        self.value = _bound(_field(item, 'value'))
+        self.value_min = _bound(_field(item, 'value_min'))
+        self.value_max = _bound(_field(item, 'value_max'))
+
+    @property
+    def key(self) -> tuple:
+        # NaN never equals itself, so missing thresholds are keyed as None
+        bounds = tuple(None if np.isnan(v) else v for v in (self.value, self.value_min, self.value_max))
+        return (self.indicator, self.operator) + bounds
+
+    def mask(self, values: np.ndarray) -> np.ndarray:
+        # NaN (missing report or indicator) compares False under every operator
+        with np.errstate(invalid='ignore'):
+            compare = COMPARISONS.get(self.operator)
+            if compare is not None:
+                return compare(values, self.value)
+            if self.operator == 'range':
+                return (values >= self.value_min) & (values <= self.value_max)
+            if self.operator == 'outsiderange':
+                return (values < self.value_min) | (values > self.value_max)
+        return np.zeros(len(values), dtype=bool)
+
+
+class CompiledRules:
+    """
+    Entry/exit criteria compiled once per run into array operations.
+
+    Calling the compiled rules with a `FundamentalsSnapshot` (anything with
+    `get(indicator)` / `has(indicator)` returning per-ticker vectors) yields a
+    boolean mask over every ticker, with the same semantics as
+    `BacktestEngine.evaluate_rules`: group items combined by the group logic
+    (AND/OR), groups combined by `global_logic`, no criteria = pass.
+    """
+
+    def __init__(self, criteria_groups: Optional[List] = None, global_logic: str = 'AND'):
+        self.global_logic = str(global_logic).upper()
+        self.groups = []
+        for group in criteria_groups or []:
+            logic = _field(group, 'logic', 'AND')
+            if isinstance(logic, str):
+                logic = logic.upper()
+            items = _field(group, 'items', []) or []
+            self.groups.append((logic, [CompiledItem(item) for item in items]))
+
+        # Hashable signature: equal criteria give equal masks on the same snapshot
+        self.key = (self.global_logic, tuple(
+            (logic, tuple(item.key for item in items)) for logic, items in self.groups
+        ))
+
+        # Indicators referenced by the rules, in first-use order
+        self.indicators = list(dict.fromkeys(
+            item.indicator for _, items in self.groups for item in items if item.indicator
+        ))
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def __call__(self, snapshot) -> np.ndarray:
+        size = len(snapshot.rows)
+        if not self.groups:
+            return np.ones(size, dtype=bool)
+
+        group_masks = []
+        for logic, items in self.groups:
+            if logic == 'OR':
+                mask = np.zeros(size, dtype=bool)
+                for item in items:
+                    mask |= item.mask(snapshot.get(item.indicator))
+            elif logic == 'AND':
+                mask = np.ones(size, dtype=bool)
+                for item in items:
+                    mask &= item.mask(snapshot.get(item.indicator))
+            else:
+                # Unknown group logic never rejects (matches the scalar evaluator)
+                mask = np.ones(size, dtype=bool)
+            group_masks.append(mask)
+
+        stacked = np.vstack(group_masks)
+        if self.global_logic == 'OR':
+            return stacked.any(axis=0)
+        return stacked.all(axis=0)
+
+    def data_valid(self, snapshot) -> np.ndarray:
+        """
+        Data-quality screen: every indicator used by the rules must exist in the
+        ticker's financials, and zero-sensitive ones must not be zero.
+        Negative values are accepted.
+        """
+        valid = snapshot.available.copy()
+        for indicator in self.indicators:
+            valid &= snapshot.has(indicator)
+            if indicator in ZERO_SENSITIVE_INDICATORS:
+                valid &= snapshot.get(indicator) != 0
+        return valid
+
+
+class ScreenCache:
+    """
+    Entry screens (data validity & rules) memoized by (panel, rules, date).
+
+    Variants of a sweep or overlapping walk-forward windows share criteria and
+    rebalance dates, so a process running many of them evaluates each screen
+    once. Oldest entries are evicted past `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._masks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._masks)
+
+    def screen(self, rules: CompiledRules, snapshot) -> np.ndarray:
+        """Read-only mask of tickers passing `rules` on the snapshot's date."""
+        key = (id(snapshot.panel), rules.key, snapshot.date.value)
+        mask = self._masks.get(key)
+        if mask is not None:
+            self.hits += 1
+            self._masks.move_to_end(key)
+            return mask
+
+        self.misses += 1
+        mask = rules.data_valid(snapshot) & rules(snapshot)
+        mask.flags.writeable = False
+        self._masks[key] = mask
+        if len(self._masks) > self.max_entries:
+            self._masks.popitem(last=False)
+        return mask
+
+
+def top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """
+    Positions of the `n` lowest scores (ascending = better), best first.
+    `argpartition` finds the cut in O(len); ties keep their original order like
+    a stable sort, and NaN scores rank last.
+    """
+    if n <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    keys = np.where(np.isnan(scores), np.inf, scores)
+    if n < len(keys):
+        cutoff = keys[np.argpartition(keys, n - 1)[n - 1]]
+        selected = np.flatnonzero(keys <= cutoff)
+    else:
+        selected = np.arange(len(keys))
+    return selected[np.argsort(keys[selected], kind='stable')][:n]
@@ -0,0 +1,203 @@
+import io
+import gzip
+import json
+import datetime
+from dataclasses import asdict, dataclass, is_dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Optional encoders: each format is offered only when its package is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+@dataclass(frozen=True)
+class Format:
+    name: str
+    media_type: str
+
+
+JSON = Format("json", "application/json")
+COLUMNS = Format("columns", "application/vnd.backtest.columns+json")
+MSGPACK = Format("msgpack", "application/msgpack")
+ARROW = Format("arrow", "application/vnd.apache.arrow.stream")
+
+MEDIA_TYPES = {
+    "application/json": JSON,
+    COLUMNS.media_type: COLUMNS,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    ARROW.media_type: ARROW,
+}
+
+
+def available(fmt: Format) -> bool:
+    if fmt is MSGPACK:
+        return msgpack is not None
+    if fmt is ARROW:
+        return pa is not None
+    return True
+
+
+# --- JSON ---
+
+def _default(value):
+    # Types orjson / json do not serialize on their own
+    if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'M':
+            return np.datetime_as_string(value, unit='s').tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if is_dataclass(value):
+        return asdict(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _plain(value):
+    """NaN/inf -> None, recursively (for the stdlib json fallback)."""
+    if isinstance(value, float):
+        return value if np.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def dumps(payload) -> bytes:
+    """
+    Compact JSON. NumPy arrays and scalars, datetimes and dataclasses are
+    encoded natively; NaN and infinities become null.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    # Without orjson: NaN inside arrays only shows up after the first pass
+    plain = _plain(json.loads(json.dumps(payload, default=_default)))
+    return json.dumps(plain, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# --- Columnar formats ---
+
+def records_to_columns(records: List[dict]) -> Dict[str, list]:
+    """[{name: value}] -> {name: [values]} (keys of the first record)."""
+    if not records:
+        return {}
+    return {name: [record.get(name) for record in records] for name in records[0]}
+
+
+def to_msgpack(payload: dict) -> bytes:
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+def to_arrow(payload: dict, table: str = "history") -> bytes:
+    """
+    Arrow IPC stream of the `table` columns (dates as timestamps); every
+    other field of the payload goes, as JSON, into the schema metadata
+    under b"payload".
+    """
+    arrays = {}
+    for name, values in (payload.get(table) or {}).items():
+        if name == "date":
+            values = np.asarray(values, dtype='datetime64[ns]')
+        else:
+            values = np.asarray(values)
+            if values.dtype == object:  # nulls decoded from JSON
+                values = np.asarray(values, dtype=float)
+        arrays[name] = pa.array(values)
+    rest = {key: value for key, value in payload.items() if key != table}
+    batch = pa.table(arrays).replace_schema_metadata({b"payload": dumps(rest), b"table": table.encode()})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_table(batch)
+    return sink.getvalue()
+
+
+def encode(payload: dict, fmt: Format) -> bytes:
+    """Columnar payload in one of the response formats."""
+    if fmt is MSGPACK:
+        return to_msgpack(payload)
+    if fmt is ARROW:
+        return to_arrow(payload)
+    return dumps(payload)
+
+
+# --- Negotiation ---
+
+def negotiate(accept: Optional[str]) -> Optional[Format]:
+    """
+    Best available format for an Accept header (JSON when absent or `*/*`);
+    None when the client accepts none of the formats.
+    """
+    if not accept:
+        return JSON
+    choices = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, _, params = part.strip().partition(";")
+        media_type = media_type.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality <= 0:
+            continue
+        if media_type in ("*/*", "application/*"):
+            fmt = JSON
+        else:
+            fmt = MEDIA_TYPES.get(media_type)
+        if fmt is not None and available(fmt):
+            choices.append((-quality, position, fmt))
+    return min(choices, key=lambda choice: choice[:2])[2] if choices else None
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """'br' (when brotli is installed) or 'gzip' if the client accepts it, else None."""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
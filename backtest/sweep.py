@@ -0,0 +1,164 @@
+import os
+import time
+import shutil
+import logging
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from backtest.data_provider import DataProvider
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.rules import ScreenCache
+
+logger = logging.getLogger("ParameterSweep")
+
+# Provider and screen cache attached once per worker process (see _init_worker)
+_worker_provider = None
+_worker_screens = None
+
+
+def set_parameter(payload: dict, path: str, value):
+    """
+    Sets a config value addressed by a dotted path: plain fields ("stop_loss")
+    or nested criteria thresholds ("entry_criteria.0.items.1.value").
+    """
+    keys = path.split(".")
+    target = payload
+    for key in keys[:-1]:
+        target = target[int(key)] if isinstance(target, list) else target[key]
+    last = keys[-1]
+    if isinstance(target, list):
+        target[int(last)] = value
+    else:
+        target[last] = value
+
+
+def expand_grid(base: StrategyConfigRequest, grid: Dict[str, list]) -> List[Tuple[dict, StrategyConfigRequest]]:
+    """Cartesian product of the grid applied to the base config: [(params, config)]."""
+    names = list(grid)
+    variants = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        payload = base.model_dump()
+        for path, value in params.items():
+            set_parameter(payload, path, value)
+        variants.append((params, StrategyConfigRequest(**payload)))
+    return variants
+
+
+def summarize(result, elapsed: float = 0.0, with_history: bool = False) -> dict:
+    """Compact summary of a BacktestResult (no trade log; equity curve only when asked)."""
+    metrics = result.metrics
+    summary = {
+        "final_capital": float(result.final_capital),
+        "total_return": float(result.total_return),
+        "cagr": float(result.cagr),
+        "max_drawdown": float(result.max_drawdown),
+        "sortino_ratio": float(result.sortino_ratio),
+        "win_rate": float(result.win_rate),
+        "twr_annualized": metrics.twr_annualized if metrics is not None else 0.0,
+        "irr": metrics.irr if metrics is not None else 0.0,
+        "total_trades": result.total_trades,
+        "total_invested": float(result.total_invested),
+        "elapsed": round(elapsed, 3),
+    }
+    if with_history:
+        dates = pd.DatetimeIndex(result.history.dates)
+        summary["history"] = [[date.isoformat(), value] for date, value in zip(dates, result.history.total_value.tolist())]
+        # Contributions aligned with the history (flow-neutral returns, see robustness.block_bootstrap)
+        summary["flows"] = result.flows.tolist() if result.flows is not None else [0.0] * len(dates)
+    return summary
+
+
+def run_variant(provider: DataProvider, index: int, params: dict, config: StrategyConfigRequest,
+                with_history: bool = False, screen_cache: Optional[ScreenCache] = None) -> dict:
+    """Runs one variant and returns its summary, or the error message."""
+    start = time.monotonic()
+    try:
+        result = BacktestEngine(provider, event_driven=True, screen_cache=screen_cache).run(config)
+        summary = summarize(result, time.monotonic() - start, with_history)
+    except Exception as e:
+        logger.error(f"Variant {index} {params} failed: {e}")
+        summary = {"error": str(e)}
+    return {"index": index, "params": params, **summary}
+
+
+def _init_worker(snapshot_dir: str):
+    global _worker_provider, _worker_screens
+    logging.getLogger("BacktestEngine").setLevel(logging.ERROR)
+    _worker_provider = DataProvider.from_snapshot(snapshot_dir)
+    _worker_screens = ScreenCache()
+
+
+def _run_in_worker(index: int, params: dict, payload: dict, with_history: bool) -> dict:
+    config = StrategyConfigRequest(**payload)
+    return run_variant(_worker_provider, index, params, config, with_history, _worker_screens)
+
+
+class ParameterSweep:
+    """
+    Runs a grid of strategy variants in a process pool.
+
+    The loaded provider is saved once as a snapshot directory (see
+    `DataProvider.save_snapshot`); every worker memory-maps the same price and
+    fundamentals matrices read-only instead of reloading the datasets, and
+    sends back only a compact summary per variant.
+    """
+
+    def __init__(self, snapshot_dir: str, workers: Optional[int] = None):
+        self.snapshot_dir = snapshot_dir
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._owns_snapshot = False
+
+    @classmethod
+    def from_provider(cls, provider: DataProvider, snapshot_dir: Optional[str] = None,
+                      workers: Optional[int] = None) -> "ParameterSweep":
+        """Snapshots a loaded provider (to a temporary directory unless one is given)."""
+        owns = snapshot_dir is None
+        if owns:
+            snapshot_dir = tempfile.mkdtemp(prefix="backtest_sweep_")
+        provider.save_snapshot(snapshot_dir)
+        sweep = cls(snapshot_dir, workers)
+        sweep._owns_snapshot = owns
+        return sweep
+
+    def run(self, base: StrategyConfigRequest, grid: Dict[str, list]) -> Iterator[dict]:
+        """Yields one summary per grid variant, in completion order."""
+        return self.run_variants(expand_grid(base, grid))
+
+    def run_variants(self, variants: List[Tuple[dict, StrategyConfigRequest]],
+                     with_history: bool = False) -> Iterator[dict]:
+        """Runs explicit (params, config) pairs; `index` in each summary is the pair's position."""
+        logger.info(f"Running {len(variants)} variants on {self.workers} worker(s).")
+
+        if self.workers <= 1:
+            provider = DataProvider.from_snapshot(self.snapshot_dir)
+            screens = ScreenCache()
+            for index, (params, config) in enumerate(variants):
+                yield run_variant(provider, index, params, config, with_history, screens)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.snapshot_dir,)) as pool:
+            futures = [
+                pool.submit(_run_in_worker, index, params, config.model_dump(), with_history)
+                for index, (params, config) in enumerate(variants)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def close(self):
+        """Removes the snapshot when it was created by `from_provider`."""
+        if self._owns_snapshot:
+            shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+            self._owns_snapshot = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
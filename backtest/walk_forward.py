@@ -0,0 +1,195 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from backtest.domain import StrategyConfigRequest
+from backtest.sweep import ParameterSweep, expand_grid
+
+logger = logging.getLogger("WalkForward")
+
+
+def calmar(summary: dict) -> float:
+    """Drawdown-adjusted return: CAGR / |max drawdown| (drawdown floored at 1%)."""
+    return summary["cagr"] / max(abs(summary["max_drawdown"]), 0.01)
+
+
+OBJECTIVES: Dict[str, Callable[[dict], float]] = {
+    "cagr": lambda summary: summary["cagr"],
+    "total_return": lambda summary: summary["total_return"],
+    "calmar": calmar,
+}
+
+
+@dataclass
+class WalkForwardWindow:
+    index: int
+    in_sample_start: pd.Timestamp
+    in_sample_end: pd.Timestamp
+    out_sample_start: pd.Timestamp
+    out_sample_end: pd.Timestamp
+
+    def as_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "in_sample": [self.in_sample_start.date().isoformat(), self.in_sample_end.date().isoformat()],
+            "out_sample": [self.out_sample_start.date().isoformat(), self.out_sample_end.date().isoformat()],
+        }
+
+
+@dataclass
+class WalkForwardResult:
+    windows: List[dict]
+    equity_curve: List[dict]
+    final_capital: float
+    total_return: float
+    cagr: float
+    max_drawdown: float
+    objective: str = "cagr"
+    errors: List[dict] = field(default_factory=list)
+
+
+def build_windows(start_date, end_date, in_sample_months: int = 24, out_sample_months: int = 6,
+                  step_months: Optional[int] = None) -> List[WalkForwardWindow]:
+    """
+    Rolling windows over [start_date, end_date]: `in_sample_months` of
+    optimization followed by `out_sample_months` of out-of-sample trading,
+    advancing `step_months` (default: the out-of-sample length, so the
+    out-of-sample segments tile the period without overlap).
+    """
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    step = pd.DateOffset(months=step_months or out_sample_months)
+    in_sample = pd.DateOffset(months=in_sample_months)
+    out_sample = pd.DateOffset(months=out_sample_months)
+    one_day = pd.Timedelta(days=1)
+
+    windows = []
+    anchor = start
+    while anchor + in_sample <= end:
+        out_start = anchor + in_sample
+        windows.append(WalkForwardWindow(
+            index=len(windows),
+            in_sample_start=anchor,
+            in_sample_end=out_start - one_day,
+            out_sample_start=out_start,
+            out_sample_end=min(out_start + out_sample - one_day, end),
+        ))
+        anchor = anchor + step
+    return windows
+
+
+def _with_dates(config: StrategyConfigRequest, start, end) -> StrategyConfigRequest:
+    return config.model_copy(update={
+        "start_date": start.date().isoformat(),
+        "end_date": end.date().isoformat(),
+    }, deep=True)
+
+
+class WalkForwardOptimizer:
+    """
+    Walk-forward optimization on top of a ParameterSweep.
+
+    Every (window, variant) in-sample run is submitted to the sweep's process
+    pool at once, so windows are evaluated in parallel. The workers share the
+    memory-mapped panels of the sweep snapshot and keep a screen cache, so
+    overlapping windows reuse the indicator matrices and entry screens instead
+    of recomputing them. The best variant of each window (by `objective`) then
+    trades its out-of-sample segment, and the segments are chained into one
+    equity curve starting at the base initial capital.
+    """
+
+    def __init__(self, sweep: ParameterSweep, objective: Union[str, Callable[[dict], float]] = "cagr"):
+        if isinstance(objective, str):
+            if objective not in OBJECTIVES:
+                raise ValueError(f"Unknown objective '{objective}'. Options: {sorted(OBJECTIVES)}")
+            self.objective_name, self.objective = objective, OBJECTIVES[objective]
+        else:
+            self.objective_name, self.objective = getattr(objective, "__name__", "custom"), objective
+        self.sweep = sweep
+
+    def run(self, base: StrategyConfigRequest, grid: Dict[str, list],
+            windows: List[WalkForwardWindow]) -> WalkForwardResult:
+        variants = expand_grid(base, grid)
+        errors = []
+
+        # 1. In-sample: every window x variant in one parallel batch
+        in_sample = [
+            ({"window": window.index, "variant": v}, _with_dates(config, window.in_sample_start, window.in_sample_end))
+            for window in windows for v, (_, config) in enumerate(variants)
+        ]
+        best = {}
+        for summary in self.sweep.run_variants(in_sample):
+            if "error" in summary:
+                errors.append(summary)
+                continue
+            window, variant = summary["params"]["window"], summary["params"]["variant"]
+            score = self.objective(summary)
+            current = best.get(window)
+            # Ties go to the earlier variant in grid order (completion order is arbitrary)
+            if current is None or score > current[0] or (score == current[0] and variant < current[1]):
+                best[window] = (score, variant, summary)
+
+        # 2. Out-of-sample: best variant of each window, also in parallel
+        selected = [window for window in windows if window.index in best]
+        out_sample = [
+            ({"window": window.index, "variant": best[window.index][1]},
+             _with_dates(variants[best[window.index][1]][1], window.out_sample_start, window.out_sample_end))
+            for window in selected
+        ]
+        segments = {}
+        for summary in self.sweep.run_variants(out_sample, with_history=True):
+            if "error" in summary:
+                errors.append(summary)
+            else:
+                segments[summary["params"]["window"]] = summary
+
+        return self._chain(base, windows, variants, best, segments, errors)
+
+    def _chain(self, base, windows, variants, best, segments, errors) -> WalkForwardResult:
+        """Chains the out-of-sample equity curves, each rescaled to the capital carried so far."""
+        capital = float(base.initial_capital)
+        dates, values, report = [], [], []
+        for window in windows:
+            entry = window.as_dict()
+            if window.index in best:
+                score, variant, in_summary = best[window.index]
+                entry["params"] = variants[variant][0]
+                entry["in_sample_score"] = score
+                entry["in_sample_summary"] = {k: v for k, v in in_summary.items() if k not in ("params", "index")}
+
+            segment = segments.get(window.index)
+            if segment is not None and segment["history"]:
+                scale = capital / float(base.initial_capital)
+                for date, value in segment["history"]:
+                    if dates and date <= dates[-1]:
+                        continue
+                    dates.append(date)
+                    values.append(value * scale)
+                if values:
+                    capital = values[-1]
+                entry["out_sample_summary"] = {k: v for k, v in segment.items() if k not in ("params", "index", "history")}
+            report.append(entry)
+
+        curve = np.array(values, dtype=float)
+        total_return = capital / float(base.initial_capital) - 1
+        max_drawdown = 0.0
+        cagr = 0.0
+        if len(curve):
+            max_drawdown = float((curve / np.maximum.accumulate(curve) - 1).min())
+            years = (pd.Timestamp(dates[-1]) - pd.Timestamp(dates[0])).days / 365.25
+            cagr = (1 + total_return) ** (1 / years) - 1 if years > 0 and total_return > -1 else 0.0
+
+        logger.info(f"Walk-forward: {len(windows)} windows, {len(segments)} out-of-sample segments, return {total_return:.2%}.")
+        return WalkForwardResult(
+            windows=report,
+            equity_curve=[{"date": d, "total_value": v} for d, v in zip(dates, values)],
+            final_capital=capital,
+            total_return=total_return,
+            cagr=cagr,
+            max_drawdown=max_drawdown,
+            objective=self.objective_name,
+            errors=errors,
+        )
@@ -1,68 +1,41 @@
 """
 Otimização: Converter price_history.json (180MB) para Parquet
 
-Parquet é ~10x menor e 100x mais rápido para ler
+Parquet é ~10x menor e 100x mais rápido para ler.
+Grava o PriceStore particionado por ticker (formato canônico lido pelo
+pipeline, DataProcessor e DataProvider).
 """
 
 import json
-import pandas as pd
 from pathlib import Path
 import time
 
+from etl.price_store import PriceStore
+
 def convert_to_parquet():
     print("\n" + "="*80)
     print("🚀 CONVERTENDO JSON → PARQUET")
     print("="*80 + "\n")
     
     json_path = Path("data/processed/price_history.json")
-    parquet_path = Path("data/processed/price_history.parquet")
+    store = PriceStore()
+    parquet_path = Path(store.root)
     
     # Medir tamanho original
     original_size = json_path.stat().st_size / (1024*1024)  # MB
     print(f"📊 Arquivo original: {original_size:.1f} MB\n")
     
-    # Carregar JSON
-    print("⏳ Carregando JSON...")
-    start = time.time()
-    with open(json_path, 'r') as f:
-        data = json.load(f)
-    load_time = time.time() - start
-    print(f"   ✅ Carregado em {load_time:.1f}s\n")
-    
-    # Converter para DataFrame único
+    # Converter em streaming: um ticker por vez, uma partição por ticker
     print("🔄 Convertendo para Parquet...")
     start = time.time()
     
-    all_records = []
-    for ticker, records in data.items():
-        if not records:
-            continue
-        df = pd.DataFrame(records)
-        df['ticker'] = ticker
-        all_records.append(df)
-    
-    # Combinar tudo
-    combined_df = pd.concat(all_records, ignore_index=True)
-    
-    # Normalizar nomes de colunas
-    combined_df.columns = [c.lower() for c in combined_df.columns]
-    
-    if 'date' in combined_df.columns:
-       combined_df['date'] = pd.to_datetime(combined_df['date'])
-    
-    # Salvar como Parquet com compressão
-    combined_df.to_parquet(
-        parquet_path,
-        engine='pyarrow',
-        compression='snappy',
-        index=False
-    )
+    written = store.import_json(json_path)
     
     convert_time = time.time() - start
-    print(f"   ✅ Convertido em {convert_time:.1f}s\n")
+    print(f"   ✅ Convertido em {convert_time:.1f}s ({len(written)} tickers)\n")
     
     # Comparar tamanhos
-    parquet_size = parquet_path.stat().st_size / (1024*1024)  # MB
+    parquet_size = sum(p.stat().st_size for p in parquet_path.rglob("*.parquet")) / (1024*1024)  # MB
     reduction = ((original_size - parquet_size) / original_size) * 100
     
     print("📈 RESULTADOS:")
@@ -82,7 +55,7 @@ def convert_to_parquet():
     
     # Parquet
     start = time.time()
-    _ = pd.read_parquet(parquet_path)
+    _ = store.read()
     parquet_read_time = time.time() - start
     print(f"   Parquet leitura: {parquet_read_time:.2f}s")
     
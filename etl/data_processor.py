@@ -8,12 +8,15 @@ import difflib
 import unicodedata
 import re
 
+from etl.price_store import PriceStore, iter_price_history_json
+
 class DataProcessor:
     def __init__(self, data_dir="data"):
         self.data_dir = data_dir
         self.processed_dir = os.path.join(data_dir, "processed")
         self.cvm_path = os.path.join(self.processed_dir, "cvm_financials_history.csv")
         self.price_path = os.path.join(self.processed_dir, "price_history.json")
+        self.price_store = PriceStore(os.path.join(self.processed_dir, "price_store"))
         self.fundamentus_path = "data/processed/fundamentus_tickers.csv"
         self.mapping_path = os.path.join(self.processed_dir, "cvm_ticker_map.json")
         self.manual_overrides_path = os.path.join("data", "cvm_ticker_overrides.json")
@@ -29,10 +32,11 @@ class DataProcessor:
 
     def load_data(self):
         """
-        Loads the CVM Financials CSV, Price History JSON, and Fundamentus Tickers.
+        Loads the CVM Financials CSV, Price History (Parquet store, legacy JSON fallback) and Fundamentus Tickers.
         Returns: (df_financials, price_map, tickers_df)
         """
-        if not os.path.exists(self.cvm_path) or not os.path.exists(self.price_path):
+        has_store = self.price_store.exists()
+        if not os.path.exists(self.cvm_path) or not (has_store or os.path.exists(self.price_path)):
             raise FileNotFoundError("Processed data files not found. Run pipeline first.")
 
         # print(f"Loading Financials from {self.cvm_path}...")
@@ -40,42 +44,36 @@ class DataProcessor:
         if 'DT_FIM_EXERC' in df_fin.columns:
             df_fin['DT_FIM_EXERC'] = pd.to_datetime(df_fin['DT_FIM_EXERC'])
 
-        # print(f"Loading Prices from {self.price_path}...")
-        with open(self.price_path, 'r') as f:
-            price_map = json.load(f)
-            
-        processed_prices = {}
-        self.price_meta = {}
-        for ticker, data in price_map.items():
-            meta = {}
-            records = data
-            if isinstance(data, dict):
-                meta = data.get('meta') or {}
-                records = data.get('prices') or data.get('data') or []
-            if not records:
-                continue
-            pdf = pd.DataFrame(records)
-            # Normalize columns
-            pdf.columns = [c.lower().replace(' ', '') for c in pdf.columns]
-            
-            # Map specific YF names if needed
-            # yfinance: Date, Open, High, Low, Close, Adj Close, Volume
-            # normalized: date, open, high, low, close, adjclose, volume
-            
-            if 'date' in pdf.columns:
-                pdf['date'] = pd.to_datetime(pdf['date'])
-                pdf.set_index('date', inplace=True)
-                pdf.sort_index(inplace=True)
-                processed_prices[ticker] = pdf
-                base_ticker = ticker.replace('.SA', '')
-                self.price_meta[base_ticker] = meta or {}
-            
+        if has_store:
+            processed_prices = self.price_store.read()
+            store_meta = self.price_store.read_meta()
+            self.price_meta = {
+                ticker.replace('.SA', ''): store_meta.get(ticker) or {}
+                for ticker in processed_prices
+            }
+        else:
+            processed_prices = self._load_prices_json()
+
         tickers_df = pd.DataFrame()
         if os.path.exists(self.fundamentus_path):
             tickers_df = pd.read_csv(self.fundamentus_path)
             
         return df_fin, processed_prices, tickers_df
 
+    def _load_prices_json(self):
+        """Legacy loader for price_history.json (kept until every producer writes the Parquet store)."""
+        # Streamed one ticker at a time: peak memory scales with one ticker, not the 180 MB file
+        processed_prices = {}
+        self.price_meta = {}
+        for ticker, pdf, meta in iter_price_history_json(self.price_path):
+            # normalized: date, open, high, low, close, adjclose, volume
+            if pdf.empty:
+                continue
+            processed_prices[ticker] = pdf.set_index('date')
+            base_ticker = ticker.replace('.SA', '')
+            self.price_meta[base_ticker] = meta or {}
+        return processed_prices
+
     def _sanitize_text(self, text):
         if text is None:
             return ""
@@ -15,9 +15,10 @@ from data.fundamentus_client import FundamentusClient
 from etl.logger import PipelineLogger
 from etl.validator import Validator
 from etl.exporter import Exporter
+from etl.price_store import PriceStore
 
 class DataPipeline:
-    def __init__(self, limit=None, force_historical_sync=False, historical_ttl_hours=24, historical_start_year=2018, historical_end_year=None):
+    def __init__(self, limit=None, force_historical_sync=False, historical_ttl_hours=24, historical_start_year=2018, historical_end_year=None, export_price_json=False):
         self.limit = limit
         self.logger = PipelineLogger()
         self.validator = Validator(self.logger)
@@ -30,6 +31,8 @@ class DataPipeline:
         self.processed_dir = os.path.join("data", "processed")
         self.historical_financials_path = os.path.join(self.processed_dir, "cvm_financials_history.csv")
         self.historical_prices_path = os.path.join(self.processed_dir, "price_history.json")
+        self.price_store = PriceStore(os.path.join(self.processed_dir, "price_store"))
+        self.export_price_json = export_price_json
         
         self.b3_tickers = []
         self.processed_data = []
@@ -52,7 +55,7 @@ class DataPipeline:
             return False
         required_files = [
             self.historical_financials_path,
-            self.historical_prices_path,
+            self.price_store.meta_path,
         ]
         now = time.time()
         max_age = self.historical_ttl_hours * 3600 if self.historical_ttl_hours else None
@@ -63,33 +66,6 @@ class DataPipeline:
                 return False
         return True
 
-    def _load_existing_prices(self):
-        if not os.path.exists(self.historical_prices_path):
-            return {}
-        try:
-            with open(self.historical_prices_path, "r") as f:
-                data = json.load(f)
-                if not isinstance(data, dict):
-                    return {}
-                normalized = {}
-                for ticker, value in data.items():
-                    if isinstance(value, list):
-                        normalized[ticker] = {"prices": value, "meta": {}}
-                    elif isinstance(value, dict):
-                        prices = value.get("prices")
-                        if prices is None and isinstance(value.get("data"), list):
-                            prices = value.get("data")
-                        normalized[ticker] = {
-                            "prices": prices or [],
-                            "meta": value.get("meta", {})
-                        }
-                    else:
-                        normalized[ticker] = {"prices": [], "meta": {}}
-                return normalized
-        except Exception as exc:
-            self.logger.warning(f"Failed to load cached prices: {exc}")
-            return {}
-
     def run_historical_sync(self):
         """
         Runs the full Historical Data ETL (CVM + Prices).
@@ -139,8 +115,16 @@ class DataPipeline:
         # Yahoo Finance requires .SA suffix for Brazilian stocks
         tickers_sa = [f"{t}.SA" for t in tickers if not t.endswith('.SA')]
         
-        existing_prices = self._load_existing_prices()
-        to_fetch = [ticker for ticker in tickers_sa if ticker not in existing_prices]
+        existing_tickers = set(self.price_store.tickers())
+        if not existing_tickers and os.path.exists(self.historical_prices_path):
+            # One-off migration of the legacy JSON cache into the Parquet store
+            self.logger.info("Migrating legacy price_history.json into the Parquet price store...")
+            try:
+                existing_tickers = set(self.price_store.import_json(self.historical_prices_path))
+            except Exception as exc:
+                self.logger.warning(f"Failed to migrate cached prices: {exc}")
+
+        to_fetch = [ticker for ticker in tickers_sa if ticker not in existing_tickers]
         if to_fetch:
             self.logger.info(f"Fetching price history for {len(to_fetch)} tickers (.SA suffix added)...")
             fresh_prices = self.price_client.fetch_batch(to_fetch)
@@ -149,18 +133,13 @@ class DataPipeline:
                 meta = payload.get('meta') if isinstance(payload, dict) else {}
                 if df is None or df.empty:
                     continue
-                df_reset = df.reset_index()
-                if 'Date' in df_reset.columns:
-                    df_reset['Date'] = df_reset['Date'].dt.strftime('%Y-%m-%d')
-                existing_prices[ticker] = {
-                    "prices": df_reset.to_dict(orient='records'),
-                    "meta": {
-                        "symbol": meta.get("symbol"),
-                        "shortName": meta.get("shortName"),
-                        "longName": meta.get("longName"),
-                        "exchangeName": meta.get("exchangeName"),
-                    }
-                }
+                # Each ticker is its own partition: only new tickers are written
+                self.price_store.write_ticker(ticker, df, meta={
+                    "symbol": meta.get("symbol"),
+                    "shortName": meta.get("shortName"),
+                    "longName": meta.get("longName"),
+                    "exchangeName": meta.get("exchangeName"),
+                })
         else:
             self.logger.info("Price history already cached for all tickers.")
         
@@ -168,18 +147,8 @@ class DataPipeline:
         if not history_df.empty:
             history_df.to_csv(self.historical_financials_path, index=False)
         
-        sanitized_prices = {}
-        for ticker, payload in existing_prices.items():
-            if isinstance(payload, dict):
-                sanitized_prices[ticker] = {
-                    "prices": payload.get("prices", []),
-                    "meta": payload.get("meta", {})
-                }
-            else:
-                sanitized_prices[ticker] = {"prices": payload or [], "meta": {}}
-        
-        with open(self.historical_prices_path, "w") as f:
-            json.dump(sanitized_prices, f)
+        if self.export_price_json:
+            self.price_store.export_json(self.historical_prices_path)
             
         self.logger.info("Historical Sync Completed.")
 
@@ -593,8 +562,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int, help="Limit number of items to process", default=None)
     parser.add_argument("--skip-yf", action="store_true", help="Skip Yahoo Finance fetching")
+    parser.add_argument("--export-price-json", action="store_true", help="Also export the legacy price_history.json")
     args = parser.parse_args()
     
-    pipeline = DataPipeline(limit=args.limit)
+    pipeline = DataPipeline(limit=args.limit, export_price_json=args.export_price_json)
     pipeline.skip_yf = args.skip_yf
     pipeline.run()
@@ -0,0 +1,343 @@
+import os
+import re
+import json
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger("PriceStore")
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "adjclose", "volume"]
+
+PRICE_SCHEMA = pa.schema(
+    [("date", pa.timestamp("ns"))] + [(name, pa.float64()) for name in PRICE_COLUMNS]
+)
+
+
+def normalize_price_frame(data) -> pd.DataFrame:
+    """
+    Normalizes raw price records (list of dicts or a yfinance-style DataFrame)
+    into the canonical layout: `date` column + lowercase OHLCV floats, sorted and
+    de-duplicated by date.
+    """
+    df = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    if df.empty:
+        return pd.DataFrame(columns=["date"] + PRICE_COLUMNS)
+
+    if 'date' not in [str(c).lower() for c in df.columns] and df.index.name is not None:
+        df = df.reset_index()
+    df.columns = [str(c).lower().replace(' ', '').replace('_', '') for c in df.columns]
+
+    for alias in ("datetime", "timestamp"):
+        if 'date' not in df.columns and alias in df.columns:
+            df = df.rename(columns={alias: 'date'})
+    if 'date' not in df.columns:
+        return pd.DataFrame(columns=["date"] + PRICE_COLUMNS)
+
+    # Sessions are calendar days: Yahoo bars carry intraday UTC times (market open),
+    # which would put each close after its own midnight session date
+    dates = pd.to_datetime(df['date'], utc=True).dt.tz_localize(None).dt.normalize()
+    out = pd.DataFrame({'date': dates.astype('datetime64[ns]')})
+    for name in PRICE_COLUMNS:
+        if name in df.columns:
+            out[name] = pd.to_numeric(df[name], errors='coerce').astype(float)
+        else:
+            out[name] = np.nan
+
+    out = out.dropna(subset=['date']).sort_values('date')
+    out = out.drop_duplicates(subset=['date'], keep='last')
+    return out.reset_index(drop=True)
+
+
+# A complete JSON string, a dangling (unterminated) quote, or a bracket
+_SCAN_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|"|[\[\]{}]')
+_WHITESPACE = re.compile(r'\s*')
+
+
+class _StreamingObjectReader:
+    """
+    Walks the top-level `{key: value, ...}` object of a JSON file one entry at a
+    time, keeping only the current entry's text in memory. Values of keys that are
+    not wanted are skipped by bracket matching without being decoded.
+    """
+
+    def __init__(self, fh, chunk_size=1 << 20):
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Drops consumed text and appends the next chunk. Returns False at EOF."""
+        if self.eof:
+            return False
+        chunk = self.fh.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+            return False
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character (reading more input if needed)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Malformed JSON: expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def _decode(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may be truncated
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def _skip(self):
+        if self._peek() not in "{[":
+            self._decode()
+            return
+        while True:
+            depth = 0
+            for match in _SCAN_TOKEN.finditer(self.buf, self.pos):
+                token = match.group()
+                if token == '"':
+                    break  # string continues in the next chunk
+                if token in "{[":
+                    depth += 1
+                elif token in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        self.pos = match.end()
+                        return
+            if not self._fill():
+                raise ValueError("Malformed JSON: unexpected end of file")
+
+    def items(self, wanted=None):
+        """Yields (key, value); values of keys rejected by `wanted(key)` are skipped."""
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._decode()
+            self._expect(":")
+            if wanted is None or wanted(key):
+                yield key, self._decode()
+            else:
+                self._skip()
+            sep = self._peek()
+            self.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError(f"Malformed JSON: expected ',' or '}}' at offset {self.pos - 1}")
+
+
+def iter_price_history_json(path, tickers=None, chunk_size=1 << 20):
+    """
+    Streams the legacy price_history.json ticker by ticker.
+
+    Yields (ticker, frame, meta) where frame is the normalized price DataFrame
+    (typed float columns); each ticker's Python records are dropped before the
+    next one is parsed, so peak memory scales with one ticker. `tickers`
+    restricts the load to a whitelist (matched with or without the .SA suffix);
+    other entries are skipped without being decoded.
+    """
+    wanted = None
+    if tickers is not None:
+        names = {str(t).upper().replace('.SA', '') for t in tickers}
+        wanted = lambda key: str(key).upper().replace('.SA', '') in names
+
+    with open(path, "r") as fh:
+        reader = _StreamingObjectReader(fh, chunk_size)
+        for ticker, payload in reader.items(wanted):
+            meta = {}
+            records = payload
+            if isinstance(payload, dict):
+                records = payload.get("prices") or payload.get("data") or payload.get("records") or []
+                meta = payload.get("meta") or {}
+            elif not isinstance(payload, list):
+                continue
+            frame = normalize_price_frame(records)
+            del payload, records
+            yield ticker, frame, meta
+
+
+def _timestamp_scalar(value):
+    return pa.scalar(pd.Timestamp(value).as_unit("ns").value, type=pa.timestamp("ns"))
+
+
+class PriceStore:
+    """
+    Canonical daily price store: one Parquet partition per ticker
+    (`<root>/ticker=PETR4.SA/prices.parquet`) plus a `_meta.json` sidecar with the
+    Yahoo metadata. Row groups are sized to roughly one trading year so date-window
+    reads only decode the row groups that overlap the window.
+    """
+
+    META_FILE = "_meta.json"
+    DATA_FILE = "prices.parquet"
+
+    def __init__(self, root=os.path.join("data", "processed", "price_store"), row_group_size=252):
+        self.root = root
+        self.row_group_size = row_group_size
+        self.meta_path = os.path.join(root, self.META_FILE)
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.root) and bool(self.tickers())
+
+    def tickers(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            entry.split("=", 1)[1]
+            for entry in os.listdir(self.root)
+            if entry.startswith("ticker=") and os.path.exists(os.path.join(self.root, entry, self.DATA_FILE))
+        )
+
+    def last_modified(self) -> float:
+        """Latest mtime across the store (0.0 when empty)."""
+        if not os.path.isdir(self.root):
+            return 0.0
+        mtimes = [os.path.getmtime(self.meta_path)] if os.path.exists(self.meta_path) else []
+        for ticker in self.tickers():
+            mtimes.append(os.path.getmtime(self._partition_file(ticker)))
+        return max(mtimes) if mtimes else 0.0
+
+    def _partition_file(self, ticker):
+        return os.path.join(self.root, f"ticker={ticker}", self.DATA_FILE)
+
+    # --- Writing ---
+
+    def write_ticker(self, ticker, data, meta=None):
+        """Replaces the partition of one ticker. Returns the number of rows written."""
+        df = normalize_price_frame(data)
+        if df.empty:
+            return 0
+
+        path = self._partition_file(ticker)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(df, schema=PRICE_SCHEMA, preserve_index=False)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_path, compression="snappy", row_group_size=self.row_group_size)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if meta is not None:
+            all_meta = self.read_meta()
+            all_meta[ticker] = meta
+            self._write_meta(all_meta)
+        return len(df)
+
+    def write(self, prices: dict):
+        """Writes a {ticker: {"prices": records, "meta": {...}}} mapping."""
+        all_meta = self.read_meta()
+        for ticker, payload in prices.items():
+            records = payload.get("prices", []) if isinstance(payload, dict) else payload
+            if self.write_ticker(ticker, records) and isinstance(payload, dict):
+                all_meta[ticker] = payload.get("meta") or {}
+        self._write_meta(all_meta)
+
+    def import_json(self, path, tickers=None):
+        """Streams a legacy price_history.json into the store. Returns the tickers written."""
+        all_meta = self.read_meta()
+        written = []
+        for ticker, frame, meta in iter_price_history_json(path, tickers=tickers):
+            if self.write_ticker(ticker, frame):
+                all_meta[ticker] = meta
+                written.append(ticker)
+        self._write_meta(all_meta)
+        return written
+
+    def _write_meta(self, all_meta):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w") as fh:
+            json.dump(all_meta, fh)
+        os.replace(tmp_path, self.meta_path)
+
+    # --- Reading ---
+
+    def read_meta(self) -> dict:
+        if not os.path.exists(self.meta_path):
+            return {}
+        try:
+            with open(self.meta_path, "r") as fh:
+                return json.load(fh) or {}
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Failed to read price metadata: {exc}")
+            return {}
+
+    def read(self, tickers=None, start=None, end=None, columns=None) -> dict:
+        """
+        Returns {ticker: DataFrame indexed by date}.
+        Only the requested columns are decoded, and the ticker/date filters are
+        pushed down to partition pruning and row-group statistics.
+        """
+        if not os.path.isdir(self.root):
+            return {}
+
+        partitioning = ds.partitioning(pa.schema([("ticker", pa.string())]), flavor="hive")
+        dataset = ds.dataset(self.root, format="parquet", partitioning=partitioning, schema=PRICE_SCHEMA.append(pa.field("ticker", pa.string())))
+
+        selected = [c for c in (columns or PRICE_COLUMNS) if c in PRICE_COLUMNS]
+        expr = None
+        if tickers is not None:
+            expr = ds.field("ticker").isin(list(tickers))
+        if start is not None:
+            cond = ds.field("date") >= _timestamp_scalar(start)
+            expr = cond if expr is None else expr & cond
+        if end is not None:
+            cond = ds.field("date") <= _timestamp_scalar(end)
+            expr = cond if expr is None else expr & cond
+
+        table = dataset.to_table(columns=["ticker", "date"] + selected, filter=expr)
+        if table.num_rows == 0:
+            return {}
+
+        df = table.to_pandas()
+        df["ticker"] = df["ticker"].astype(str)
+        frames = {}
+        for ticker, group in df.groupby("ticker", sort=True):
+            frame = group.drop(columns="ticker").set_index("date").sort_index()
+            frames[ticker] = frame
+        return frames
+
+    def export_json(self, path):
+        """Optional legacy export in the price_history.json layout."""
+        all_meta = self.read_meta()
+        payload = {}
+        for ticker, frame in self.read().items():
+            out = frame.reset_index()
+            out["date"] = out["date"].dt.strftime("%Y-%m-%d")
+            out = out.astype(object).where(out.notna(), None)
+            payload[ticker] = {"prices": out.to_dict(orient="records"), "meta": all_meta.get(ticker, {})}
+        with open(path, "w") as fh:
+            json.dump(payload, fh)
+        logger.info(f"Exported {len(payload)} tickers to {path}")
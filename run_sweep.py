@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import argparse
+import logging
+
+from backtest.data_provider import DataProvider
+from backtest.domain import StrategyConfigRequest
+from backtest.sweep import ParameterSweep
+from backtest.walk_forward import OBJECTIVES, WalkForwardOptimizer, build_windows
+from backtest.robustness import RobustnessAnalyzer
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def parse_grid(specs):
+    """Parses repeated `path=v1,v2,...` options; values are JSON when possible (numbers, null)."""
+    grid = {}
+    for spec in specs:
+        path, _, raw = spec.partition("=")
+        if not raw:
+            raise SystemExit(f"Invalid --grid '{spec}'. Expected path=v1,v2,...")
+        values = []
+        for item in raw.split(","):
+            try:
+                values.append(json.loads(item))
+            except ValueError:
+                values.append(item)
+        grid[path.strip()] = values
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs a grid of backtest variants in parallel.")
+    parser.add_argument("--config", required=True, help="JSON file with the base StrategyConfigRequest")
+    parser.add_argument("--grid", action="append", default=[],
+                        help="Parameter grid, e.g. stop_loss=5,10,15 or entry_criteria.0.items.0.value=10,15 (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--snapshot-dir", default=None,
+                        help="Reuse/create a panel snapshot here instead of a temporary directory")
+    parser.add_argument("--output", default=None,
+                        help="Sweep: one JSON summary per line (JSONL). Walk-forward: JSON report")
+    parser.add_argument("--top", type=int, default=10, help="Variants to list at the end, by total return")
+    parser.add_argument("--walk-forward", action="store_true",
+                        help="Walk-forward optimization over the config period instead of a plain sweep")
+    parser.add_argument("--in-sample-months", type=int, default=24)
+    parser.add_argument("--out-sample-months", type=int, default=6)
+    parser.add_argument("--objective", choices=sorted(OBJECTIVES), default="cagr")
+    parser.add_argument("--robustness", choices=["starts", "universe", "bootstrap"], default=None,
+                        help="Robustness analysis of the base config (grid ignored)")
+    parser.add_argument("--paths", type=int, default=100, help="Robustness paths")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        base = StrategyConfigRequest(**json.load(f))
+    grid = parse_grid(args.grid)
+
+    snapshot_ready = args.snapshot_dir and os.path.exists(os.path.join(args.snapshot_dir, DataProvider.SNAPSHOT_BENCHMARKS_FILE))
+    if snapshot_ready:
+        print(f"Using existing snapshot at {args.snapshot_dir}")
+        sweep = ParameterSweep(args.snapshot_dir, args.workers)
+    else:
+        print("--- Loading data ---")
+        data_provider = DataProvider()
+        data_provider.load_data()
+        data_provider.fetch_benchmarks()
+        sweep = ParameterSweep.from_provider(data_provider, args.snapshot_dir, args.workers)
+
+    if args.walk_forward:
+        return run_walk_forward(sweep, base, grid, args)
+    if args.robustness:
+        return run_robustness(sweep, base, args)
+
+    output = open(args.output, "w") if args.output else None
+    results = []
+    try:
+        with sweep:
+            for summary in sweep.run(base, grid):
+                results.append(summary)
+                line = json.dumps(summary)
+                if output:
+                    output.write(line + "\n")
+                    output.flush()
+                if "error" in summary:
+                    print(f"[{len(results)}] {summary['params']} -> ERROR {summary['error']}")
+                else:
+                    print(f"[{len(results)}] {summary['params']} -> return {summary['total_return']:.2%} "
+                          f"| CAGR {summary['cagr']:.2%} | DD {summary['max_drawdown']:.2%} | trades {summary['total_trades']}")
+    finally:
+        if output:
+            output.close()
+
+    ranked = sorted((r for r in results if "error" not in r), key=lambda r: r["total_return"], reverse=True)
+    print(f"\n--- Top {min(args.top, len(ranked))} of {len(results)} variants ---")
+    for r in ranked[:args.top]:
+        print(f"{r['total_return']:>9.2%}  {json.dumps(r['params'])}")
+    return 0 if ranked or not results else 1
+
+
+def run_walk_forward(sweep, base, grid, args):
+    windows = build_windows(base.start_date, base.end_date, args.in_sample_months, args.out_sample_months)
+    if not windows:
+        print("Period too short for a single in-sample window.")
+        return 1
+
+    print(f"--- Walk-forward: {len(windows)} windows ({args.in_sample_months}m in / {args.out_sample_months}m out), objective {args.objective} ---")
+    with sweep:
+        result = WalkForwardOptimizer(sweep, args.objective).run(base, grid, windows)
+
+    for window in result.windows:
+        out = window.get("out_sample_summary", {})
+        print(f"[{window['index']}] {window['out_sample'][0]}..{window['out_sample'][1]} "
+              f"{json.dumps(window.get('params'))} -> out-of-sample {out.get('total_return', float('nan')):.2%}")
+    print(f"\nChained: return {result.total_return:.2%} | CAGR {result.cagr:.2%} | DD {result.max_drawdown:.2%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result.__dict__, f, indent=2)
+    return 1 if result.errors else 0
+
+
+def run_robustness(sweep, base, args):
+    print(f"--- Robustness ({args.robustness}): {args.paths} paths ---")
+    with sweep:
+        analyzer = RobustnessAnalyzer(sweep, seed=args.seed)
+        if args.robustness == "starts":
+            report = analyzer.random_starts(base, args.paths)
+        elif args.robustness == "universe":
+            report = analyzer.universe_subsamples(base, args.paths)
+        else:
+            report = analyzer.block_bootstrap(base, args.paths)
+
+    for metric, table in report.percentiles.items():
+        cells = "  ".join(f"{name} {value:,.4f}" for name, value in table.items())
+        print(f"{metric:>14}: {cells}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report.__dict__, f, indent=2)
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
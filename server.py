@@ -1,18 +1,48 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+import os
+from dataclasses import fields
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Union, Dict, Any
 import uvicorn
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-from backtest.domain import StrategyConfigRequest, CriteriaGroup, CriteriaItem, ReviewPortfolioItem
+from backtest.domain import StrategyConfigRequest, CriteriaGroup, CriteriaItem, ReviewPortfolioItem, BacktestResult, BacktestProgress
 from backtest.engine import BacktestEngine
+from backtest.provider_manager import DataProviderManager
+from backtest.result_cache import ResultCache, cache_key, history_key
+from backtest.downsample import MultiResolutionHistory
+from backtest.jobs import JobQueue, QueueFull, DONE
+from backtest.batch import BatchBacktestEngine
+from backtest.sweep import summarize
+from backtest.portfolio import Transaction
+from backtest import serialization
 
 # Existing backtest modules (to be refactored)
 # from backtest.engine import BacktestEngine
 
-app = FastAPI()
+# Warm, process-wide data snapshot (hot-reloaded when the source files change)
+provider_manager = DataProviderManager()
+
+# Encoded /api/backtest/run responses by (dataset fingerprint, config hash): memory LRU over SQLite
+RESULT_CACHE_PATH = os.environ.get("BACKTEST_RESULT_CACHE", "data/cache/results.sqlite")
+os.makedirs(os.path.dirname(RESULT_CACHE_PATH) or ".", exist_ok=True)
+result_cache = ResultCache(RESULT_CACHE_PATH)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    provider_manager.start()
+    yield
+    job_queue.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS Configuration
 origins = [
@@ -33,7 +63,7 @@ app.add_middleware(
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "data_loaded": provider_manager.loaded}
 
 @app.get("/api/assets/available")
 def get_available_assets():
@@ -51,48 +81,403 @@ def get_available_assets():
         # ... add more real ones from data.json or DB
     ]
 
+# Equity-curve points per response; /api/backtest/history/{history_id} serves any range in detail
+HISTORY_POINTS = int(os.environ.get("BACKTEST_HISTORY_POINTS", 1000))
+HISTORY_MAX_POINTS = 20000
+
+# Responses at least this large are gzip/brotli-compressed when the client accepts it
+COMPRESS_MIN_BYTES = int(os.environ.get("BACKTEST_COMPRESS_MIN_BYTES", serialization.COMPRESS_MIN_BYTES))
+
+
+def simulate(config: StrategyConfigRequest, data_provider) -> BacktestResult:
+    # Event-driven mode: same results as day-by-day, quiet sessions skipped
+    engine = BacktestEngine(data_provider, event_driven=True)
+    return engine.run(config)
+
+
+def respond(config: StrategyConfigRequest, result: BacktestResult, key: str) -> bytes:
+    bodies = encode_bodies(config, result, key)
+    body = bodies.pop(key)
+    for stored_key, stored in bodies.items():
+        result_cache.put(stored_key, stored)
+    return body
+
+
+def encode_bodies(config: StrategyConfigRequest, result: BacktestResult, key: str) -> Dict[str, bytes]:
+    # Pure (runs inside the job workers): the response under `key` plus what is cached next to it
+    history = result_history(result)
+    return {
+        key: encode_json(build_response(config, result, history, key)),
+        # Full-resolution history is kept server-side (next to the response) for zoomed-in queries
+        history_key(key): history.to_bytes(),
+        # Columnar variant (other Accept formats) encoded straight from the arrays
+        format_key(key, serialization.COLUMNS): encode_json(build_columns(config, result, history, key)),
+    }
+
+
+def result_history(result: BacktestResult) -> MultiResolutionHistory:
+    extra = {}
+    if result.metrics is not None:
+        extra = {"rolling_return_12m": result.metrics.rolling_return_12m,
+                 "rolling_volatility_12m": result.metrics.rolling_volatility_12m}
+    return MultiResolutionHistory.from_recorder(result.history, extra)
+
+
+def build_response(config: StrategyConfigRequest, result: BacktestResult,
+                   history: Optional[MultiResolutionHistory] = None, history_id: Optional[str] = None) -> dict:
+    # Equity curve downsampled to HISTORY_POINTS (shape-preserving); the summary covers every session
+    history = history if history is not None else result_history(result)
+    rows = history.query(max_points=HISTORY_POINTS)
+    # Serialize Result
+    return {
+        "start_date": config.start_date,
+        "end_date": config.end_date,
+        "benchmarks": benchmark_points(history, rows),
+        "scenarios": {
+            "21": {
+                "summary": result_summary(result),
+                "rolling_12m": rolling_series(history, rows),
+                "history": history.records(rows),
+                "history_id": history_id,
+                "history_sessions": len(history),
+                "decision_log": result.trade_log # Using trade_log for decision_log for now
+            }
+        },
+        "trades": result.trade_log # Explicit trades list for the new tab
+    }
+
+
+def result_summary(result: BacktestResult) -> dict:
+    return {
+        "final_capital": result.final_capital,
+        "total_return": result.total_return,
+        "cagr": result.cagr,
+        "total_trades": result.total_trades,
+        "max_drawdown": result.max_drawdown,
+        "sortino_ratio": result.sortino_ratio,
+        "win_rate": result.win_rate,
+        **(result.metrics.summary() if result.metrics is not None else {})
+    }
+
+
+def build_columns(config: StrategyConfigRequest, result: BacktestResult,
+                  history: MultiResolutionHistory, history_id: Optional[str] = None) -> dict:
+    """
+    Columnar response (same rows as build_response): `history` holds one array
+    per column (equity curve, benchmarks, rolling 12m series) and `trades` one
+    list per Transaction field.
+    """
+    rows = history.query(max_points=HISTORY_POINTS)
+    return {
+        "start_date": config.start_date,
+        "end_date": config.end_date,
+        "summary": result_summary(result),
+        "history_id": history_id,
+        "history_sessions": len(history),
+        "history": {name: history.column(name, rows) for name in history.columns},
+        "trades": {field.name: [getattr(t, field.name) for t in result.trade_log] for field in fields(Transaction)},
+    }
+
+
+def columns_from_response(body: dict) -> dict:
+    # Columnar payload rebuilt from a row-layout body (when the stored variant was evicted)
+    scenario = body["scenarios"]["21"]
+    history = serialization.records_to_columns(scenario["history"])
+    rolling = scenario["rolling_12m"]
+    if len(rolling["return"]) == len(scenario["history"]):
+        history["rolling_return_12m"] = rolling["return"]
+        history["rolling_volatility_12m"] = rolling["volatility"]
+    trades = serialization.records_to_columns(body["trades"]) or {field.name: [] for field in fields(Transaction)}
+    return {
+        "start_date": body["start_date"],
+        "end_date": body["end_date"],
+        "summary": scenario["summary"],
+        "history_id": scenario["history_id"],
+        "history_sessions": scenario["history_sessions"],
+        "history": history,
+        "trades": trades,
+    }
+
+
+# History column with each benchmark's curve (from the provider's BenchmarkService via the engine)
+BENCHMARK_COLUMNS = {"IBOV": "ibov_value", "SELIC_Rate": "selic_value", "IPCA": "ipca_value"}
+
+
+def benchmark_points(history: MultiResolutionHistory, rows: np.ndarray) -> dict:
+    # {name: [{date, value}]} on the given history rows; unavailable benchmarks (IBOV at 0) are left empty
+    dates = pd.DatetimeIndex(history.column("date", rows))
+    points = {}
+    for name, column in BENCHMARK_COLUMNS.items():
+        if column not in history.columns or len(rows) == 0 or not history.columns[column][0] > 0:
+            points[name] = []
+            continue
+        values = history.column(column, rows).tolist()
+        points[name] = [{"date": date, "value": value} for date, value in zip(dates, values)]
+    return points
+
+
+def rolling_series(history: MultiResolutionHistory, rows: np.ndarray) -> dict:
+    # Aligned with the history rows; None until the first 12 months are available
+    if "rolling_return_12m" not in history.columns:
+        return {"return": [], "volatility": []}
+    return {
+        "return": [None if np.isnan(v) else float(v) for v in history.column("rolling_return_12m", rows)],
+        "volatility": [None if np.isnan(v) else float(v) for v in history.column("rolling_volatility_12m", rows)],
+    }
+
+
+def encode_json(payload) -> bytes:
+    # Compact JSON encoded natively (orjson when installed): arrays, datetimes, dataclasses, NaN -> null
+    return serialization.dumps(payload)
+
+
+def format_key(key: str, fmt: serialization.Format, encoding: Optional[str] = None) -> str:
+    """Cache key of a response variant (format, then content encoding) stored next to the JSON body."""
+    return ":".join([key, fmt.name] + ([encoding] if encoding else []))
+
+
+def negotiate(request: Request) -> serialization.Format:
+    fmt = serialization.negotiate(request.headers.get("accept"))
+    if fmt is None:
+        offered = [media_type for media_type, f in serialization.MEDIA_TYPES.items() if serialization.available(f)]
+        raise HTTPException(status_code=406, detail=f"Acceptable formats: {', '.join(offered)}")
+    return fmt
+
+
+def send(request: Request, fmt: serialization.Format, body: bytes, key: Optional[str] = None) -> Response:
+    """
+    Response with an encoded body, compressed (br/gzip per Accept-Encoding)
+    when it has at least COMPRESS_MIN_BYTES; with a `key` the compressed
+    body is cached next to it.
+    """
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = serialization.choose_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None and len(body) >= COMPRESS_MIN_BYTES:
+        compress = lambda: serialization.compress(body, encoding)
+        body = result_cache.get_or_compute(format_key(key, fmt, encoding), compress) if key else compress()
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=fmt.media_type, headers=headers)
+
+
+def result_variant(key: str, fmt: serialization.Format, body: bytes) -> bytes:
+    """A cached run response (JSON `body`) in another format."""
+    if fmt is serialization.JSON:
+        return body
+
+    def columns():
+        return encode_json(columns_from_response(serialization.loads(body)))
+
+    stored = result_cache.get_or_compute(format_key(key, serialization.COLUMNS), columns)
+    if fmt is serialization.COLUMNS:
+        return stored
+    return result_cache.get_or_compute(
+        format_key(key, fmt), lambda: serialization.encode(serialization.loads(stored), fmt))
+
+
 @app.post("/api/backtest/run")
-def run_simulation(config: StrategyConfigRequest):
+def run_simulation(config: StrategyConfigRequest, request: Request):
+    """
+    Runs (or serves from the cache) a backtest. The Accept header picks the
+    format: application/json (default), the columnar
+    application/vnd.backtest.columns+json, application/msgpack or
+    application/vnd.apache.arrow.stream (history as a record batch, the rest
+    as JSON in the schema metadata) when their packages are installed.
+    """
     print(f"Received simulation request: {config.json()}")
+    fmt = negotiate(request)
 
     try:
-        # Initialize DataProvider (singleton or per request?)
-        # For now, let's create one. Ensure data path is correct.
-        from backtest.data_provider import DataProvider
-        data_provider = DataProvider() # Assuming it loads data on init
-        
-        engine = BacktestEngine(data_provider)
-        result = engine.run(config)
-        
-        # Serialize Result
-        response = {
-            "start_date": config.start_date,
-            "end_date": config.end_date,
-            "benchmarks": {
-                "IBOV": [], # TODO: Fetch Benchmark Data
-                "SELIC_Rate": []
-            },
-            "scenarios": {
-                "21": {
-                    "summary": {
-                        "final_capital": result.final_capital,
-                        "total_return": result.total_return,
-                        "cagr": result.cagr,
-                        "total_trades": result.total_trades,
-                        "max_drawdown": result.max_drawdown
-                    },
-                    "history": result.history, # Check format
-                    "decision_log": result.trade_log # Using trade_log for decision_log for now
-                }
-            },
-            "trades": result.trade_log # Explicit trades list for the new tab
-        }
-        
-        return response
+        # Shared snapshot: this request keeps it even if a reload swaps in a newer one
+        data_provider = provider_manager.get()
+
+        # Identical configs on the same dataset are served from the cache;
+        # concurrent duplicates wait for a single simulation. The engine mutates
+        # its config (blacklist), so it gets a copy and the key stays the request's.
+        key = cache_key(config, data_provider.fingerprint())
+        body = result_cache.get_or_compute(
+            key, lambda: respond(config, simulate(config.model_copy(deep=True), data_provider), key))
+        return send(request, fmt, result_variant(key, fmt, body), key)
 
     except Exception as e:
         print(f"Error running simulation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def stream_events(config: StrategyConfigRequest, data_provider, key: str, chunk_sessions: int):
+    """
+    SSE stream of a run: `progress` events with the new equity-curve rows, then
+    `result` with the same body as /api/backtest/run (or `error`). When the
+    client disconnects the generator is closed and the simulation stops at the
+    next chunk.
+    """
+    cached = result_cache.get(key)
+    if cached is not None:
+        yield sse_event("result", cached)
+        return
+
+    engine = BacktestEngine(data_provider, event_driven=True)
+    run = engine.run_iter(config.model_copy(deep=True), chunk_sessions)
+    try:
+        for item in run:
+            if isinstance(item, BacktestProgress):
+                yield sse_event("progress", encode_json({
+                    "processed": item.processed,
+                    "total": item.total,
+                    "date": item.date,
+                    "history": item.history,
+                }))
+            else:
+                body = respond(config, item, key)
+                result_cache.put(key, body)
+                yield sse_event("result", body)
+    except Exception as e:
+        print(f"Error streaming simulation: {e}")
+        yield sse_event("error", encode_json({"detail": str(e)}))
+    finally:
+        run.close()
+
+
+@app.post("/api/backtest/stream")
+def stream_simulation(config: StrategyConfigRequest, chunk_sessions: int = 21):
+    """Same simulation as /api/backtest/run, streamed as Server-Sent Events."""
+    data_provider = provider_manager.get()
+    key = cache_key(config, data_provider.fingerprint())
+    return StreamingResponse(
+        stream_events(config, data_provider, key, max(1, chunk_sessions)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/backtest/compare")
+def compare_strategies(configs: List[StrategyConfigRequest], request: Request):
+    """
+    Summaries and equity curves of several variants (strategy comparison page),
+    simulated together in one pass over the timeline.
+    """
+    fmt = negotiate(request)
+    try:
+        data_provider = provider_manager.get()
+        results = BatchBacktestEngine(data_provider).run([config.model_copy(deep=True) for config in configs])
+        summaries, curves = [], []
+        for result in results:
+            # Equity curve within the per-response point budget
+            history = result_history(result)
+            rows = history.query(max_points=HISTORY_POINTS)
+            summaries.append(summarize(result))
+            curves.append({name: history.column(name, rows) for name in ("date", "total_value")})
+        if fmt is serialization.JSON:
+            payload = [{**summary, "history": [[date.isoformat(), value] for date, value in zip(
+                pd.DatetimeIndex(curve["date"]), curve["total_value"].tolist())]}
+                for summary, curve in zip(summaries, curves)]
+        else:
+            # Columnar: the curves stacked in one table, tagged by the variant's position
+            payload = {
+                "variants": summaries,
+                "history": {
+                    "variant": np.repeat(np.arange(len(curves)), [len(c["date"]) for c in curves]),
+                    "date": np.concatenate([c["date"] for c in curves]) if curves else np.array([], 'datetime64[ns]'),
+                    "total_value": np.concatenate([c["total_value"] for c in curves]) if curves else np.array([]),
+                },
+            }
+        return send(request, fmt, serialization.encode(payload, fmt))
+    except Exception as e:
+        print(f"Error running comparison: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+_histories = OrderedDict()  # Decoded MultiResolutionHistory by history id (small LRU)
+
+
+def load_history(history_id: str) -> Optional[MultiResolutionHistory]:
+    history = _histories.get(history_id)
+    if history is None:
+        data = result_cache.get(history_key(history_id))
+        if data is None:
+            return None
+        history = _histories[history_id] = MultiResolutionHistory.from_bytes(data)
+        while len(_histories) > 32:
+            _histories.popitem(last=False)
+    return history
+
+
+@app.get("/api/backtest/history/{history_id}")
+def get_history(history_id: str, request: Request, start: Optional[str] = None, end: Optional[str] = None,
+                points: int = HISTORY_POINTS):
+    """
+    Equity curve of a finished run (`history_id` from its response) between
+    start and end, downsampled to at most `points` points: zooming in
+    fetches the detail of the visible range only.
+    """
+    fmt = negotiate(request)
+    history = load_history(history_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"History {history_id} not available; run the backtest again")
+    rows = history.query(start, end, min(max(points, 2), HISTORY_MAX_POINTS))
+    a, b = history.range_rows(start, end)
+    payload = {
+        "history_id": history_id,
+        "start": start,
+        "end": end,
+        "sessions": b - a,
+    }
+    if fmt is serialization.JSON:
+        payload.update({
+            "history": history.records(rows),
+            "rolling_12m": rolling_series(history, rows),
+            "benchmarks": benchmark_points(history, rows),
+        })
+    else:
+        payload["history"] = {name: history.column(name, rows) for name in history.columns}
+    return send(request, fmt, serialization.encode(payload, fmt))
+
+# Background simulations: process pool, bounded queue (429 when full), per-job timeout
+job_queue = JobQueue(
+    workers=int(os.environ.get("BACKTEST_JOB_WORKERS", os.cpu_count() or 1)),
+    max_pending=int(os.environ.get("BACKTEST_JOB_QUEUE", 32)),
+    timeout=float(os.environ.get("BACKTEST_JOB_TIMEOUT", 300)),
+    result_cache=result_cache,
+    encode=encode_bodies,
+    max_age=float(os.environ.get("BACKTEST_JOB_MAX_AGE", 3600)),
+)
+
+
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+
+@app.post("/api/backtest/jobs", status_code=202)
+def submit_job(config: StrategyConfigRequest):
+    try:
+        job = job_queue.submit(config, provider_manager.get())
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return job.as_dict()
+
+
+@app.get("/api/backtest/jobs/{job_id}")
+def job_status(job_id: str):
+    return get_job(job_id).as_dict()
+
+
+@app.get("/api/backtest/jobs/{job_id}/result")
+def job_result(job_id: str, request: Request):
+    fmt = negotiate(request)
+    job = get_job(job_id)
+    if job.status != DONE:
+        # Not finished (or failed / cancelled / timed out): the status says which
+        raise HTTPException(status_code=409, detail=job.as_dict())
+    return send(request, fmt, result_variant(job.key, fmt, job.body), job.key)
+
+
+@app.delete("/api/backtest/jobs/{job_id}")
+def cancel_job(job_id: str):
+    get_job(job_id)
+    return job_queue.cancel(job_id).as_dict()
+
 if __name__ == "__main__":
     uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True)
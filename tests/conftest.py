@@ -0,0 +1,94 @@
+"""
+Fixtures compartilhadas: base sintética pequena (preços + fundamentos + benchmarks)
+para testar o motor sem depender dos arquivos processados reais.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.data_provider import DataProvider
+
+
+SYNTHETIC_TICKERS = ["AAAA3", "BBBB4", "CCCC3", "DDDD3"]
+
+
+def _price_records(dates, base, drift, seed):
+    rng = np.random.default_rng(seed)
+    closes = base * np.cumprod(1 + drift + rng.normal(0, 0.01, len(dates)))
+    return [
+        {"Date": d.strftime("%Y-%m-%d"), "Close": float(c), "Adj Close": float(c), "Volume": 1_000_000}
+        for d, c in zip(dates, closes)
+    ]
+
+
+def _financial_records(ticker_idx):
+    records = []
+    for i, date in enumerate(pd.date_range("2020-03-31", "2023-12-31", freq="QE")):
+        records.append({
+            "date": date.strftime("%Y-%m-%d"),
+            "p_l": 5.0 + ticker_idx * 3 + (i % 3),
+            "p_vp": 1.0 + ticker_idx * 0.5,
+            "roe": 0.10 + ticker_idx * 0.03,
+            "roic": 0.08 + ticker_idx * 0.02,
+            "dy": 0.02 * (ticker_idx + 1),
+            "net_margin": 0.05 * (ticker_idx + 1),
+            "avg_margin_5y": 0.04 * (ticker_idx + 1),
+            "net_debt": 100.0 * (ticker_idx + 1),
+            "ebit": 80.0,
+            "revenue": 1000.0 * (1.05 ** i) * (ticker_idx + 1),
+            "net_income": -10.0 if (ticker_idx == 3 and i == 8) else 50.0,
+        })
+    return records
+
+
+@pytest.fixture
+def synthetic_files(tmp_path):
+    """Escreve data.json e price_history.json sintéticos e devolve os caminhos."""
+    dates = pd.bdate_range("2020-01-01", "2023-12-29")
+    prices = {}
+    financials = {}
+    for idx, ticker in enumerate(SYNTHETIC_TICKERS):
+        ticker_dates = dates
+        if ticker == "DDDD3":
+            # Ativo deslistado no meio do período
+            ticker_dates = dates[dates <= "2022-06-30"]
+        prices[f"{ticker}.SA"] = {
+            "prices": _price_records(ticker_dates, 10.0 + idx * 5, 0.0003 * (idx + 1), idx),
+            "meta": {"symbol": f"{ticker}.SA"},
+        }
+        financials[ticker] = _financial_records(idx)
+
+    data_path = tmp_path / "data.json"
+    price_path = tmp_path / "price_history.json"
+    data_path.write_text(json.dumps(financials))
+    price_path.write_text(json.dumps(prices))
+    return {
+        "data_path": str(data_path),
+        "price_path": str(price_path),
+        "store_path": str(tmp_path / "price_store"),
+        "dates": dates,
+    }
+
+
+def synthetic_benchmarks(dates):
+    return {
+        "SELIC_Rate": pd.Series(0.10, index=dates),
+        "IPCA": pd.Series(0.004, index=pd.date_range(dates[0], dates[-1], freq="MS")),
+        "IBOV": pd.Series(np.linspace(100_000, 130_000, len(dates)), index=dates),
+    }
+
+
+@pytest.fixture
+def synthetic_provider(synthetic_files):
+    """DataProvider carregado com a base sintética e benchmarks offline."""
+    dp = DataProvider(
+        data_path=synthetic_files["data_path"],
+        price_path=synthetic_files["price_path"],
+        price_store_path=synthetic_files["store_path"],
+    )
+    dp.load_data()
+    dp.benchmarks = synthetic_benchmarks(synthetic_files["dates"])
+    return dp
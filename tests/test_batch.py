@@ -0,0 +1,114 @@
+"""
+Simulação de estratégias em lote
+
+Objetivo: Garantir que K configurações avançadas juntas dão os mesmos resultados de K execuções isoladas
+"""
+
+import numpy as np
+import pytest
+
+from backtest.batch import BatchBacktestEngine, SharedMarketData
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.portfolio import Portfolio, PortfolioBook
+
+
+BASE_CONFIG = dict(
+    initial_capital=100000,
+    start_date="2020-06-01",
+    end_date="2023-12-29",
+    max_assets=3,
+    entry_logic="AND",
+    entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    exit_mode="rules",
+    rebalance_period="monthly",
+)
+
+VARIANTS = [
+    dict(stop_loss=10, take_profit=30, contribution_amount=1000,
+         exit_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": ">", "value": 14}]}]),
+    dict(rebalance_period="quarterly", entry_score_weights="growth"),
+    dict(max_assets=2, start_date="2021-01-04", end_date="2022-12-30"),
+    dict(rebalance_period="none", initial_portfolio=[
+        {"ticker": "DDDD3", "shares": 500, "price": 10.0, "volume": 0},
+        {"ticker": "ZZZZ3", "shares": 100, "price": 10.0, "volume": 0},
+    ]),
+]
+
+
+def _configs():
+    return [StrategyConfigRequest(**{**BASE_CONFIG, **variant}) for variant in VARIANTS]
+
+
+class TestBatchBacktest:
+    """Testes para BatchBacktestEngine"""
+
+    @pytest.mark.parametrize("event_driven", [False, True])
+    def test_matches_separate_runs(self, synthetic_provider, event_driven):
+        """B.1: Histórico, trades e valor final iguais aos das execuções isoladas"""
+        batch = BatchBacktestEngine(synthetic_provider, event_driven=event_driven)
+        results = batch.run(_configs())
+
+        assert len(results) == len(VARIANTS)
+        for config, result in zip(_configs(), results):
+            expected = BacktestEngine(synthetic_provider, event_driven=event_driven).run(config)
+            assert result.final_capital == expected.final_capital
+            assert result.trade_log == expected.trade_log
+            assert result.final_holdings == expected.final_holdings
+            assert result.history == expected.history
+            assert result.max_drawdown == expected.max_drawdown
+        assert sum(r.total_trades for r in results) > 0
+
+    def test_market_data_read_once_per_date(self, synthetic_provider):
+        """B.2: Dados de mercado de cada data são lidos uma vez para todas as carteiras"""
+        batch = BatchBacktestEngine(synthetic_provider, event_driven=False)
+        batch.run([StrategyConfigRequest(**BASE_CONFIG) for _ in range(3)])
+
+        # Mesma estratégia três vezes: duas de cada três leituras vêm do cache
+        assert batch.market.hits >= 2 * batch.market.misses
+        assert batch.screen_cache.hits >= 2 * batch.screen_cache.misses > 0
+
+    def test_book_rows_are_portfolio_views(self, synthetic_provider):
+        """B.3: Posições das K carteiras ficam nas matrizes K x tickers do livro"""
+        batch = BatchBacktestEngine(synthetic_provider)
+        batch.run(_configs())
+
+        book = batch.book
+        assert book.quantity.shape == (len(VARIANTS), len(book.tickers))
+        for row, engine in enumerate(batch.engines):
+            portfolio = engine.portfolio
+            assert np.shares_memory(portfolio.quantity, book.quantity)
+            for ticker, holding in portfolio.holdings.items():
+                assert book.quantity[row, book.ticker_index[ticker]] == holding["quantity"]
+            assert book.quantity[row].sum() == sum(h["quantity"] for h in portfolio.holdings.values())
+            assert book.cash[row] == portfolio.cash
+        # Ticker fora do universo ganhou uma coluna em todas as linhas
+        assert "ZZZZ3" in book.ticker_index
+
+    def test_book_add_ticker_rebinds_rows(self):
+        """B.4: Nova coluna mantém as posições e as views das carteiras"""
+        book = PortfolioBook(2, ["AAAA3"])
+        first, second = book.portfolio(1000, 0), book.portfolio(1000, 1)
+        first.buy("2021-01-04", "AAAA3", 10, 10.0)
+        second.buy("2021-01-04", "NEW11", 5, 20.0)
+
+        assert book.quantity.tolist() == [[10, 0], [0, 5]]
+        assert first.quantity_of("AAAA3") == 10 and second.quantity_of("NEW11") == 5
+        first.sell("2021-01-05", "AAAA3", 4, 12.0)
+        assert book.quantity[0, 0] == 6
+        assert np.allclose(book.market_values(), [1000 - 100 + 4 * 12.0 + 6 * 10.0, 1000.0])
+
+        plain = Portfolio(1000, ["AAAA3"])
+        plain.buy("2021-01-04", "AAAA3", 10, 10.0)
+        assert plain.holdings == {"AAAA3": {"quantity": 10, "avg_price": 10.0}}
+
+    def test_shared_prices_match_provider(self, synthetic_provider):
+        """B.5: Fatias do cache do universo iguais à leitura direta do painel"""
+        market = SharedMarketData(synthetic_provider)
+        for date in ["2020-06-01", "2022-07-15", "2023-12-29"]:
+            tickers = ["DDDD3", "AAAA3"]
+            prices, ages = market.get_prices(tickers, date)
+            expected_prices, expected_ages = synthetic_provider.get_prices(tickers, date)
+            np.testing.assert_array_equal(prices, expected_prices)
+            np.testing.assert_array_equal(ages, expected_ages)
+        assert market.get_fundamentals("2022-07-15") is market.get_fundamentals("2022-07-15")
@@ -0,0 +1,125 @@
+"""
+Benchmarks alinhados ao timeline
+
+Objetivo: Garantir que as curvas pré-computadas reproduzem as consultas diárias
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest.benchmark import BenchmarkLevels, BenchmarkService
+
+
+class TestBenchmarkArrays:
+    """Testes para get_benchmark_arrays"""
+
+    def test_selic_matches_daily_lookup(self, synthetic_provider):
+        """B.1: Fator diário da SELIC igual ao de get_selic_daily"""
+        dp = synthetic_provider
+        dp.benchmarks["SELIC_Rate"] = pd.Series(
+            [0.1375, 0.1175, 0.105],
+            index=pd.to_datetime(["2022-12-01", "2023-08-03", "2023-11-02"]),
+        )
+        timeline = dp.get_market_timeline("2023-01-01", "2023-12-31")
+        arrays = dp.get_benchmark_arrays(timeline)
+
+        expected = np.array([dp.get_selic_daily(d) for d in timeline])
+        np.testing.assert_allclose(arrays["selic_daily"], expected, rtol=1e-12)
+        np.testing.assert_allclose(arrays["selic_cumulative"], np.cumprod(1 + expected), rtol=1e-12)
+
+    def test_ibov_normalized_to_base(self, synthetic_provider):
+        """B.2: IBOV normalizado pelo valor as-of na data base"""
+        dp = synthetic_provider
+        ibov = dp.benchmarks["IBOV"]
+        timeline = dp.get_market_timeline("2023-01-01", "2023-03-31")
+        base = pd.Timestamp("2023-01-01")
+        arrays = dp.get_benchmark_arrays(timeline, base)
+
+        start = ibov.loc[ibov.index.asof(base)]
+        expected = [ibov.loc[ibov.index.asof(d)] / start for d in timeline]
+        np.testing.assert_allclose(arrays["ibov"], expected, rtol=1e-12)
+
+    def test_missing_benchmarks_fallback(self, synthetic_provider):
+        """B.3: Sem benchmarks, SELIC usa fallback e IBOV/IPCA ficam neutros"""
+        dp = synthetic_provider
+        dp.benchmarks = {}
+        timeline = pd.bdate_range("2023-01-02", "2023-01-31")
+        arrays = dp.get_benchmark_arrays(timeline)
+
+        assert np.all(arrays["selic_daily"] == 0.0004)
+        assert np.all(arrays["ibov"] == 0.0)
+        assert np.all(arrays["ipca"] == 1.0)
+
+
+class TestBenchmarkService:
+    """Testes para BenchmarkService (níveis pré-computados)"""
+
+    def test_window_return_matches_naive(self, synthetic_provider):
+        """B.4: Retorno de uma janela (razão de níveis) igual ao cumprod do recorte"""
+        service = synthetic_provider.benchmark_service
+        start, end = pd.Timestamp("2021-03-10"), pd.Timestamp("2022-11-20")
+        for name, series in synthetic_provider.benchmarks.items():
+            subset = series.loc[start:end]
+            if name == "SELIC_Rate":
+                expected = ((1 + subset) ** (1 / 252)).prod() - 1
+            elif name == "IPCA":
+                expected = (1 + subset).prod() - 1
+            else:
+                expected = subset.iloc[-1] / subset.iloc[0] - 1
+            assert np.isclose(service.window_return(name, start, end), expected, rtol=1e-12)
+
+            cumulative = service.get_benchmark_cumulative(name, start, end)
+            if name != "IPCA":
+                np.testing.assert_allclose(cumulative.iloc[-1], expected, rtol=1e-12)
+                assert cumulative.index[0] == subset.index[0]
+
+    def test_alignment_memoized_per_version(self, synthetic_provider):
+        """B.5: Alinhamento memoizado até os benchmarks serem substituídos"""
+        dp = synthetic_provider
+        timeline = dp.get_market_timeline("2022-01-01", "2022-12-31")
+        first = dp.get_benchmark_arrays(timeline)
+        second = dp.get_benchmark_arrays(timeline)
+        assert first is not second
+        assert all(first[key] is second[key] for key in first)
+        assert not first["selic_daily"].flags.writeable
+
+        dp.benchmarks["SELIC_Rate"] = dp.benchmarks["SELIC_Rate"] * 2
+        third = dp.get_benchmark_arrays(timeline)
+        assert np.all(third["selic_daily"] > first["selic_daily"])
+        np.testing.assert_array_equal(third["ibov"], first["ibov"])
+
+    def test_ipca_cumulative_is_monthly_compounding(self, synthetic_provider):
+        """B.6: IPCA diário (as-of) compõe cada taxa mensal uma única vez"""
+        service = synthetic_provider.benchmark_service
+        ipca = synthetic_provider.benchmarks["IPCA"]
+        start, end = ipca.index[3], ipca.index[9] + pd.Timedelta(days=10)
+        daily = service.get_benchmark_cumulative("IPCA", start, end)
+
+        assert daily.index[0] == start and daily.index[-1] == end
+        expected = (1 + ipca.iloc[3:10]).prod() - 1
+        assert np.isclose(daily.iloc[-1], expected, rtol=1e-12)
+        assert np.isclose(daily.iloc[0], ipca.iloc[3], rtol=1e-12)
+
+    def test_selic_levels_use_corrected_rates(self):
+        """B.7: Taxa em % (corrigida pela checagem de segurança) usada no nível e na taxa diária"""
+        dates = pd.bdate_range("2023-01-02", periods=20)
+        levels = BenchmarkLevels.build("SELIC_Rate", pd.Series(12.0, index=dates))
+        np.testing.assert_allclose(levels.daily_rates, 1.12 ** (1 / 252) - 1, rtol=1e-12)
+        np.testing.assert_allclose(levels.after / levels.before, 1 + levels.daily_rates, rtol=1e-12)
+
+    def test_memo_is_thread_safe(self, synthetic_provider):
+        """B.8: Requisições concorrentes no mesmo serviço respeitam o limite do memo"""
+        service = BenchmarkService(synthetic_provider, max_alignments=4)
+        timeline = synthetic_provider.get_market_timeline("2021-01-01", "2022-12-31")
+        windows = [timeline[i:i + 60] for i in range(0, 400, 20)]
+        expected = [service.aligned(window)["ibov"].copy() for window in windows]
+
+        def worker(seed):
+            for i in np.random.default_rng(seed).integers(0, len(windows), 200):
+                np.testing.assert_array_equal(service.aligned(windows[i])["ibov"], expected[i])
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(worker, range(8)))
+        assert len(service._aligned) <= 4
@@ -0,0 +1,76 @@
+"""
+Checkpoint e retomada do backtest
+
+Objetivo: Garantir que retomar de um checkpoint reproduz a execução completa
+"""
+
+import pytest
+
+from backtest.checkpoint import BacktestCheckpoint
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+
+
+CONFIG = dict(
+    initial_capital=100000,
+    start_date="2020-06-01",
+    end_date="2023-12-29",
+    max_assets=3,
+    entry_logic="AND",
+    entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    exit_mode="rules",
+    exit_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": ">", "value": 14}]}],
+    stop_loss=10,
+    take_profit=30,
+    rebalance_period="monthly",
+    contribution_amount=1000,
+    initial_portfolio=[{"ticker": "DDDD3", "shares": 500, "price": 10.0, "volume": 0}],
+)
+
+
+class TestCheckpoint:
+    """Testes para checkpoint/resume"""
+
+    @pytest.mark.parametrize("event_driven", [False, True])
+    @pytest.mark.parametrize("cut", ["2021-03-31", "2022-07-29", "2023-12-28"])
+    def test_resume_matches_full_run(self, synthetic_provider, event_driven, cut):
+        """CK.1: Sessões após o checkpoint iguais às da execução completa"""
+        full = BacktestEngine(synthetic_provider, event_driven).run(StrategyConfigRequest(**CONFIG))
+
+        partial_engine = BacktestEngine(synthetic_provider, event_driven)
+        partial = partial_engine.run(StrategyConfigRequest(**{**CONFIG, "end_date": cut}))
+        checkpoint = BacktestCheckpoint.loads(partial_engine.checkpoint().dumps())
+
+        resumed = BacktestEngine(synthetic_provider, event_driven).resume(checkpoint, CONFIG["end_date"])
+
+        assert partial.history.records() + resumed.history.records() == full.history.records()
+        assert partial.trade_log + resumed.trade_log == full.trade_log
+        assert resumed.final_capital == full.final_capital
+        assert resumed.final_holdings == full.final_holdings
+        assert resumed.total_trades == full.total_trades
+        assert resumed.total_invested == full.total_invested
+        assert resumed.cagr == full.cagr
+
+    def test_chained_daily_resumes(self, synthetic_provider):
+        """CK.2: Estender um dia por vez equivale à execução completa"""
+        config = StrategyConfigRequest(**{**CONFIG, "end_date": "2023-11-30"})
+        engine = BacktestEngine(synthetic_provider, event_driven=True)
+        engine.run(config)
+        checkpoint = engine.checkpoint()
+
+        full = BacktestEngine(synthetic_provider, event_driven=True).run(
+            StrategyConfigRequest(**{**CONFIG, "end_date": "2023-12-15"}))
+        tail = []
+        for day in ["2023-12-01", "2023-12-04", "2023-12-05", "2023-12-15"]:
+            engine = BacktestEngine(synthetic_provider, event_driven=True)
+            result = engine.resume(checkpoint, day)
+            tail += result.history
+            checkpoint = engine.checkpoint()
+
+        assert tail == full.history[-len(tail):]
+        assert result.final_capital == full.final_capital
+
+    def test_checkpoint_requires_run(self, synthetic_provider):
+        """CK.3: Checkpoint antes de executar é um erro"""
+        with pytest.raises(ValueError):
+            BacktestEngine(synthetic_provider).checkpoint()
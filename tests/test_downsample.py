@@ -0,0 +1,97 @@
+"""
+Histórico em múltiplas resoluções
+
+Objetivo: Garantir que a curva reduzida respeita o orçamento de pontos e preserva o formato da série
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.domain import StrategyConfigRequest
+from backtest.downsample import MultiResolutionHistory, lttb_indices, minmax_indices
+from backtest.engine import BacktestEngine
+from backtest.history import HistoryRecorder
+
+
+def _recorder(sessions=3000, seed=0):
+    dates = pd.bdate_range("2010-01-04", periods=sessions)
+    values = 100_000 * np.cumprod(1 + np.random.default_rng(seed).normal(0.0004, 0.01, sessions))
+    history = HistoryRecorder()
+    history.extend(dates.values, values, values * 0.1, 3)
+    history.set_benchmarks(0, sessions, values * 0.9, values * 0.8, values * 0.7)
+    return history
+
+
+class TestDownsampling:
+    """Testes para lttb_indices, minmax_indices e MultiResolutionHistory"""
+
+    def test_lttb_keeps_ends_and_peaks(self):
+        """D.1: LTTB mantém extremidades e picos isolados da série"""
+        x = np.arange(1000, dtype=float)
+        y = np.zeros(1000)
+        y[[137, 600]] = [50.0, -80.0]
+        kept = lttb_indices(x, y, 50)
+
+        assert len(kept) == 50
+        assert kept[0] == 0 and kept[-1] == 999
+        assert np.all(np.diff(kept) > 0)
+        assert {137, 600} <= set(kept.tolist())
+        np.testing.assert_array_equal(lttb_indices(x, y, 2000), np.arange(1000))
+
+    def test_minmax_keeps_bucket_extremes(self):
+        """D.2: Min/max mantém o menor e o maior valor de cada bucket"""
+        y = np.random.default_rng(1).normal(size=1000)
+        kept = minmax_indices(y, 20)
+        assert y[kept].min() == y.min() and y[kept].max() == y.max()
+        assert len(kept) <= 42
+
+    @pytest.mark.parametrize("method", ["lttb", "minmax"])
+    def test_query_within_budget(self, method):
+        """D.3: Qualquer intervalo respeita o orçamento e inclui as extremidades"""
+        history = MultiResolutionHistory.from_recorder(_recorder(), method=method)
+        assert len(history.levels) > 1
+
+        for start, end, points in [(None, None, 500), ("2012-03-01", "2015-07-31", 300), (None, None, 10),
+                                   ("2013-01-01", "2013-02-28", 1000)]:
+            rows = history.query(start, end, points)
+            a, b = history.range_rows(start, end)
+            assert len(rows) <= points
+            assert rows[0] == a and rows[-1] == b - 1
+            assert np.all(np.diff(rows) > 0)
+            if b - a <= points:
+                np.testing.assert_array_equal(rows, np.arange(a, b))
+            else:
+                assert len(rows) >= min(points, 256) // 2
+
+    def test_records_and_roundtrip(self):
+        """D.4: Registros iguais aos do histórico e serialização sem perda"""
+        recorder = _recorder(800)
+        history = MultiResolutionHistory.from_recorder(recorder, {"extra": np.arange(800.0)})
+        rows = history.query(max_points=100)
+        expected = recorder.records()
+        assert history.records(rows) == [expected[i] for i in rows]
+
+        restored = MultiResolutionHistory.from_bytes(history.to_bytes())
+        assert restored.method == history.method
+        assert all(np.array_equal(a, b) for a, b in zip(restored.levels, history.levels))
+        np.testing.assert_array_equal(restored.query("2010-06-01", None, 77), history.query("2010-06-01", None, 77))
+        np.testing.assert_array_equal(restored.column("extra", rows), rows.astype(float))
+
+    def test_from_backtest_result(self, synthetic_provider):
+        """D.5: Histórico de uma simulação com benchmarks e séries móveis"""
+        config = StrategyConfigRequest(
+            initial_capital=100000, start_date="2020-06-01", end_date="2023-12-29", max_assets=3,
+            entry_logic="AND", exit_mode="rules",
+            entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+            rebalance_period="monthly",
+        )
+        result = BacktestEngine(synthetic_provider, event_driven=True).run(config)
+        history = MultiResolutionHistory.from_recorder(
+            result.history, {"rolling_return_12m": result.metrics.rolling_return_12m})
+
+        rows = history.query(max_points=200)
+        assert len(rows) <= 200
+        records = history.records(rows)
+        assert set(records[0]) == set(result.history[0])
+        assert records[-1] == result.history[-1]
@@ -0,0 +1,78 @@
+"""
+Simulação orientada a eventos
+
+Objetivo: Garantir que o modo por eventos reproduz exatamente o modo dia a dia
+"""
+
+import pytest
+
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+
+
+BASE_CONFIG = dict(
+    initial_capital=100000,
+    start_date="2020-06-01",
+    end_date="2023-12-29",
+    max_assets=3,
+    entry_logic="AND",
+    entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    exit_mode="rules",
+    rebalance_period="monthly",
+)
+
+SCENARIOS = {
+    "rules_and_stops": dict(
+        exit_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": ">", "value": 14}]}],
+        stop_loss=10,
+        take_profit=30,
+        contribution_amount=1000,
+    ),
+    "profits_exit_quarterly": dict(
+        exit_criteria=[{"logic": "OR", "items": [{"indicator": "consecutive_profits", "operator": "<", "value": 1.0}]}],
+        rebalance_period="quarterly",
+        entry_score_weights="growth",
+    ),
+    "initial_portfolio_no_rebalance": dict(
+        rebalance_period="none",
+        initial_portfolio=[
+            {"ticker": "DDDD3", "shares": 500, "price": 10.0, "volume": 0},
+            {"ticker": "AAAA3", "shares": 300, "price": 10.0, "volume": 0},
+        ],
+    ),
+}
+
+
+def _run(provider, event_driven, **overrides):
+    config = StrategyConfigRequest(**{**BASE_CONFIG, **overrides})
+    engine = BacktestEngine(provider, event_driven=event_driven)
+    return engine, engine.run(config)
+
+
+class TestEventDriven:
+    """Testes de equivalência entre os modos de simulação"""
+
+    @pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+    def test_matches_daily_mode(self, synthetic_provider, scenario):
+        """E.1: Mesmo histórico, trades e valor final nos dois modos"""
+        daily_engine, daily = _run(synthetic_provider, False, **SCENARIOS[scenario])
+        engine, events = _run(synthetic_provider, True, **SCENARIOS[scenario])
+
+        assert daily.total_trades > 0
+        assert events.final_capital == daily.final_capital
+        assert events.trade_log == daily.trade_log
+        assert events.final_holdings == daily.final_holdings
+        assert events.history == daily.history
+        assert engine.days_since_rebalance == daily_engine.days_since_rebalance
+        assert engine.config.blacklisted_assets == daily_engine.config.blacklisted_assets
+
+    def test_skips_quiet_sessions(self, synthetic_provider):
+        """E.2: Apenas os dias com evento passam por process_day"""
+        engine = BacktestEngine(synthetic_provider, event_driven=True)
+        calls = []
+        original = engine.process_day
+        engine.process_day = lambda date, day=None: (calls.append(day), original(date, day))
+
+        result = engine.run(StrategyConfigRequest(**{**BASE_CONFIG, **SCENARIOS["rules_and_stops"]}))
+        assert len(result.history) > 0
+        assert len(calls) < len(result.history) / 3
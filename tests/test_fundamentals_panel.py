@@ -0,0 +1,87 @@
+"""
+Painel de Fundamentos point-in-time
+
+Objetivo: Garantir que o corte transversal por data reproduz get_latest_financials_row
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class TestFundamentalsPanel:
+    """Testes para o painel de fundamentos alinhado ao calendário"""
+
+    def test_snapshot_matches_asof(self, synthetic_provider):
+        """F.1: Cada ticker do snapshot deve ser o último balanço <= data"""
+        dp = synthetic_provider
+        # Datas de balanço (fim de semana inclusive) e dias sem pregão
+        for date in pd.to_datetime(["2019-06-01", "2020-03-31", "2021-01-02", "2022-07-15", "2023-12-31"]):
+            snapshot = dp.get_fundamentals(date)
+            for i, ticker in enumerate(dp.assets_list):
+                expected = dp.get_latest_financials_row(ticker, date)
+                row = snapshot.row(ticker)
+                if expected is None:
+                    assert row is None
+                    assert np.isnan(snapshot.ages[i])
+                    continue
+                assert row.name == expected.name
+                assert snapshot.ages[i] == (date - expected.name).days
+                for indicator in ["p_l", "roe", "revenue", "net_income"]:
+                    assert snapshot.get(indicator)[i] == expected[indicator]
+
+    def test_missing_indicator_uses_default(self, synthetic_provider):
+        """F.2: Indicador ausente nos dados retorna o default, como pd.Series.get"""
+        snapshot = synthetic_provider.get_fundamentals(pd.Timestamp("2023-06-30"))
+        row = snapshot.row("AAAA3")
+        assert row.get("ev_ebitda") is None
+        assert row.get("ev_ebitda", 7) == 7
+        assert not snapshot.has("ev_ebitda").any()
+
+    def test_dense_matrices(self, synthetic_provider):
+        """F.3: Matrizes dia x ticker coincidem com os snapshots"""
+        panel = synthetic_provider.fundamentals_panel
+        roe = panel.matrix("roe")
+        ages = panel.age_matrix()
+        pos = panel.position(pd.Timestamp("2022-02-14"))
+        snapshot = panel.snapshot(pd.Timestamp("2022-02-14"))
+
+        np.testing.assert_array_equal(roe[pos], snapshot.get("roe"))
+        np.testing.assert_array_equal(ages[pos], snapshot.ages)
+
+
+class TestDerivedIndicators:
+    """Testes para os indicadores derivados pré-computados na carga"""
+
+    def test_consecutive_profits_run_length(self, synthetic_provider):
+        """F.4: Lucros consecutivos reiniciam após prejuízo (em anos)"""
+        df = synthetic_provider.get_financials_data("DDDD3")
+        loss = df.index[df["net_income"] <= 0][0]
+        after = df.loc[loss:, "consecutive_profits"].to_numpy()
+        np.testing.assert_allclose(after[:5], [0.0, 0.25, 0.5, 0.75, 1.0])
+
+        row = synthetic_provider.get_fundamentals(loss + pd.Timedelta(days=100)).row("DDDD3")
+        assert row["consecutive_profits"] == 0.25
+
+    def test_revenue_cagr_since_first_report(self, synthetic_provider):
+        """F.5: CAGR da receita desde o primeiro balanço; NaN com menos de 4 balanços"""
+        df = synthetic_provider.get_financials_data("AAAA3")
+        cagr = df["revenue_cagr_5y"]
+        assert cagr.iloc[:3].isna().all()
+
+        years = (df.index[-1] - df.index[0]).days / 365.25
+        expected = ((df["revenue"].iloc[-1] / df["revenue"].iloc[0]) ** (1 / years) - 1) * 100
+        assert np.isclose(cagr.iloc[-1], expected)
+
+    def test_ratios_only_when_absent(self):
+        """F.6: Razões derivadas não sobrescrevem colunas existentes"""
+        from backtest.data_provider import DataProvider
+
+        df = pd.DataFrame(
+            {"net_debt": [10.0, 20.0], "ebit": [5.0, 0.0], "p_l": [4.0, 5.0], "roe": [0.5, 0.2], "p_vp": [9.0, 9.0]},
+            index=pd.to_datetime(["2023-03-31", "2023-06-30"]),
+        )
+        DataProvider._add_derived_indicators(df)
+        assert df["net_debt_ebitda"].iloc[0] == 2.0
+        assert np.isnan(df["net_debt_ebitda"].iloc[1])
+        assert (df["p_vp"] == 9.0).all()
+        assert (df["net_margin_avg_5y"] == 0.0).all()
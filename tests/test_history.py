@@ -0,0 +1,58 @@
+"""
+Histórico colunar pré-alocado
+
+Objetivo: Garantir gravação por colunas e conversão para registros idêntica ao histórico em dicionários
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from backtest.history import HistoryRecorder
+
+
+DATES = pd.bdate_range("2023-01-02", periods=6)
+
+
+class TestHistoryRecorder:
+    """Testes para HistoryRecorder"""
+
+    def _recorder(self):
+        history = HistoryRecorder(capacity=2)
+        history.append(DATES[0], 100.0, 10.0, 1)
+        history.extend(DATES[1:5], np.array([101.0, 102.0, 103.0, 104.0]), np.array([10.0, 10.1, 10.2, 10.3]), 2)
+        history.append(DATES[5], 105.0, 0.0, 3)
+        return history
+
+    def test_columns_grow_and_are_views(self):
+        """H.1: Append/extend além da capacidade inicial; colunas sem cópia"""
+        history = self._recorder()
+        assert len(history) == 6
+        np.testing.assert_array_equal(history.total_value, [100, 101, 102, 103, 104, 105])
+        np.testing.assert_array_equal(history.holdings_count, [1, 2, 2, 2, 2, 3])
+        assert history.total_value.base is not None
+        np.testing.assert_array_equal(history.dates, DATES.values)
+
+    def test_records(self):
+        """H.2: Registros com benchmarks apenas nas linhas já enriquecidas"""
+        history = self._recorder()
+        history.set_benchmarks(0, 4, np.arange(4.0), np.arange(4.0) * 2, np.arange(4.0) * 3)
+
+        records = history.records()
+        assert records[0] == {"date": DATES[0], "total_value": 100.0, "cash": 10.0, "holdings_count": 1,
+                              "ibov_value": 0.0, "selic_value": 0.0, "ipca_value": 0.0}
+        assert records[5] == {"date": DATES[5], "total_value": 105.0, "cash": 0.0, "holdings_count": 3}
+        assert history.records(3, 5) == records[3:5] == history[3:5]
+        assert history[-1] == records[-1]
+        assert list(history) == records
+
+    def test_equality_and_pickle(self):
+        """H.3: Igualdade por colunas e pickle só das linhas gravadas"""
+        history = self._recorder()
+        restored = pickle.loads(pickle.dumps(history))
+        assert restored == history
+        assert len(restored._dates) == len(history)
+
+        restored.append(DATES[-1] + pd.Timedelta(days=1), 1.0, 1.0, 1)
+        assert restored != history
@@ -0,0 +1,116 @@
+"""
+Fila de jobs de simulação em processos
+
+Objetivo: Garantir ciclo de vida (status, resultado, cancelamento), limite da fila e timeout
+"""
+
+import time
+
+import pytest
+
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.jobs import CANCELLED, DONE, FINISHED, TIMEOUT, JobQueue, QueueFull
+from backtest.result_cache import ResultCache
+
+
+CONFIG = dict(
+    initial_capital=100000,
+    start_date="2020-06-01",
+    end_date="2023-12-29",
+    max_assets=3,
+    entry_logic="AND",
+    entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    exit_mode="rules",
+    rebalance_period="monthly",
+    contribution_amount=1000,
+)
+
+
+def encode_capital(config, result, key):
+    return {key: str(result.final_capital).encode()}
+
+
+def encode_slowly(config, result, key):
+    # Codificação que não termina quando há stop loss (roda no processo do worker)
+    if config.stop_loss:
+        time.sleep(60)
+    return encode_capital(config, result, key)
+
+
+def _wait(queue, job, timeout=60):
+    deadline = time.monotonic() + timeout
+    while queue.get(job.id).status not in FINISHED:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.02)
+    return queue.get(job.id)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(workers=1, max_pending=2, snapshot_root=str(tmp_path / "jobs"),
+                     result_cache=ResultCache(), encode=encode_capital)
+    yield queue
+    queue.shutdown()
+
+
+class TestJobQueue:
+    """Testes para JobQueue"""
+
+    def test_result_matches_direct_run(self, synthetic_provider, queue):
+        """J.1: Job executado no pool devolve o mesmo resultado da execução direta"""
+        expected = BacktestEngine(synthetic_provider).run(StrategyConfigRequest(**CONFIG))
+        job = _wait(queue, queue.submit(StrategyConfigRequest(**CONFIG), synthetic_provider))
+
+        assert job.status == DONE
+        assert job.result.final_capital == expected.final_capital
+        assert job.result.history == expected.history
+        assert job.body == str(expected.final_capital).encode()
+
+        # Mesma config: servida do cache sem ir ao pool
+        again = queue.submit(StrategyConfigRequest(**CONFIG), synthetic_provider)
+        assert again.status == DONE and again.future is None and again.body == job.body
+
+    def test_queue_depth_and_cancel(self, synthetic_provider, queue):
+        """J.2: Fila cheia recusa novos jobs; cancelar libera espaço"""
+        jobs = [queue.submit(StrategyConfigRequest(**{**CONFIG, "stop_loss": 5 + i}), synthetic_provider)
+                for i in range(2)]
+        with pytest.raises(QueueFull):
+            queue.submit(StrategyConfigRequest(**{**CONFIG, "stop_loss": 20}), synthetic_provider)
+
+        for job in jobs:
+            queue.cancel(job.id)
+        assert {_wait(queue, job).status for job in jobs} <= {CANCELLED, DONE}
+        assert queue.submit(StrategyConfigRequest(**{**CONFIG, "stop_loss": 20}), synthetic_provider)
+
+    def test_timeout(self, synthetic_provider, tmp_path):
+        """J.3: Job que excede o timeout (inclusive na codificação) tem o worker encerrado e substituído"""
+        queue = JobQueue(workers=1, timeout=2, snapshot_root=str(tmp_path / "jobs"), encode=encode_slowly)
+        try:
+            started = time.monotonic()
+            job = _wait(queue, queue.submit(StrategyConfigRequest(**{**CONFIG, "stop_loss": 5}), synthetic_provider))
+            assert job.status == TIMEOUT
+            assert "exceeded" in job.error
+            assert time.monotonic() - started < 30
+
+            # Novo worker atende o job seguinte
+            job = _wait(queue, queue.submit(StrategyConfigRequest(**CONFIG), synthetic_provider))
+            assert job.status == DONE and job.body is not None
+        finally:
+            queue.shutdown()
+
+    def test_unknown_job(self, queue):
+        """J.4: Job inexistente retorna None"""
+        assert queue.get("missing") is None
+        assert queue.cancel("missing") is None
+
+    def test_finished_jobs_expire(self, synthetic_provider, tmp_path):
+        """J.5: Jobs finalizados expiram por idade, além do limite de quantidade"""
+        queue = JobQueue(workers=1, snapshot_root=str(tmp_path / "jobs"), encode=encode_capital, max_age=0.5)
+        try:
+            job = _wait(queue, queue.submit(StrategyConfigRequest(**CONFIG), synthetic_provider))
+            assert job.status == DONE
+            time.sleep(0.6)
+            assert queue.get(job.id) is None
+        finally:
+            queue.shutdown()
@@ -0,0 +1,119 @@
+"""
+Métricas de risco e retorno da curva de patrimônio
+
+Objetivo: Garantir drawdown, TWR, IRR, Sortino, win rate e janelas móveis corretos
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.metrics import (
+    compute_metrics, drawdown_stats, irr, period_returns, rolling_stats, sortino_ratio, trade_stats,
+)
+
+
+def _txn(action, quantity, price):
+    return SimpleNamespace(ticker="AAAA3", action=action, quantity=quantity, price=price,
+                           total_value=quantity * price)
+
+
+class TestMetrics:
+    """Testes para backtest.metrics"""
+
+    def test_drawdown_and_duration(self):
+        """MT.1: Drawdown máximo e maior período abaixo do pico"""
+        values = np.array([100, 120, 90, 110, 130, 125], dtype=float)
+        dates = pd.DatetimeIndex(["2023-01-02", "2023-01-03", "2023-01-04", "2023-01-05", "2023-01-09", "2023-01-10"])
+        max_dd, duration, days = drawdown_stats(values, dates)
+        assert max_dd == 90 / 120 - 1
+        assert duration == 2
+        assert days == 2
+
+    def test_twr_neutralizes_contributions(self):
+        """MT.2: Aportes não contam como retorno no TWR"""
+        values = np.array([100, 110, 231], dtype=float)
+        flows = np.array([0, 100, 0], dtype=float)
+        returns = period_returns(values, flows, start_value=100)
+        np.testing.assert_allclose(returns, [0.0, 0.1, 0.1])
+
+    def test_drawdown_ignores_contributions(self):
+        """MT.7: Aporte durante a queda não cria novo pico nem encerra o drawdown"""
+        dates = pd.bdate_range("2023-01-02", periods=5)
+        # 100 -> 80 (-20%); aporte de 100 após o 2º pregão e a carteira continua caindo
+        values = np.array([100, 80, 175, 140, 190], dtype=float)
+        flows = np.array([0, 100, 0, 0, 0], dtype=float)
+        metrics = compute_metrics([{"date": d, "total_value": v} for d, v in zip(dates, values)],
+                                  flows=flows, start_value=100)
+
+        index = np.cumprod(1 + period_returns(values, flows, 100))
+        assert np.isclose(metrics.max_drawdown, index.min() / index[0] - 1)
+        assert metrics.max_drawdown < 80 / 100 - 1
+        assert metrics.max_drawdown_duration == 4
+        # Na curva bruta o aporte (175) parecia um novo pico
+        assert drawdown_stats(values)[0] == 140 / 175 - 1
+
+    def test_first_session_loss_is_drawdown(self):
+        """MT.8: Perda no primeiro pregão conta a partir do capital inicial"""
+        dates = pd.bdate_range("2023-01-02", periods=3)
+        history = [{"date": d, "total_value": v} for d, v in zip(dates, [90.0, 95.0, 100.0])]
+        metrics = compute_metrics(history, start_value=100)
+        assert np.isclose(metrics.max_drawdown, -0.10)
+        assert metrics.max_drawdown_duration == 2
+        assert compute_metrics(history).max_drawdown == 0.0
+
+    def test_irr(self):
+        """MT.3: IRR de fluxos simples"""
+        assert abs(irr([-100, 110], [0, 1]) - 0.10) < 1e-9
+        assert abs(irr([-100, -100, 231], [0, 1, 2]) - 0.10) < 1e-9
+        assert irr([100, 110], [0, 1]) == 0.0
+
+    def test_fifo_win_rate(self):
+        """MT.4: Vendas casadas FIFO com os lotes de compra"""
+        transactions = [_txn("BUY", 100, 10), _txn("BUY", 100, 20), _txn("SELL", 150, 15), _txn("SELL", 50, 15)]
+        assert trade_stats(transactions) == (0.5, 2)
+
+    def test_rolling_and_sortino(self):
+        """MT.5: Janelas móveis iguais às do pandas; Sortino só penaliza quedas"""
+        rng = np.random.default_rng(1)
+        returns = rng.normal(0.0005, 0.01, 600)
+        rolling_return, rolling_vol = rolling_stats(returns, 252)
+        series = pd.Series(returns)
+        expected_return = (1 + series).rolling(252).apply(np.prod, raw=True) - 1
+        expected_vol = series.rolling(252).std() * np.sqrt(252)
+        np.testing.assert_allclose(rolling_return, expected_return, rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(rolling_vol, expected_vol, rtol=1e-6, equal_nan=True)
+
+        assert sortino_ratio(np.array([0.01, 0.02, 0.03])) == 0.0
+        assert sortino_ratio(returns) > 0
+
+    def test_engine_metrics(self, synthetic_provider):
+        """MT.6: Resultado do motor traz as métricas nos dois modos, com aportes neutralizados"""
+        config = dict(
+            initial_capital=100000, start_date="2020-06-01", end_date="2023-12-29", max_assets=3,
+            entry_logic="AND",
+            entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+            exit_mode="rules",
+            exit_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": ">", "value": 14}]}],
+            stop_loss=5, take_profit=15, rebalance_period="monthly", contribution_amount=5000,
+        )
+        engine = BacktestEngine(synthetic_provider)
+        daily = engine.run(StrategyConfigRequest(**config))
+        events = BacktestEngine(synthetic_provider, event_driven=True).run(StrategyConfigRequest(**config))
+
+        assert daily.metrics.summary() == events.metrics.summary()
+        flows = np.zeros(len(daily.history))
+        flows[list(engine.contributions)] = list(engine.contributions.values())
+        index = np.cumprod(1 + period_returns(daily.history.total_value, flows, 100000))
+        assert daily.max_drawdown == drawdown_stats(np.r_[1.0, index])[0]
+        # CAGR no mesmo critério do TWR (aportes não são crescimento)
+        assert daily.cagr == daily.metrics.twr_annualized
+        assert daily.metrics.closed_trades > 0 and 0 <= daily.win_rate <= 1
+
+        # Sem os aportes, o TWR é o crescimento da curva
+        plain = compute_metrics(daily.history, start_value=100000)
+        assert daily.metrics.twr < plain.twr
+        assert daily.metrics.twr < daily.metrics.irr + 1
@@ -0,0 +1,85 @@
+"""
+Portfolio em arrays (slots por ticker)
+
+Objetivo: Garantir que compra, venda, avaliação e snapshot mantêm o comportamento da versão em dicionários
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.portfolio import Portfolio, Transaction
+
+
+DAY = pd.Timestamp("2023-01-02")
+
+
+class TestPortfolio:
+    """Testes para Portfolio"""
+
+    def test_buy_sell_and_average_price(self):
+        """P.1: Preço médio ponderado, venda parcial e venda total liberam o slot"""
+        portfolio = Portfolio(10_000, ["AAAA3", "BBBB4"])
+        assert portfolio.buy(DAY, "AAAA3", 100, 10.0)
+        assert portfolio.buy(DAY, "AAAA3", 100, 20.0)
+        assert portfolio.buy(DAY, "BBBB4", 1000, 100.0) is False  # sem caixa
+
+        assert portfolio.holdings == {"AAAA3": {"quantity": 200, "avg_price": 15.0}}
+        assert portfolio.cash == 7_000
+
+        assert portfolio.sell(DAY, "AAAA3", 50, 30.0)
+        assert portfolio.quantity_of("AAAA3") == 150 and portfolio.avg_price_of("AAAA3") == 15.0
+        assert portfolio.sell(DAY, "AAAA3", 1_000, 30.0)  # limitado à posição
+        assert "AAAA3" not in portfolio and len(portfolio) == 0
+        assert portfolio.sell(DAY, "AAAA3", 1, 30.0) is False
+        assert portfolio.cash == 13_000
+        assert [(t.action, t.quantity) for t in portfolio.transactions] == [("BUY", 100), ("BUY", 100), ("SELL", 50), ("SELL", 150)]
+
+    def test_purchase_order_and_unknown_tickers(self):
+        """P.2: Ordem de compra preservada; tickers fora do universo ganham slot novo"""
+        portfolio = Portfolio(100_000, ["AAAA3", "BBBB4"])
+        portfolio.buy(DAY, "BBBB4", 100, 10.0)
+        portfolio.buy(DAY, "ZZZZ3", 100, 10.0)
+        portfolio.buy(DAY, "AAAA3", 100, 10.0)
+        portfolio.sell(DAY, "BBBB4", 100, 10.0)
+        portfolio.buy(DAY, "BBBB4", 100, 12.0)
+        assert portfolio.held == ["ZZZZ3", "AAAA3", "BBBB4"]
+        assert portfolio.tickers == ["AAAA3", "BBBB4", "ZZZZ3"]
+
+    def test_valuation_and_snapshot(self):
+        """P.3: Avaliação por produto vetorial, com fallback no preço médio"""
+        portfolio = Portfolio(10_000, ["AAAA3", "BBBB4"])
+        portfolio.buy(DAY, "AAAA3", 100, 10.0)
+        portfolio.buy(DAY, "BBBB4", 200, 5.0)
+        assert portfolio.get_total_value({"AAAA3": 12.0}) == 8_000 + 1_200 + 1_000
+
+        matrix = np.array([[12.0, 5.0], [11.0, 6.0]])
+        np.testing.assert_array_equal(portfolio.holdings_value(matrix), [2_200.0, 2_300.0])
+
+        portfolio.mark(["AAAA3"], [12.0])
+        assert portfolio.holdings["AAAA3"]["current_price"] == 12.0
+        assert portfolio.mark_price_of("BBBB4") == 5.0
+
+        portfolio.snapshot(DAY, {"AAAA3": 12.0, "BBBB4": 6.0})
+        assert portfolio.history.records() == [{"date": DAY, "total_value": 10_400.0, "cash": 8_000, "holdings_count": 2}]
+
+    def test_set_holdings_and_records(self):
+        """P.4: Restauração a partir do dicionário e trade log como record array"""
+        portfolio = Portfolio(0, ["AAAA3"])
+        portfolio.set_holdings({"BBBB4": {"quantity": 300, "avg_price": 2.5, "current_price": 3.0},
+                                "AAAA3": {"quantity": 100, "avg_price": 1.0}})
+        assert portfolio.held == ["BBBB4", "AAAA3"]
+        assert portfolio.holdings["BBBB4"] == {"quantity": 300, "avg_price": 2.5, "current_price": 3.0}
+        # Snapshot somente leitura: escrever nele falha em vez de ser ignorado
+        with pytest.raises(TypeError):
+            portfolio.holdings["BBBB4"]["quantity"] = 0
+        with pytest.raises(TypeError):
+            del portfolio.holdings["AAAA3"]
+        portfolio.set_holdings(portfolio.holdings)
+        assert portfolio.holdings["BBBB4"]["quantity"] == 300
+
+        portfolio.sell(DAY, "BBBB4", 300, 3.0)
+        records = portfolio.transaction_records()
+        assert records.quantity.tolist() == [300]
+        assert records.total_value.tolist() == [900.0]
+        assert not hasattr(Transaction(DAY, "AAAA3", "BUY", 1, 1.0), "__dict__")
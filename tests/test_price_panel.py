@@ -0,0 +1,60 @@
+"""
+Painel de Preços: consultas as-of vetorizadas
+
+Objetivo: Garantir que o painel alinhado reproduz a busca as-of por ticker
+"""
+
+import numpy as np
+import pandas as pd
+
+from backtest.panel import PricePanel
+
+
+class TestPricePanel:
+    """Testes para o painel data x ticker"""
+
+    def _frames(self):
+        a = pd.DataFrame(
+            {"close": [10.0, 11.0, np.nan, 13.0], "volume": [1, 2, 3, 4]},
+            index=pd.to_datetime(["2023-01-02", "2023-01-03", "2023-01-04", "2023-01-05"]),
+        )
+        b = pd.DataFrame(
+            {"close": [50.0, 51.0], "adj close": [49.0, 50.0]},
+            index=pd.to_datetime(["2023-01-03", "2023-01-20"]),
+        )
+        return {"AAAA3": a, "BBBB4": b}
+
+    def test_asof_skips_missing_close(self):
+        """P.1: Fechamento NaN deve cair para a última cotação válida"""
+        panel = PricePanel.from_frames(self._frames())
+
+        price, quote_date = panel.lookup("AAAA3", pd.Timestamp("2023-01-04"))
+        assert price == 11.0
+        assert quote_date == pd.Timestamp("2023-01-03")
+
+        assert panel.lookup("AAAA3", pd.Timestamp("2023-01-01")) is None
+        assert panel.lookup("ZZZZ3", pd.Timestamp("2023-01-04")) is None
+
+    def test_batch_prices_and_ages(self):
+        """P.2: get_prices devolve preços e idade em dias alinhados aos tickers"""
+        panel = PricePanel.from_frames(self._frames())
+
+        prices, ages = panel.get_prices(["BBBB4", "AAAA3", "ZZZZ3"], pd.Timestamp("2023-01-15"))
+
+        assert prices[0] == 50.0
+        assert ages[0] == 12
+        assert prices[1] == 13.0 and ages[1] == 10
+        assert np.isnan(prices[2]) and np.isnan(ages[2])
+
+    def test_matches_pandas_asof(self, synthetic_provider):
+        """P.3: O painel deve concordar com asof do pandas em todas as datas"""
+        dp = synthetic_provider
+        df = dp.get_price_data("DDDD3")
+        for date in pd.date_range("2019-12-25", "2022-08-01", freq="7D"):
+            idx = df.index.asof(date)
+            row = dp.get_latest_price_row("DDDD3", date)
+            if pd.isna(idx):
+                assert row is None
+            else:
+                assert row.name == idx
+                assert row["close"] == df.loc[idx, "close"]
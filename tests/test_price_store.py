@@ -0,0 +1,124 @@
+"""
+PriceStore Parquet: armazenamento canônico de preços
+
+Objetivo: Garantir ida-e-volta JSON -> Parquet e leitura por janela de datas
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from backtest.data_provider import DataProvider
+from backtest.panel import PricePanel
+from etl.price_store import PriceStore, iter_price_history_json
+
+
+class TestPriceStore:
+    """Testes para o armazenamento particionado por ticker"""
+
+    def _store_from_json(self, synthetic_files):
+        store = PriceStore(synthetic_files["store_path"], row_group_size=63)
+        with open(synthetic_files["price_path"]) as fh:
+            store.write(json.load(fh))
+        return store
+
+    def test_round_trip(self, synthetic_files):
+        """S.1: Todos os tickers e metadados devem sobreviver à conversão"""
+        store = self._store_from_json(synthetic_files)
+
+        assert store.tickers() == ["AAAA3.SA", "BBBB4.SA", "CCCC3.SA", "DDDD3.SA"]
+        assert store.read_meta()["AAAA3.SA"]["symbol"] == "AAAA3.SA"
+
+        frames = store.read(tickers=["AAAA3.SA"])
+        assert list(frames) == ["AAAA3.SA"]
+        assert frames["AAAA3.SA"].index.is_monotonic_increasing
+        assert {"close", "adjclose", "volume"} <= set(frames["AAAA3.SA"].columns)
+
+    def test_window_pushdown(self, synthetic_files):
+        """S.2: Leitura por janela só materializa linhas no intervalo"""
+        store = self._store_from_json(synthetic_files)
+
+        frames = store.read(start="2023-01-01", end="2023-06-30", columns=["close"])
+        for df in frames.values():
+            assert list(df.columns) == ["close"]
+            assert df.index.min() >= pd.Timestamp("2023-01-01")
+            assert df.index.max() <= pd.Timestamp("2023-06-30")
+        # DDDD3 deixou de negociar em 2022
+        assert "DDDD3.SA" not in frames
+
+    def test_provider_prefers_store(self, synthetic_files):
+        """S.3: DataProvider lê o Parquet com lookback antes de start_date"""
+        self._store_from_json(synthetic_files)
+        dp = DataProvider(
+            data_path=synthetic_files["data_path"],
+            price_path="/nonexistent/price_history.json",
+            price_store_path=synthetic_files["store_path"],
+        )
+        dp.load_data(start_date="2023-01-01", end_date="2023-12-31")
+
+        assert dp.assets_list == ["AAAA3", "BBBB4", "CCCC3"]
+        assert "DDDD3.SA" in dp.data_quality_report["tickers_without_prices_history"]
+        first = dp.get_price_data("AAAA3").index.min()
+        assert pd.Timestamp("2022-11-30") <= first < pd.Timestamp("2023-01-01")
+        assert dp.get_price("AAAA3", pd.Timestamp("2023-01-02")) is not None
+
+    def test_json_export(self, synthetic_files, tmp_path):
+        """S.4: Exportação JSON opcional mantém o layout legado"""
+        store = self._store_from_json(synthetic_files)
+        out = tmp_path / "export.json"
+        store.export_json(out)
+
+        payload = json.loads(out.read_text())
+        record = payload["BBBB4.SA"]["prices"][0]
+        assert record["date"] == "2020-01-01"
+        assert payload["BBBB4.SA"]["meta"]["symbol"] == "BBBB4.SA"
+
+    def test_intraday_timestamps_normalized(self, tmp_path):
+        """S.5: Barras do Yahoo com horário UTC ficam na data da própria sessão"""
+        # Mesmo formato de etl/price_client.py: Date = pd.to_datetime(timestamp, unit='s'), 10h em Brasília
+        stamps = [pd.Timestamp(day + " 13:00", tz="UTC").timestamp() for day in ("2023-01-02", "2023-01-03")]
+        raw = pd.DataFrame({
+            "Date": pd.to_datetime(stamps, unit="s"),
+            "Close": [10.0, 11.0], "Adj Close": [10.0, 11.0], "Volume": [100, 200],
+        }).set_index("Date")
+        store = PriceStore(str(tmp_path / "store"))
+        store.write_ticker("AAAA3.SA", raw)
+
+        frame = store.read(tickers=["AAAA3.SA"])["AAAA3.SA"]
+        assert list(frame.index) == [pd.Timestamp("2023-01-02"), pd.Timestamp("2023-01-03")]
+
+        panel = PricePanel.from_frames({"AAAA3": frame})
+        prices, ages = panel.get_prices(["AAAA3"], pd.Timestamp("2023-01-03"))
+        np.testing.assert_array_equal(prices, [11.0])
+        np.testing.assert_array_equal(ages, [0.0])
+
+
+class TestStreamingJsonLoader:
+    """Testes para a leitura incremental do price_history.json legado"""
+
+    def test_stream_matches_full_load(self, synthetic_files):
+        """S.5: Leitura em streaming (chunks pequenos) igual ao json.load"""
+        with open(synthetic_files["price_path"]) as fh:
+            raw = json.load(fh)
+
+        streamed = list(iter_price_history_json(synthetic_files["price_path"], chunk_size=4096))
+
+        assert [ticker for ticker, _, _ in streamed] == list(raw)
+        for ticker, frame, meta in streamed:
+            assert meta == raw[ticker]["meta"]
+            closes = [record["Close"] for record in raw[ticker]["prices"]]
+            assert frame["close"].tolist() == closes
+
+    def test_whitelist(self, synthetic_files):
+        """S.6: Whitelist carrega apenas os tickers pedidos (com ou sem .SA)"""
+        streamed = iter_price_history_json(synthetic_files["price_path"], tickers=["bbbb4", "DDDD3.SA"])
+        assert [ticker for ticker, _, _ in streamed] == ["BBBB4.SA", "DDDD3.SA"]
+
+        dp = DataProvider(
+            data_path=synthetic_files["data_path"],
+            price_path=synthetic_files["price_path"],
+            price_store_path=synthetic_files["store_path"],
+        )
+        dp.load_data(tickers=["CCCC3"])
+        assert dp.assets_list == ["CCCC3"]
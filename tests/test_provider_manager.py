@@ -0,0 +1,69 @@
+"""
+DataProviderManager: snapshot compartilhado com recarga a quente
+
+Objetivo: Garantir carga única, troca atômica e preservação do snapshot antigo
+"""
+
+import os
+
+from backtest.provider_manager import DataProviderManager
+
+
+class TestDataProviderManager:
+    """Testes para o provider de processo com hot reload"""
+
+    def _manager(self, synthetic_files):
+        return DataProviderManager(
+            provider_kwargs={
+                "data_path": synthetic_files["data_path"],
+                "price_path": synthetic_files["price_path"],
+                "price_store_path": synthetic_files["store_path"],
+            },
+            check_interval=0,
+            fetch_benchmarks=False,
+        )
+
+    def test_loads_once(self, synthetic_files):
+        """M.1: Requisições reutilizam o mesmo provider carregado"""
+        manager = self._manager(synthetic_files)
+        first = manager.get()
+
+        assert first.assets_list == ["AAAA3", "BBBB4", "CCCC3", "DDDD3"]
+        assert "AAAA3" in first._financials_cache
+        assert manager.get() is first
+        assert manager.check_for_updates() is False
+
+    def test_hot_reload_swaps_snapshot(self, synthetic_files):
+        """M.2: Mudança de mtime carrega um novo snapshot sem tocar no antigo"""
+        manager = self._manager(synthetic_files)
+        old = manager.get()
+        old.benchmarks = {"IBOV": "sentinel"}
+
+        stat = os.stat(synthetic_files["price_path"])
+        os.utime(synthetic_files["price_path"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert manager.check_for_updates(wait=True) is True
+        new = manager.get()
+        assert new is not old
+        assert old.assets_list == new.assets_list
+        # Benchmarks (Ipeadata) são reaproveitados entre recargas
+        assert new.benchmarks == {"IBOV": "sentinel"}
+
+    def test_reload_keeps_benchmark_services_apart(self, synthetic_files, synthetic_provider):
+        """M.3: Snapshot antigo mantém seu BenchmarkService; níveis pré-calculados são reaproveitados"""
+        manager = self._manager(synthetic_files)
+        old = manager.get()
+        old.benchmarks = synthetic_provider.benchmarks
+        old.benchmark_service.aligned(synthetic_files["dates"][:50])
+        levels = old.benchmark_service.levels("IBOV")
+
+        stat = os.stat(synthetic_files["price_path"])
+        os.utime(synthetic_files["price_path"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert manager.check_for_updates(wait=True) is True
+        new = manager.get()
+
+        assert old.benchmark_service.data_provider is old
+        assert new.benchmark_service is not old.benchmark_service
+        assert new.benchmark_service.data_provider is new
+        assert new.benchmark_service.levels("IBOV") is levels
+        assert len(new.benchmark_service._aligned) == 0
@@ -0,0 +1,114 @@
+"""
+Cache de resultados do /api/backtest/run
+
+Objetivo: Garantir chave canônica, versão dos dados, LRU por tamanho e single-flight
+"""
+
+import threading
+import time
+
+import pytest
+
+from backtest.data_provider import DataProvider
+from backtest.domain import StrategyConfigRequest
+from backtest.result_cache import RESULT_VERSION, ResultCache, cache_key, config_hash
+
+
+CONFIG = dict(
+    initial_capital=100000,
+    start_date="2021-01-01",
+    end_date="2023-12-29",
+    entry_logic="AND",
+    entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    exit_mode="rules",
+    rebalance_period="monthly",
+)
+
+
+class TestResultCache:
+    """Testes para ResultCache e chaves"""
+
+    def test_config_hash_is_canonical(self):
+        """RC.1: Ordem dos campos e defaults explícitos não mudam a chave"""
+        a = StrategyConfigRequest(**CONFIG)
+        b = StrategyConfigRequest(**dict(reversed(list(CONFIG.items()))), max_assets=10)
+        c = StrategyConfigRequest(**{**CONFIG, "stop_loss": 10})
+        assert config_hash(a) == config_hash(b)
+        assert config_hash(a) != config_hash(c)
+        assert cache_key(a, "v1") != cache_key(a, "v2")
+        # Nova versão do motor/serialização invalida resultados persistidos
+        assert cache_key(a, "v1") == cache_key(a, "v1", RESULT_VERSION)
+        assert cache_key(a, "v1", RESULT_VERSION + 1) != cache_key(a, "v1")
+
+    def test_fingerprint_tracks_content(self, synthetic_provider, tmp_path):
+        """RC.2: Fingerprint igual para o mesmo conteúdo, diferente quando os dados mudam"""
+        fingerprint = synthetic_provider.fingerprint()
+        synthetic_provider.save_snapshot(str(tmp_path / "snap"))
+        assert DataProvider.from_snapshot(str(tmp_path / "snap")).fingerprint() == fingerprint
+
+        synthetic_provider.benchmarks["IBOV"] = synthetic_provider.benchmarks["IBOV"] * 1.01
+        synthetic_provider._fingerprint = None
+        assert synthetic_provider.fingerprint() != fingerprint
+
+    def test_memory_lru_by_size(self):
+        """RC.3: Memória limitada em bytes, despejando o menos usado"""
+        cache = ResultCache(max_memory_bytes=30)
+        cache.put("a", b"x" * 10)
+        cache.put("b", b"y" * 10)
+        cache.put("c", b"z" * 10)
+        assert cache.get("a") == b"x" * 10  # "b" passa a ser o menos recente
+        cache.put("d", b"w" * 10)
+        assert cache.get("b") is None
+        assert {k for k in "acd" if cache.get(k) is not None} == set("acd")
+
+    def test_disk_tier_persists_and_evicts(self, tmp_path):
+        """RC.4: SQLite sobrevive a uma nova instância e respeita o limite de bytes"""
+        path = str(tmp_path / "results.sqlite")
+        cache = ResultCache(path, max_disk_bytes=25)
+        cache.put("a", b"1" * 10)
+        cache.put("b", b"2" * 10)
+
+        reopened = ResultCache(path, max_disk_bytes=25)
+        assert reopened.get("a") == b"1" * 10
+        reopened.put("c", b"3" * 10)
+        fresh = ResultCache(path, max_disk_bytes=25)
+        assert fresh.get("b") is None
+        assert fresh.get("a") == b"1" * 10
+        assert fresh.get("c") == b"3" * 10
+
+    def test_single_flight(self):
+        """RC.5: Requisições idênticas concorrentes executam uma única simulação"""
+        cache = ResultCache()
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return b"result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+                   for _ in range(8)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [b"result"] * 8
+        assert cache.misses == 1 and cache.hits == 7
+
+    def test_failures_are_not_cached(self):
+        """RC.6: Erros chegam a quem espera e a próxima chamada recalcula"""
+        cache = ResultCache()
+
+        def boom():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("k", boom)
+        assert cache.get_or_compute("k", lambda: b"ok") == b"ok"
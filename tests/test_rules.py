@@ -0,0 +1,143 @@
+"""
+Compilador de Regras de Entrada/Saída
+
+Objetivo: Garantir que as máscaras vetorizadas reproduzem evaluate_rules
+"""
+
+import numpy as np
+import pandas as pd
+
+from backtest.domain import CriteriaGroup, CriteriaItem, StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.portfolio import Portfolio
+from backtest.rules import CompiledRules, top_n
+
+
+RULE_SETS = [
+    [{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    [
+        {"logic": "AND", "items": [
+            {"indicator": "roe", "operator": ">=", "value": 0.1},
+            {"indicator": "net_debt_ebitda", "operator": "range", "value_min": 0, "value_max": 6},
+        ]},
+        {"logic": "OR", "items": [
+            {"indicator": "consecutive_profits", "operator": ">", "value": 0.5},
+            {"indicator": "revenue_cagr_5y", "operator": "outsiderange", "value_min": -5, "value_max": 5},
+        ]},
+    ],
+    [
+        CriteriaGroup(logic="or", items=[
+            CriteriaItem(indicator="dy", operator=">", value=0.05),
+            CriteriaItem(indicator="ev_ebitda", operator="<", value=10),
+        ]),
+    ],
+]
+
+
+def _engine(provider, entry_logic="AND", criteria=None):
+    engine = BacktestEngine(provider)
+    engine.config = StrategyConfigRequest(
+        initial_capital=100000,
+        start_date="2021-01-01",
+        end_date="2023-12-31",
+        entry_logic=entry_logic,
+        entry_criteria=criteria or [],
+        exit_mode="rules",
+        rebalance_period="monthly",
+    )
+    engine.compile_rules()
+    return engine
+
+
+class TestCompiledRules:
+    """Testes para CompiledRules"""
+
+    def test_masks_match_scalar_evaluation(self, synthetic_provider):
+        """R.1: Máscara compilada igual a evaluate_rules para todo ticker e data"""
+        dp = synthetic_provider
+        dates = pd.date_range("2020-02-01", "2023-12-31", freq="45D")
+        for entry_logic in ["AND", "OR"]:
+            for criteria in RULE_SETS:
+                engine = _engine(dp, entry_logic, criteria)
+                for date in dates:
+                    snapshot = dp.get_fundamentals(date)
+                    mask = engine.entry_rules(snapshot)
+                    for i, ticker in enumerate(dp.assets_list):
+                        row = snapshot.row(ticker)
+                        if row is None:
+                            continue
+                        expected = engine.evaluate_rules(engine.config.entry_criteria, ticker, date, 10.0, row)
+                        assert mask[i] == expected, (entry_logic, criteria, ticker, date)
+
+    def test_no_criteria_passes_everything(self, synthetic_provider):
+        """R.2: Sem regras, todos os ativos passam"""
+        snapshot = synthetic_provider.get_fundamentals(pd.Timestamp("2023-06-30"))
+        rules = CompiledRules([], "AND")
+        assert not rules
+        assert rules(snapshot).all()
+
+    def test_data_validity(self, synthetic_provider):
+        """R.3: Indicador ausente ou zerado (sensível a zero) invalida o ativo"""
+        dp = synthetic_provider
+        date = pd.Timestamp("2023-06-30")
+        snapshot = dp.get_fundamentals(date)
+
+        rules = CompiledRules([{"logic": "AND", "items": [{"indicator": "ev_ebitda", "operator": "<", "value": 10}]}])
+        assert not rules.data_valid(snapshot).any()
+
+        rules = CompiledRules([{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}])
+        expected = np.array([
+            snapshot.row(t) is not None and snapshot.row(t).get("p_l") != 0 for t in dp.assets_list
+        ])
+        np.testing.assert_array_equal(rules.data_valid(snapshot), expected)
+
+
+class TestTopN:
+    """Testes para a seleção top-N por argpartition"""
+
+    def test_matches_stable_sort(self):
+        """R.4: Mesmo resultado que sort estável, com empates na ordem original"""
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            scores = rng.integers(0, 6, size=30).astype(float)
+            n = int(rng.integers(1, 35))
+            expected = sorted(range(len(scores)), key=lambda i: scores[i])[:n]
+            assert top_n(scores, n).tolist() == expected
+
+    def test_nan_ranks_last(self):
+        """R.5: Scores NaN só entram quando faltam candidatos"""
+        scores = np.array([np.nan, 3.0, 1.0, np.nan])
+        assert top_n(scores, 2).tolist() == [2, 1]
+        assert top_n(scores, 4).tolist() == [2, 1, 0, 3]
+        assert top_n(scores, 0).tolist() == []
+
+
+class TestVectorizedEntries:
+    """Testes para check_entries vetorizado"""
+
+    def test_sequential_lot_allocation(self, synthetic_provider):
+        """R.6: Top-N comprado em lotes de 100, cada compra com o caixa restante / vagas"""
+        engine = _engine(synthetic_provider)
+        engine.config.max_assets = 3
+        engine.portfolio = Portfolio(100000)
+        date = pd.Timestamp("2023-03-01")
+
+        engine.check_entries(date)
+
+        fundamentals = synthetic_provider.get_fundamentals(date)
+        prices, ages = synthetic_provider.get_prices(synthetic_provider.assets_list, date)
+        # DDDD3 não tem cotação em 2023
+        fresh = np.flatnonzero(ages <= 5)
+        scores = engine.entry_scores(fundamentals, fresh)
+        ranked = [synthetic_provider.assets_list[i] for i in fresh[np.argsort(scores, kind="stable")][:3]]
+
+        bought = [(t.ticker, t.quantity) for t in engine.portfolio.transactions]
+        assert [ticker for ticker, _ in bought] == ranked
+        cash = 100000.0
+        for ticker, quantity in bought:
+            price = prices[synthetic_provider.assets_list.index(ticker)]
+            assert quantity == int(cash / 3 // price) // 100 * 100
+            cash -= quantity * price
+        assert engine.portfolio.cash == cash
+        # Quantidades da alocação sequencial original (regressão)
+        assert bought == [("CCCC3", 1200), ("BBBB4", 1700), ("AAAA3", 1500)]
@@ -0,0 +1,90 @@
+"""
+Serialização das respostas
+
+Objetivo: Garantir que os formatos compactos e colunares preservam os dados e que a negociação segue os cabeçalhos
+"""
+
+import gzip
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import serialization
+from backtest.portfolio import Transaction
+
+
+class TestSerialization:
+    """Testes para dumps, encode, negotiate e choose_encoding"""
+
+    def test_dumps_native_types(self):
+        """SZ.1: Arrays, datas, dataclasses e NaN codificados sem conversão prévia"""
+        payload = {
+            "values": np.array([1.5, np.nan, np.inf]),
+            "count": np.int64(3),
+            "dates": np.array(["2021-01-04", "2021-01-05"], dtype="datetime64[ns]"),
+            "trade": Transaction(pd.Timestamp("2021-01-04"), "AAAA3", "BUY", 10, 12.5),
+            "ratio": float("nan"),
+        }
+        decoded = serialization.loads(serialization.dumps(payload))
+
+        assert decoded["values"] == [1.5, None, None]
+        assert decoded["count"] == 3 and decoded["ratio"] is None
+        assert decoded["dates"] == ["2021-01-04T00:00:00", "2021-01-05T00:00:00"]
+        assert decoded["trade"]["date"] == "2021-01-04T00:00:00" and decoded["trade"]["quantity"] == 10
+
+    def test_dumps_matches_stdlib_json(self):
+        """SZ.2: Layout em linhas idêntico ao JSON compacto da biblioteca padrão"""
+        payload = {"history": [{"date": "2021-01-04", "total_value": 100000.0, "holdings_count": 2}],
+                   "name": "Ação", "empty": []}
+        expected = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        assert serialization.dumps(payload) == expected
+
+    def test_records_to_columns(self):
+        """SZ.3: Registros transpostos em uma lista por campo"""
+        records = [{"date": "2021-01-04", "value": 1.0}, {"date": "2021-01-05", "value": None}]
+        assert serialization.records_to_columns(records) == {
+            "date": ["2021-01-04", "2021-01-05"], "value": [1.0, None]}
+        assert serialization.records_to_columns([]) == {}
+
+    @pytest.mark.skipif(serialization.pa is None, reason="pyarrow não instalado")
+    def test_arrow_stream(self):
+        """SZ.4: Histórico vira record batch e o restante vai nos metadados"""
+        pa = serialization.pa
+        dates = pd.bdate_range("2021-01-04", periods=5).values
+        payload = {"summary": {"cagr": 0.1},
+                   "history": {"date": dates, "total_value": np.arange(5.0), "holdings_count": np.arange(5)}}
+        table = pa.ipc.open_stream(io.BytesIO(serialization.encode(payload, serialization.ARROW))).read_all()
+
+        assert table.schema.names == ["date", "total_value", "holdings_count"]
+        np.testing.assert_array_equal(table["date"].to_numpy(), dates)
+        np.testing.assert_array_equal(table["total_value"].to_numpy(), np.arange(5.0))
+        assert json.loads(table.schema.metadata[b"payload"]) == {"summary": {"cagr": 0.1}}
+
+        # Colunas decodificadas de JSON (datas em texto, nulos) também são aceitas
+        decoded = serialization.loads(serialization.dumps(payload))
+        decoded["history"]["total_value"][1] = None
+        table = pa.ipc.open_stream(io.BytesIO(serialization.to_arrow(decoded))).read_all()
+        np.testing.assert_array_equal(table["date"].to_numpy(), dates)
+        assert np.isnan(table["total_value"].to_numpy()[1])
+
+    def test_negotiation(self):
+        """SZ.5: Formato pelo Accept (qualidade e ordem) e compressão pelo Accept-Encoding"""
+        negotiate = serialization.negotiate
+        assert negotiate(None) is serialization.JSON
+        assert negotiate("*/*") is serialization.JSON
+        assert negotiate("text/html") is None
+        assert negotiate(f"application/json;q=0.5, {serialization.COLUMNS.media_type}") is serialization.COLUMNS
+        assert negotiate(f"{serialization.COLUMNS.media_type};q=0, application/*") is serialization.JSON
+        if serialization.msgpack is None:
+            assert negotiate("application/msgpack") is None
+            assert negotiate("application/msgpack, application/json;q=0.1") is serialization.JSON
+
+        choose = serialization.choose_encoding
+        assert choose(None) is None and choose("identity") is None
+        assert choose("gzip;q=0, deflate") is None
+        assert choose("gzip, deflate, br") == ("br" if serialization.brotli is not None else "gzip")
+        body = serialization.dumps({"values": list(range(1000))})
+        assert gzip.decompress(serialization.compress(body, "gzip")) == body
@@ -0,0 +1,58 @@
+"""
+Progresso incremental da simulação (run_iter)
+
+Objetivo: Garantir que os blocos parciais reproduzem o resultado final e que a execução pode ser cancelada
+"""
+
+import pytest
+
+from backtest.domain import BacktestProgress, BacktestResult, StrategyConfigRequest
+from backtest.engine import BacktestEngine
+
+
+CONFIG = dict(
+    initial_capital=100000,
+    start_date="2020-06-01",
+    end_date="2023-12-29",
+    max_assets=3,
+    entry_logic="AND",
+    entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    exit_mode="rules",
+    exit_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": ">", "value": 14}]}],
+    stop_loss=10,
+    rebalance_period="monthly",
+    contribution_amount=1000,
+)
+
+
+class TestRunIter:
+    """Testes para BacktestEngine.run_iter"""
+
+    @pytest.mark.parametrize("event_driven", [False, True])
+    def test_chunks_rebuild_history(self, synthetic_provider, event_driven):
+        """ST.1: Blocos de progresso concatenados formam o histórico completo, já com benchmarks"""
+        expected = BacktestEngine(synthetic_provider, event_driven).run(StrategyConfigRequest(**CONFIG))
+        items = list(BacktestEngine(synthetic_provider, event_driven).run_iter(StrategyConfigRequest(**CONFIG), 50))
+
+        progress, result = items[:-1], items[-1]
+        assert isinstance(result, BacktestResult)
+        assert all(isinstance(p, BacktestProgress) for p in progress)
+        assert [row for p in progress for row in p.history] == expected.history.records()
+        assert all(len(p.history) >= 50 for p in progress[:-1])
+        assert progress[-1].processed == progress[-1].total == len(expected.history)
+        assert all("selic_value" in row for row in progress[0].history)
+        assert result.final_capital == expected.final_capital
+
+    def test_without_chunks_yields_only_result(self, synthetic_provider):
+        """ST.2: chunk_sessions=0 produz apenas o resultado"""
+        items = list(BacktestEngine(synthetic_provider, True).run_iter(StrategyConfigRequest(**CONFIG)))
+        assert len(items) == 1 and isinstance(items[0], BacktestResult)
+
+    def test_close_cancels_run(self, synthetic_provider):
+        """ST.3: Fechar o gerador interrompe a simulação no bloco seguinte"""
+        engine = BacktestEngine(synthetic_provider, event_driven=False)
+        run = engine.run_iter(StrategyConfigRequest(**CONFIG), 20)
+        first = next(run)
+        run.close()
+        assert first.processed == 20
+        assert len(engine.portfolio.history) == 20
@@ -0,0 +1,72 @@
+"""
+Varredura de parâmetros em paralelo
+
+Objetivo: Garantir grade correta e resultados iguais aos de execuções isoladas
+"""
+
+import os
+
+import numpy as np
+
+from backtest.data_provider import DataProvider
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.sweep import ParameterSweep, expand_grid, summarize
+
+
+BASE = StrategyConfigRequest(
+    initial_capital=100000,
+    start_date="2021-01-01",
+    end_date="2023-12-29",
+    max_assets=2,
+    entry_logic="AND",
+    entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    exit_mode="rules",
+    rebalance_period="monthly",
+)
+
+GRID = {
+    "rebalance_period": ["monthly", "quarterly"],
+    "stop_loss": [None, 10],
+    "entry_criteria.0.items.0.value": [12, 15],
+}
+
+
+class TestParameterSweep:
+    """Testes para ParameterSweep"""
+
+    def test_expand_grid(self):
+        """S.1: Produto cartesiano com caminhos aninhados nos critérios"""
+        variants = expand_grid(BASE, GRID)
+        assert len(variants) == 8
+        params, config = variants[-1]
+        assert params == {"rebalance_period": "quarterly", "stop_loss": 10, "entry_criteria.0.items.0.value": 15}
+        assert config.entry_criteria[0].items[0].value == 15
+        # A config base não é alterada
+        assert BASE.stop_loss is None
+
+    def test_snapshot_roundtrip(self, synthetic_provider, tmp_path):
+        """S.2: Provider mapeado do snapshot reproduz o resultado original"""
+        synthetic_provider.save_snapshot(str(tmp_path))
+        attached = DataProvider.from_snapshot(str(tmp_path))
+
+        assert isinstance(attached.price_panel.fields["close"], np.memmap)
+        expected = BacktestEngine(synthetic_provider).run(BASE.model_copy(deep=True))
+        result = BacktestEngine(attached).run(BASE.model_copy(deep=True))
+        assert result.history == expected.history
+        assert result.trade_log == expected.trade_log
+
+    def test_parallel_matches_sequential(self, synthetic_provider, tmp_path):
+        """S.3: Workers em processos separados retornam os mesmos resumos"""
+        with ParameterSweep.from_provider(synthetic_provider, workers=2) as sweep:
+            results = sorted(sweep.run(BASE, GRID), key=lambda r: r["index"])
+            snapshot_dir = sweep.snapshot_dir
+        assert not os.path.exists(snapshot_dir)
+
+        assert [r["index"] for r in results] == list(range(8))
+        for summary, (params, config) in zip(results, expand_grid(BASE, GRID)):
+            assert "error" not in summary
+            assert summary["params"] == params
+            expected = summarize(BacktestEngine(synthetic_provider).run(config))
+            for key in ["final_capital", "total_return", "max_drawdown", "total_trades"]:
+                assert summary[key] == expected[key]
@@ -0,0 +1,101 @@
+"""
+Calendário de pregões da B3
+
+Objetivo: Garantir feriados corretos, aritmética de pregões e rebalanceamento por período
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtest.calendar import (
+    B3_HOLIDAYS_PATH, TradingCalendar, generate_b3_holidays, get_trading_calendar, write_b3_holidays,
+)
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+
+
+class TestTradingCalendar:
+    """Testes para o TradingCalendar"""
+
+    def test_known_holidays(self):
+        """C.1: Feriados nacionais, móveis e de fim de ano não são pregões"""
+        calendar = get_trading_calendar()
+        for day in ["2023-01-02", "2023-02-22", "2024-11-19"]:
+            assert calendar.is_session(day)
+        # Carnaval, Sexta-feira Santa, Corpus Christi, Consciência Negra (2024), véspera de Natal
+        for day in ["2023-02-20", "2023-02-21", "2023-04-07", "2023-06-08", "2024-11-20", "2024-12-24", "2024-12-31"]:
+            assert not calendar.is_session(day)
+        # Feriados municipais de SP: fechado até 2021, aberto a partir de 2022
+        assert not calendar.is_session("2021-01-25")
+        assert calendar.is_session("2022-01-25")
+        # Consciência Negra: feriado em SP só a partir de 2004
+        assert calendar.is_session("2003-11-20")
+        assert not calendar.is_session("2008-11-20")
+
+    def test_persisted_table_matches_rules(self, tmp_path, monkeypatch):
+        """C.2: Tabela ausente é gerada em memória (sem gravar) e a persistida é igual à gerada"""
+        path = tmp_path / "holidays.json"
+        expected = pd.DatetimeIndex(sorted(generate_b3_holidays())).values.astype("datetime64[D]")
+
+        calendar = TradingCalendar.load(str(path))
+        assert not path.exists()
+        np.testing.assert_array_equal(calendar.holidays, expected)
+
+        write_b3_holidays(str(path))
+        np.testing.assert_array_equal(TradingCalendar.load(str(path)).holidays, expected)
+
+        # Caminho padrão relativo ao pacote, não ao diretório corrente
+        monkeypatch.chdir(tmp_path)
+        assert os.path.isabs(B3_HOLIDAYS_PATH) and os.path.exists(B3_HOLIDAYS_PATH)
+        TradingCalendar.load()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["holidays.json"]
+
+    def test_ordinals_and_offsets(self):
+        """C.3: Ordinal e deslocamento em pregões são consistentes"""
+        calendar = get_trading_calendar()
+        sessions = calendar.sessions_in_range("2023-01-01", "2023-12-31")
+        assert len(sessions) == calendar.count("2023-01-01", "2024-01-01")
+
+        ordinals = calendar.ordinals(sessions)
+        np.testing.assert_array_equal(np.diff(ordinals), 1)
+        assert calendar.ordinal(sessions[10]) == ordinals[10]
+        # Sábado mapeia para a sexta anterior
+        assert calendar.ordinals(["2023-01-07"])[0] == calendar.ordinal("2023-01-06")
+
+        shifted = calendar.offset(sessions[:-5], 5)
+        assert (shifted == sessions[5:]).all()
+        assert calendar.offset("2023-02-17", 1)[0] == pd.Timestamp("2023-02-22")
+
+    def test_period_starts(self):
+        """C.4: Primeiro pregão de cada trimestre"""
+        calendar = get_trading_calendar()
+        starts = calendar.period_starts("quarter", "2023-01-01", "2023-12-31")
+        assert list(starts) == list(pd.to_datetime(["2023-01-02", "2023-04-03", "2023-07-03", "2023-10-02"]))
+
+        mask = calendar.is_period_start(pd.to_datetime(["2023-05-01", "2023-05-02", "2023-05-03"]), "month")
+        assert mask.tolist() == [False, True, False]
+
+
+class TestCalendarRebalance:
+    """Testes para rebalanceamento alinhado ao calendário"""
+
+    def test_rebalances_on_month_starts(self, synthetic_provider):
+        """C.5: Aportes acontecem no primeiro pregão de cada mês, exceto o inicial"""
+        engine = BacktestEngine(synthetic_provider)
+        config = StrategyConfigRequest(
+            initial_capital=10000,
+            start_date="2023-01-10",
+            end_date="2023-06-30",
+            contribution_amount=1000,
+            rebalance_period="monthly",
+            entry_logic="AND",
+            entry_criteria=[],
+            exit_mode="rules",
+        )
+        engine.run(config)
+
+        expected = pd.to_datetime(["2023-02-01", "2023-03-01", "2023-04-03", "2023-05-02", "2023-06-01"])
+        assert sorted(engine.rebalance_dates) == list(expected)
+        assert engine.total_invested == 10000 + 1000 * len(expected)
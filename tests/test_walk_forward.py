@@ -0,0 +1,86 @@
+"""
+Otimização walk-forward
+
+Objetivo: Garantir janelas corretas, escolha pelo objetivo e curva encadeada
+"""
+
+import pandas as pd
+import pytest
+
+from backtest.domain import StrategyConfigRequest
+from backtest.engine import BacktestEngine
+from backtest.rules import ScreenCache
+from backtest.sweep import ParameterSweep, expand_grid, summarize
+from backtest.walk_forward import OBJECTIVES, WalkForwardOptimizer, build_windows
+
+
+BASE = StrategyConfigRequest(
+    initial_capital=100000,
+    start_date="2020-06-01",
+    end_date="2023-12-29",
+    max_assets=2,
+    entry_logic="AND",
+    entry_criteria=[{"logic": "AND", "items": [{"indicator": "p_l", "operator": "<", "value": 15}]}],
+    exit_mode="rules",
+    rebalance_period="monthly",
+)
+
+GRID = {"max_assets": [1, 2], "stop_loss": [None, 8]}
+
+
+class TestWalkForward:
+    """Testes para WalkForwardOptimizer"""
+
+    def test_build_windows(self):
+        """W.1: Janelas in/out-of-sample contíguas e sem sobreposição fora da amostra"""
+        windows = build_windows("2020-01-01", "2023-12-31", in_sample_months=12, out_sample_months=6)
+        assert len(windows) == 6
+        first = windows[0]
+        assert first.in_sample_end == pd.Timestamp("2020-12-31")
+        assert first.out_sample_start == pd.Timestamp("2021-01-01")
+        assert first.out_sample_end == pd.Timestamp("2021-06-30")
+        for previous, current in zip(windows, windows[1:]):
+            assert current.out_sample_start == previous.out_sample_end + pd.Timedelta(days=1)
+        assert windows[-1].out_sample_end == pd.Timestamp("2023-12-31")
+
+    def test_unknown_objective(self, tmp_path):
+        """W.2: Objetivo desconhecido é rejeitado"""
+        with pytest.raises(ValueError):
+            WalkForwardOptimizer(ParameterSweep(str(tmp_path), workers=1), objective="sharpe")
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_picks_best_and_chains(self, synthetic_provider, workers):
+        """W.3: Melhor variante por janela e segmentos encadeados a partir do capital inicial"""
+        windows = build_windows(BASE.start_date, BASE.end_date, in_sample_months=12, out_sample_months=6)
+        with ParameterSweep.from_provider(synthetic_provider, workers=workers) as sweep:
+            result = WalkForwardOptimizer(sweep, objective="calmar").run(BASE, GRID, windows)
+
+        assert not result.errors
+        assert len(result.windows) == len(windows)
+        variants = expand_grid(BASE, GRID)
+        window = windows[1]
+        scores = []
+        for params, config in variants:
+            config = config.model_copy(update={
+                "start_date": window.in_sample_start.date().isoformat(),
+                "end_date": window.in_sample_end.date().isoformat(),
+            }, deep=True)
+            scores.append(OBJECTIVES["calmar"](summarize(BacktestEngine(synthetic_provider).run(config))))
+        best = max(range(len(scores)), key=lambda i: (scores[i], -i))
+        assert result.windows[1]["params"] == variants[best][0]
+
+        dates = [point["date"] for point in result.equity_curve]
+        assert dates == sorted(set(dates))
+        assert dates[0] >= windows[0].out_sample_start.isoformat()
+        assert result.final_capital == result.equity_curve[-1]["total_value"]
+        assert result.total_return == pytest.approx(result.final_capital / 100000 - 1)
+
+    def test_screen_cache_reused(self, synthetic_provider):
+        """W.4: Janelas sobrepostas reutilizam as telas de entrada"""
+        cache = ScreenCache()
+        for start, end in [("2021-01-01", "2022-06-30"), ("2021-07-01", "2022-12-31")]:
+            # Aportes mantêm caixa > 10%, então toda data de rebalanceamento roda a tela
+            config = BASE.model_copy(update={"start_date": start, "end_date": end, "contribution_amount": 20000}, deep=True)
+            BacktestEngine(synthetic_provider, screen_cache=cache).run(config)
+        # 2021-08..2022-06 (11 rebalanceamentos) é comum às duas janelas
+        assert cache.hits == 11